@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Booking, Payment
+from .models import ArchivedBooking, ArchivedPayment, Booking, Payment
 
 
 class PaymentInline(admin.TabularInline):
@@ -21,7 +21,7 @@ class BookingAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Информация о бронировании', {
-            'fields': ('user', 'venue', 'date_start', 'date_end', 'status')
+            'fields': ('user', 'venue', 'date_start', 'date_end', 'status', 'expires_at')
         }),
         ('Финансовая информация', {
             'fields': ('total_price',)
@@ -44,6 +44,10 @@ class PaymentAdmin(admin.ModelAdmin):
     list_display = ('id', 'booking', 'amount', 'status', 'payment_method', 'created_at')
     list_filter = ('status', 'payment_method', 'created_at')
     search_fields = ('booking__user__username', 'booking__venue__title')
+    # Бронь в списке выводится с названием площадки - JOIN вместо запроса на строку
+    list_select_related = ('booking__venue',)
+    # Выпадающий список всех броней на форме платежа не строится
+    raw_id_fields = ('booking',)
     readonly_fields = ('created_at',)
     ordering = ('-created_at',)
     
@@ -56,3 +60,27 @@ class PaymentAdmin(admin.ModelAdmin):
         }),
     )
 
+
+
+class ArchivedPaymentInline(admin.TabularInline):
+    """Платежи архивного бронирования (только просмотр)"""
+    model = ArchivedPayment
+    extra = 0
+    can_delete = False
+    readonly_fields = ('amount', 'status', 'payment_method', 'created_at')
+
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(admin.ModelAdmin):
+    """Архив бронирований (только просмотр)"""
+    list_display = ('id', 'user', 'venue', 'date_start', 'date_end', 'status', 'total_price', 'archived_at')
+    list_filter = ('status', 'archived_at')
+    search_fields = ('user__username', 'user__full_name', 'venue__title')
+    ordering = ('-created_at',)
+    inlines = [ArchivedPaymentInline]
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -6,3 +6,7 @@ class BookingsConfig(AppConfig):
     name = 'bookings'
     verbose_name = 'Бронирования'
 
+    
+    def ready(self):
+        # Подключаем сигналы сброса кэша занятости площадок
+        from . import signals  # noqa: F401
@@ -0,0 +1,88 @@
+"""
+Перенос завершённых бронирований и их платежей в архивные таблицы.
+
+Рабочие таблицы bookings/payments остаются небольшими: брони, закончившиеся
+раньше BOOKING_ARCHIVE_AFTER_MONTHS месяцев назад, переносятся пачками
+в bookings_archive/payments_archive через INSERT ... SELECT и удаляются
+из рабочих таблиц в той же транзакции, поэтому данные не теряются
+и не дублируются. Брони с отзывами остаются в рабочей таблице: отзыв
+ссылается на бронь и удалился бы вместе с ней.
+"""
+import calendar
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import ArchivedBooking, ArchivedPayment, Booking, Payment
+
+
+def get_archive_cutoff(months=None, now=None):
+    """Момент N месяцев назад: брони, закончившиеся раньше, архивируются"""
+    if months is None:
+        months = getattr(settings, 'BOOKING_ARCHIVE_AFTER_MONTHS', 12)
+    now = now or timezone.now()
+    year, month = divmod(now.year * 12 + now.month - 1 - months, 12)
+    day = min(now.day, calendar.monthrange(year, month + 1)[1])
+    return now.replace(year=year, month=month + 1, day=day)
+
+
+def get_archivable_bookings(cutoff):
+    """Брони, закончившиеся до cutoff, без отзывов"""
+    return Booking.objects.filter(date_end__lt=cutoff, review__isnull=True)
+
+
+def copy_rows(cursor, source, target, column, ids, archived_at=None):
+    """INSERT INTO target (...) SELECT ... FROM source WHERE column IN (ids)"""
+    quote = connection.ops.quote_name
+    columns = [quote(field.column) for field in source._meta.concrete_fields]
+    target_columns = list(columns)
+    select_columns = list(columns)
+    params = []
+    if archived_at is not None:
+        target_columns.append(quote('archived_at'))
+        select_columns.append('%s')
+        params.append(connection.ops.adapt_datetimefield_value(archived_at))
+    
+    cursor.execute(
+        f'INSERT INTO {quote(target._meta.db_table)} ({", ".join(target_columns)}) '
+        f'SELECT {", ".join(select_columns)} FROM {quote(source._meta.db_table)} '
+        f'WHERE {quote(column)} IN ({", ".join(["%s"] * len(ids))})',
+        params + list(ids)
+    )
+
+
+def delete_rows(cursor, model, column, ids):
+    quote = connection.ops.quote_name
+    cursor.execute(
+        f'DELETE FROM {quote(model._meta.db_table)} WHERE {quote(column)} IN ({", ".join(["%s"] * len(ids))})',
+        list(ids)
+    )
+
+
+def archive_bookings(cutoff=None, chunk_size=1000):
+    """
+    Перенести брони, закончившиеся до cutoff, и их платежи в архив пачками по chunk_size.
+    Каждая пачка - отдельная транзакция; параллельные запуски пропускают
+    заблокированные строки (SKIP LOCKED). Возвращает количество перенесённых броней.
+    """
+    cutoff = cutoff or get_archive_cutoff()
+    candidates = get_archivable_bookings(cutoff).order_by('id').values_list('id', flat=True)
+    
+    archived = 0
+    while True:
+        with transaction.atomic():
+            ids = list(candidates.select_for_update(skip_locked=True, of=('self',))[:chunk_size])
+            if not ids:
+                break
+            
+            archived_at = timezone.now()
+            with connection.cursor() as cursor:
+                copy_rows(cursor, Booking, ArchivedBooking, 'id', ids, archived_at=archived_at)
+                copy_rows(cursor, Payment, ArchivedPayment, 'booking_id', ids)
+                delete_rows(cursor, Payment, 'booking_id', ids)
+                delete_rows(cursor, Booking, 'id', ids)
+        
+        archived += len(ids)
+        if len(ids) < chunk_size:
+            break
+    
+    return archived
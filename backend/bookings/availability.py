@@ -0,0 +1,168 @@
+"""
+Календарь занятости площадки за период.
+
+Все бронирования периода выбираются одним запросом по диапазону,
+пересекающиеся интервалы объединяются и раскладываются по дням
+в часовом поясе settings.TIME_ZONE. Результат кэшируется в пространстве
+имён slots; поколение площадки увеличивается при изменении её броней
+и входит в ETag, поэтому повторный запрос без изменений получает 304.
+Удержания неоплаченных броней истекают без изменения поколения, поэтому
+запись кэша живёт не дольше ближайшего истечения (valid_until, как в occupancy.py),
+а сам момент истечения входит в ETag.
+"""
+import hashlib
+import math
+import time as time_module
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from venues.cache_utils import (
+    BOOKINGS_GENERATION,
+    SLOTS_NAMESPACE,
+    bump_generation,
+    get_generations,
+    get_namespace_generation_name,
+    make_namespaced_key
+)
+from .models import ACTIVE_BOOKING_STATUSES, Booking, occupies_venue_q
+
+DATE_FORMAT = '%Y-%m-%d'
+END_OF_DAY = '24:00'
+
+
+def get_max_availability_days():
+    return getattr(settings, 'BOOKING_MAX_ADVANCE_DAYS', 90)
+
+
+def get_venue_slots_generation_name(venue_id):
+    return f'slots:venue:{venue_id}'
+
+
+def invalidate_venue_availability(venue_id):
+    """Сбросить кэш занятости площадки (вызывается при изменении её броней)"""
+    bump_generation(get_venue_slots_generation_name(venue_id))
+    # Списки площадок с фильтром по свободному времени зависят от всех броней
+    bump_generation(BOOKINGS_GENERATION)
+
+
+def parse_period(params):
+    """
+    Период из ?from=YYYY-MM-DD&to=YYYY-MM-DD (to включительно, по умолчанию равен from).
+    Возвращает (date_from, date_to) или бросает ValueError с текстом ошибки.
+    """
+    if not params.get('from'):
+        raise ValueError('Параметр from обязателен')
+    try:
+        date_from = datetime.strptime(params['from'], DATE_FORMAT).date()
+        date_to = datetime.strptime(params.get('to') or params['from'], DATE_FORMAT).date()
+    except ValueError:
+        raise ValueError('Неверный формат даты. Используйте YYYY-MM-DD')
+    
+    if date_to < date_from:
+        raise ValueError('Дата to должна быть не раньше from')
+    max_days = get_max_availability_days()
+    if (date_to - date_from).days + 1 > max_days:
+        raise ValueError(f'Период не может превышать {max_days} дней')
+    return date_from, date_to
+
+
+def get_day_start(day, tz):
+    return datetime.combine(day, time.min, tzinfo=tz)
+
+
+def get_day_bounds(day, tz):
+    """Границы локального дня [начало, начало следующего дня) - с учётом перехода на летнее время"""
+    return get_day_start(day, tz), get_day_start(day + timedelta(days=1), tz)
+
+
+def merge_intervals(intervals):
+    """Объединить пересекающиеся и смежные интервалы (вход отсортирован по началу)"""
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def split_by_day(intervals, period_start, period_end, tz):
+    """Разложить интервалы по локальным дням: {'YYYY-MM-DD': [['HH:MM', 'HH:MM'], ...]}"""
+    days = {}
+    for start, end in intervals:
+        cursor = max(start, period_start).astimezone(tz)
+        end = min(end, period_end).astimezone(tz)
+        while cursor < end:
+            day = cursor.date()
+            next_day_start = get_day_start(day + timedelta(days=1), tz)
+            segment_end = min(end, next_day_start)
+            days.setdefault(day.strftime(DATE_FORMAT), []).append([
+                cursor.strftime('%H:%M'),
+                END_OF_DAY if segment_end == next_day_start else segment_end.strftime('%H:%M')
+            ])
+            cursor = segment_end
+    return days
+
+
+def build_availability(venue_id, date_from, date_to):
+    """
+    Занятость площадки за период - один запрос к БД.
+    Возвращает (данные, valid_until) - timestamp истечения ближайшего удержания периода.
+    """
+    tz = timezone.get_default_timezone()
+    period_start = get_day_start(date_from, tz)
+    period_end = get_day_bounds(date_to, tz)[1]
+    
+    bookings = Booking.objects.filter(
+        occupies_venue_q(),
+        venue_id=venue_id,
+        status__in=ACTIVE_BOOKING_STATUSES,
+        date_start__lt=period_end,
+        date_end__gt=period_start
+    ).order_by('date_start').values_list('date_start', 'date_end', 'expires_at')
+    
+    valid_until = min(
+        (expires_at.timestamp() for _, _, expires_at in bookings if expires_at is not None),
+        default=math.inf
+    )
+    intervals = merge_intervals((date_start, date_end) for date_start, date_end, _ in bookings)
+    return {
+        'venue': venue_id,
+        'from': date_from.strftime(DATE_FORMAT),
+        'to': date_to.strftime(DATE_FORMAT),
+        'timezone': str(tz),
+        'days': split_by_day(intervals, period_start, period_end, tz),
+    }, valid_until
+
+
+def get_availability_generation(venue_id, date_from, date_to):
+    """Хеш версии пространства имён slots и поколения броней площадки - без запроса к БД"""
+    version, generation = get_generations([
+        get_namespace_generation_name(SLOTS_NAMESPACE),
+        get_venue_slots_generation_name(venue_id)
+    ])
+    raw = f'{venue_id}:{date_from}:{date_to}:{settings.TIME_ZONE}:{version}:{generation}'
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def get_availability(venue_id, date_from, date_to):
+    """
+    Занятость площадки из кэша или из БД: (данные, ETag).
+    Запись кэша с истёкшим удержанием пересобирается; ETag включает valid_until,
+    поэтому истечение удержания меняет ETag так же, как новая бронь.
+    """
+    generation = get_availability_generation(venue_id, date_from, date_to)
+    cache_key = make_namespaced_key(SLOTS_NAMESPACE, f'availability:{generation}', version=0)
+    now = time_module.time()
+    cached = cache.get(cache_key)
+    if cached is None or cached[1] <= now:
+        cached = build_availability(venue_id, date_from, date_to)
+        ttl = settings.CACHE_TTL.get('venue_availability', 60 * 5)
+        if cached[1] < math.inf:
+            ttl = min(ttl, max(1, math.ceil(cached[1] - now)))
+        cache.set(cache_key, cached, ttl)
+    data, valid_until = cached
+    etag = hashlib.md5(f'{generation}:{valid_until}'.encode('utf-8')).hexdigest()
+    return data, etag
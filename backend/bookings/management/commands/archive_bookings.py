@@ -0,0 +1,33 @@
+"""
+Перенос старых бронирований и платежей в архивные таблицы
+"""
+from django.core.management.base import BaseCommand
+import logging
+from bookings.archive import archive_bookings, get_archive_cutoff
+
+logger = logging.getLogger('bookings')
+
+
+class Command(BaseCommand):
+    help = 'Переносит брони, закончившиеся больше N месяцев назад, и их платежи в bookings_archive/payments_archive'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=None,
+            help='Возраст брони в месяцах (по умолчанию BOOKING_ARCHIVE_AFTER_MONTHS)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько броней переносить в одной транзакции (по умолчанию 1000)'
+        )
+    
+    def handle(self, *args, **options):
+        cutoff = get_archive_cutoff(options['months'])
+        archived = archive_bookings(cutoff, chunk_size=options['chunk_size'])
+        
+        logger.info(f'Bookings archived: count={archived}, cutoff={cutoff.isoformat()}')
+        self.stdout.write(self.style.SUCCESS(f'Перенесено в архив броней: {archived}'))
@@ -0,0 +1,26 @@
+"""
+Снятие истёкших удержаний неоплаченных бронирований
+"""
+from django.core.management.base import BaseCommand
+import logging
+from bookings.services import expire_stale_holds
+
+logger = logging.getLogger('bookings')
+
+
+class Command(BaseCommand):
+    help = 'Переводит неоплаченные брони с истёкшим удержанием в статус expired, их платежи - в failed'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько броней обрабатывать в одной транзакции (по умолчанию 500)'
+        )
+    
+    def handle(self, *args, **options):
+        expired = expire_stale_holds(batch_size=options['batch_size'])
+        
+        logger.info(f'Booking holds expired: count={expired}')
+        self.stdout.write(self.style.SUCCESS(f'Снято удержаний: {expired}'))
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:40
+
+from django.db import migrations
+
+
+def create_overlap_constraint(apps, schema_editor):
+    """
+    Exclusion constraint: активные брони одной площадки не могут пересекаться.
+    GiST-индекс по (venue_id, tstzrange) используется и для проверки доступности.
+    На других БД защита обеспечивается блокировкой строки площадки при создании брони.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        "ALTER TABLE bookings ADD CONSTRAINT bookings_no_overlap EXCLUDE USING gist ("
+        "venue_id WITH =, tstzrange(date_start, date_end, '[)') WITH &&"
+        ") WHERE (status IN ('pending', 'confirmed'))"
+    )
+
+
+def drop_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE bookings DROP CONSTRAINT IF EXISTS bookings_no_overlap')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_overlap_constraint, drop_overlap_constraint),
+    ]
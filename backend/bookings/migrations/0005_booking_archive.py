@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('venues', '0007_query_indexes'),
+        ('bookings', '0004_booking_hold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_start', models.DateTimeField(verbose_name='Начало аренды')),
+                ('date_end', models.DateTimeField(verbose_name='Конец аренды')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает подтверждения'), ('confirmed', 'Подтверждено'), ('cancelled', 'Отменено'), ('expired', 'Истекло')], max_length=20, verbose_name='Статус')),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Общая цена')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Удержание до')),
+                ('archived_at', models.DateTimeField(verbose_name='Дата архивации')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to='venues.venue', verbose_name='Площадка')),
+            ],
+            options={
+                'verbose_name': 'Архивное бронирование',
+                'verbose_name_plural': 'Архивные бронирования',
+                'db_table': 'bookings_archive',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPayment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Сумма')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает оплаты'), ('paid', 'Оплачено'), ('failed', 'Ошибка')], max_length=20, verbose_name='Статус')),
+                ('payment_method', models.CharField(choices=[('card', 'Банковская карта'), ('cash', 'Наличные'), ('transfer', 'Банковский перевод')], max_length=50, verbose_name='Способ оплаты')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='bookings.archivedbooking', verbose_name='Бронирование')),
+            ],
+            options={
+                'verbose_name': 'Архивный платеж',
+                'verbose_name_plural': 'Архивные платежи',
+                'db_table': 'payments_archive',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedbooking',
+            index=models.Index(fields=['user', '-created_at'], name='bookings_archive_user_created'),
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import connection, models
+from django.db.models import Q
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
@@ -6,6 +7,48 @@ from venues.models import Venue
 from django.utils import timezone
 from datetime import timedelta
 
+# Статусы, при которых бронирование занимает площадку
+ACTIVE_BOOKING_STATUSES = ('pending', 'confirmed')
+
+# Статус брони, удержание которой истекло без подтверждения
+EXPIRED_BOOKING_STATUS = 'expired'
+
+# Exclusion constraint PostgreSQL (миграция 0002): активные брони одной площадки не пересекаются
+BOOKING_OVERLAP_CONSTRAINT = 'bookings_no_overlap'
+
+
+def uses_overlap_constraint():
+    """Защищена ли таблица броней exclusion constraint (только PostgreSQL)"""
+    return connection.vendor == 'postgresql'
+
+
+def is_overlap_violation(error):
+    """Нарушен ли exclusion constraint пересечения броней"""
+    return BOOKING_OVERLAP_CONSTRAINT in str(error)
+
+
+def get_hold_expiry(now=None):
+    """До какого момента новая неподтверждённая бронь удерживает слот"""
+    now = now or timezone.now()
+    return now + timedelta(minutes=getattr(settings, 'BOOKING_HOLD_MINUTES', 30))
+
+
+def occupies_venue_q(now=None):
+    """
+    Условие "бронь занимает площадку": подтверждена или ожидает подтверждения
+    и удержание ещё не истекло (expires_at пуст - удержание без срока).
+    """
+    now = now or timezone.now()
+    return Q(status='confirmed') | (
+        Q(status='pending') & (Q(expires_at__isnull=True) | Q(expires_at__gt=now))
+    )
+
+
+class TsTzRange(models.Func):
+    """tstzrange(date_start, date_end, '[)') - то же выражение, что и в exclusion constraint"""
+    function = 'TSTZRANGE'
+    template = "%(function)s(%(expressions)s, '[)')"
+
 
 class Booking(models.Model):
     """Бронирование площадки"""
@@ -14,6 +57,7 @@ class Booking(models.Model):
         ('pending', 'Ожидает подтверждения'),
         ('confirmed', 'Подтверждено'),
         ('cancelled', 'Отменено'),
+        (EXPIRED_BOOKING_STATUS, 'Истекло'),
     ]
     
     user = models.ForeignKey(
@@ -33,12 +77,25 @@ class Booking(models.Model):
     status = models.CharField('Статус', max_length=20, choices=STATUS_CHOICES, default='pending')
     total_price = models.DecimalField('Общая цена', max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    # Неоплаченная бронь удерживает слот до этого момента, затем снимается командой expire_booking_holds
+    expires_at = models.DateTimeField('Удержание до', null=True, blank=True)
     
     class Meta:
         db_table = 'bookings'
         verbose_name = 'Бронирование'
         verbose_name_plural = 'Бронирования'
         ordering = ['-created_at']
+        indexes = [
+            # Проверка доступности и занятость площадки: venue = ? AND status IN (...) AND date_start < ?
+            models.Index(fields=['venue', 'status', 'date_start'], name='bookings_venue_status_start'),
+            # Список бронирований пользователя, новые сверху
+            models.Index(fields=['user', '-created_at'], name='bookings_user_created'),
+            # Поиск истёкших удержаний: status = 'pending' AND expires_at <= ?
+            models.Index(
+                fields=['expires_at'], name='bookings_pending_expires',
+                condition=Q(status='pending')
+            ),
+        ]
     
     def __str__(self):
         return f"Бронь #{self.id} - {self.venue.title} ({self.get_status_display()})"
@@ -68,9 +125,13 @@ class Booking(models.Model):
         if errors:
             raise ValidationError(errors)
     
-    def save(self, *args, **kwargs):
-        """Переопределение save для вызова валидации"""
-        self.full_clean()
+    def save(self, *args, validate=True, **kwargs):
+        """
+        Переопределение save для вызова валидации.
+        validate=False - данные уже проверены вызывающим кодом (bookings.services)
+        """
+        if validate:
+            self.full_clean()
         super().save(*args, **kwargs)
     
     def calculate_total_price(self):
@@ -85,19 +146,38 @@ class Booking(models.Model):
         """Проверка, прошло ли бронирование"""
         return self.date_end < timezone.now()
     
+    def is_hold_expired(self):
+        """Истекло ли удержание: бронь уже снята (expired) или срок удержания неподтверждённой брони прошёл"""
+        if self.status == EXPIRED_BOOKING_STATUS:
+            return True
+        return self.status == 'pending' and self.expires_at is not None and self.expires_at <= timezone.now()
+    
     def can_be_cancelled(self):
         """Можно ли отменить бронирование"""
         return self.status in ['pending', 'confirmed'] and not self.is_past()
     
+    @staticmethod
+    def get_overlapping(venue, date_start, date_end):
+        """Активные бронирования площадки (без истёкших удержаний), пересекающиеся с периодом"""
+        overlapping = Booking.objects.filter(occupies_venue_q(), venue=venue, status__in=ACTIVE_BOOKING_STATUSES)
+        
+        if uses_overlap_constraint():
+            from django.contrib.postgres.fields import DateTimeRangeField
+            from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+            
+            # Пересечение диапазонов по тому же выражению, что и в GiST-индексе constraint
+            overlapping = overlapping.annotate(
+                period=TsTzRange('date_start', 'date_end', output_field=DateTimeRangeField())
+            ).filter(period__overlap=DateTimeTZRange(date_start, date_end, '[)'))
+        else:
+            overlapping = overlapping.filter(date_start__lt=date_end, date_end__gt=date_start)
+        
+        return overlapping
+    
     @staticmethod
     def check_availability(venue, date_start, date_end, exclude_booking_id=None):
         """Проверить доступность площадки на указанный период"""
-        overlapping = Booking.objects.filter(
-            venue=venue,
-            status__in=['pending', 'confirmed'],
-            date_start__lt=date_end,
-            date_end__gt=date_start
-        )
+        overlapping = Booking.get_overlapping(venue, date_start, date_end)
         
         if exclude_booking_id:
             overlapping = overlapping.exclude(id=exclude_booking_id)
@@ -136,7 +216,74 @@ class Payment(models.Model):
         verbose_name = 'Платеж'
         verbose_name_plural = 'Платежи'
         ordering = ['-created_at']
+        indexes = [
+            # Платежи бронирования в нужном статусе (booking.payments.filter(status=...))
+            models.Index(fields=['booking', 'status'], name='payments_booking_status'),
+        ]
     
     def __str__(self):
         return f"Платеж #{self.id} - {self.amount} руб. ({self.get_status_display()})"
 
+
+
+class ArchivedBooking(models.Model):
+    """
+    Архивное бронирование: завершённые брони старше BOOKING_ARCHIVE_AFTER_MONTHS
+    переносятся сюда из bookings командой archive_bookings с сохранением id.
+    Колонки совпадают с Booking, чтобы перенос выполнялся через INSERT ... SELECT.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_bookings',
+        verbose_name='Пользователь'
+    )
+    venue = models.ForeignKey(
+        Venue,
+        on_delete=models.CASCADE,
+        related_name='archived_bookings',
+        verbose_name='Площадка'
+    )
+    date_start = models.DateTimeField('Начало аренды')
+    date_end = models.DateTimeField('Конец аренды')
+    status = models.CharField('Статус', max_length=20, choices=Booking.STATUS_CHOICES)
+    total_price = models.DecimalField('Общая цена', max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField('Дата создания')
+    expires_at = models.DateTimeField('Удержание до', null=True, blank=True)
+    archived_at = models.DateTimeField('Дата архивации')
+    
+    class Meta:
+        db_table = 'bookings_archive'
+        verbose_name = 'Архивное бронирование'
+        verbose_name_plural = 'Архивные бронирования'
+        ordering = ['-created_at']
+        indexes = [
+            # История пользователя, новые сверху (GET /api/bookings/?archived=true)
+            models.Index(fields=['user', '-created_at'], name='bookings_archive_user_created'),
+        ]
+    
+    def __str__(self):
+        return f"Архивная бронь #{self.id} ({self.get_status_display()})"
+
+
+class ArchivedPayment(models.Model):
+    """Архивный платёж архивного бронирования (колонки совпадают с Payment)"""
+    booking = models.ForeignKey(
+        ArchivedBooking,
+        on_delete=models.CASCADE,
+        related_name='payments',
+        verbose_name='Бронирование'
+    )
+    amount = models.DecimalField('Сумма', max_digits=10, decimal_places=2)
+    status = models.CharField('Статус', max_length=20, choices=Payment.STATUS_CHOICES)
+    payment_method = models.CharField('Способ оплаты', max_length=50, choices=Payment.PAYMENT_METHOD_CHOICES)
+    created_at = models.DateTimeField('Дата создания')
+    
+    class Meta:
+        db_table = 'payments_archive'
+        verbose_name = 'Архивный платеж'
+        verbose_name_plural = 'Архивные платежи'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Архивный платеж #{self.id} - {self.amount} руб."
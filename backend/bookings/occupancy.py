@@ -0,0 +1,253 @@
+"""
+Индекс занятости площадок в памяти процесса.
+
+Для каждой площадки хранятся отсортированные и объединённые интервалы
+активных броней, заканчивающихся после момента загрузки (горизонта), в виде
+двух массивов array('d') с timestamp начала и конца. Интервалы не пересекаются,
+поэтому оба массива отсортированы и пересечение с периодом ищется бинарным
+поиском за O(log n) без обращения к БД.
+
+Индекс площадки загружается лениво при первом запросе. Сигналы броней
+увеличивают поколение slots:venue:<id> в общем кэше; запись индекса помнит
+поколение, с которым загружена, поэтому изменение в любом воркере сбрасывает
+индекс во всех. При BOOKING_OCCUPANCY_REDIS_MIRROR интервалы дополнительно
+хранятся в Redis (sorted set), и воркеры загружают их оттуда, а не из БД.
+
+Индекс - быстрый путь для чтения. Окончательную проверку при создании брони
+по-прежнему выполняет БД (exclusion constraint или блокировка площадки).
+"""
+import bisect
+import logging
+import math
+import time
+from array import array
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+from venues.cache_utils import (
+    SLOTS_NAMESPACE,
+    get_generations,
+    get_namespace_generation_name,
+    make_namespaced_key
+)
+from .availability import (
+    get_day_start,
+    get_venue_slots_generation_name,
+    invalidate_venue_availability,
+    merge_intervals
+)
+from .models import ACTIVE_BOOKING_STATUSES, Booking, occupies_venue_q
+
+logger = logging.getLogger('bookings')
+
+# Индексы площадок этого процесса: venue_id -> VenueOccupancy
+_occupancy = {}
+
+
+class VenueOccupancy:
+    """
+    Объединённые интервалы занятости площадки, заканчивающиеся после горизонта.
+    valid_until - timestamp истечения ближайшего удержания неоплаченной брони:
+    после него индекс нужно перечитать.
+    """
+    __slots__ = ('starts', 'ends', 'horizon', 'generation', 'loaded_at', 'valid_until')
+    
+    def __init__(self, intervals, horizon, generation, valid_until=math.inf):
+        self.starts = array('d', [start for start, _ in intervals])
+        self.ends = array('d', [end for _, end in intervals])
+        self.horizon = horizon
+        self.generation = generation
+        self.loaded_at = time.monotonic()
+        self.valid_until = valid_until
+    
+    def __len__(self):
+        return len(self.starts)
+    
+    def covers(self, start_ts):
+        """Есть ли в индексе все брони, которые могут пересекаться с периодом от start_ts"""
+        return start_ts >= self.horizon
+    
+    def overlaps(self, start_ts, end_ts):
+        """Пересекается ли [start_ts, end_ts) с какой-либо бронью"""
+        index = bisect.bisect_left(self.starts, end_ts) - 1
+        return index >= 0 and self.ends[index] > start_ts
+    
+    def between(self, start_ts, end_ts):
+        """Интервалы, пересекающиеся с [start_ts, end_ts)"""
+        first = bisect.bisect_right(self.ends, start_ts)
+        last = bisect.bisect_left(self.starts, end_ts)
+        return list(zip(self.starts[first:last], self.ends[first:last]))
+
+
+def is_enabled():
+    return getattr(settings, 'BOOKING_OCCUPANCY_INDEX_ENABLED', True)
+
+
+def uses_redis_mirror():
+    return getattr(settings, 'BOOKING_OCCUPANCY_REDIS_MIRROR', False)
+
+
+def get_occupancy_generation(venue_id):
+    """Версия пространства имён slots и поколение броней площадки - одним запросом к кэшу"""
+    return tuple(get_generations([
+        get_namespace_generation_name(SLOTS_NAMESPACE),
+        get_venue_slots_generation_name(venue_id)
+    ]))
+
+
+def load_intervals_from_db(venue_id, horizon):
+    """Объединённые интервалы и момент истечения ближайшего удержания"""
+    bookings = list(Booking.objects.filter(
+        occupies_venue_q(),
+        venue_id=venue_id,
+        status__in=ACTIVE_BOOKING_STATUSES,
+        date_end__gt=datetime.fromtimestamp(horizon, tz=dt_timezone.utc)
+    ).order_by('date_start').values_list('date_start', 'date_end', 'expires_at'))
+    
+    valid_until = min(
+        (expires_at.timestamp() for _, _, expires_at in bookings if expires_at is not None),
+        default=math.inf
+    )
+    intervals = merge_intervals(
+        (date_start.timestamp(), date_end.timestamp()) for date_start, date_end, _ in bookings
+    )
+    return intervals, valid_until
+
+
+def get_mirror_key(venue_id, generation):
+    namespace_version, venue_generation = generation
+    key = make_namespaced_key(SLOTS_NAMESPACE, f'occupancy:{venue_id}:{venue_generation}', namespace_version)
+    return cache.make_key(key)
+
+
+def read_mirror(venue_id, generation):
+    """Интервалы, горизонт и срок актуальности из Redis или None, если копии нет"""
+    from django_redis import get_redis_connection
+    
+    key = get_mirror_key(venue_id, generation)
+    pipe = get_redis_connection('default').pipeline()
+    pipe.get(f'{key}:horizon')
+    pipe.zrange(key, 0, -1, withscores=True)
+    bounds, members = pipe.execute()
+    if bounds is None:
+        return None
+    
+    horizon, valid_until = (float(value) for value in bounds.decode().split(':'))
+    if valid_until <= time.time():
+        return None
+    intervals = [(start, float(member.decode().split(':')[1])) for member, start in members]
+    return intervals, horizon, valid_until
+
+
+def write_mirror(venue_id, generation, intervals, horizon, valid_until):
+    from django_redis import get_redis_connection
+    
+    key = get_mirror_key(venue_id, generation)
+    ttl = settings.CACHE_TTL.get('venue_availability', 60 * 5)
+    pipe = get_redis_connection('default').pipeline()
+    pipe.delete(key)
+    if intervals:
+        pipe.zadd(key, {f'{start}:{end}': start for start, end in intervals})
+        pipe.expire(key, ttl)
+    pipe.set(f'{key}:horizon', f'{horizon}:{valid_until}', ex=ttl)
+    pipe.execute()
+
+
+def load_venue_occupancy(venue_id, generation):
+    """Загрузить индекс площадки из Redis (если включено) или из БД"""
+    if uses_redis_mirror():
+        try:
+            mirrored = read_mirror(venue_id, generation)
+            if mirrored is not None:
+                return VenueOccupancy(*mirrored[:2], generation, valid_until=mirrored[2])
+        except Exception as e:
+            logger.warning(f'Occupancy mirror read failed for venue {venue_id}: {e}')
+    
+    # Горизонт - начало текущего дня, чтобы индекс отвечал и на запросы занятости за сегодня
+    horizon = get_day_start(timezone.localdate(), timezone.get_default_timezone()).timestamp()
+    intervals, valid_until = load_intervals_from_db(venue_id, horizon)
+    
+    if uses_redis_mirror() and is_shareable():
+        try:
+            write_mirror(venue_id, generation, intervals, horizon, valid_until)
+        except Exception as e:
+            logger.warning(f'Occupancy mirror write failed for venue {venue_id}: {e}')
+    
+    return VenueOccupancy(intervals, horizon, generation, valid_until=valid_until)
+
+
+def is_shareable():
+    """
+    Можно ли сохранить прочитанное из БД для других запросов.
+    Внутри транзакции видны её незакоммиченные изменения, а откат не меняет
+    поколение - такой индекс используется только для текущего вызова.
+    """
+    return not connection.in_atomic_block
+
+
+def get_venue_occupancy(venue_id):
+    """Актуальный индекс площадки (перечитывается при смене поколения, по TTL или после истечения удержания)"""
+    generation = get_occupancy_generation(venue_id)
+    occupancy = _occupancy.get(venue_id)
+    ttl = getattr(settings, 'BOOKING_OCCUPANCY_LOCAL_TTL', 60)
+    
+    if (occupancy is None or occupancy.generation != generation
+            or time.monotonic() - occupancy.loaded_at > ttl
+            or time.time() >= occupancy.valid_until):
+        occupancy = load_venue_occupancy(venue_id, generation)
+        if not is_shareable():
+            return occupancy
+        _occupancy.pop(venue_id, None)
+        if len(_occupancy) >= getattr(settings, 'BOOKING_OCCUPANCY_MAX_VENUES', 1000):
+            # Вытесняем площадку, загруженную раньше всех
+            _occupancy.pop(next(iter(_occupancy)))
+        _occupancy[venue_id] = occupancy
+    return occupancy
+
+
+def is_venue_busy(venue_id, date_start, date_end):
+    """
+    Пересекается ли период с активными бронями площадки.
+    None - индекс не может ответить (выключен или период раньше горизонта).
+    """
+    if not is_enabled():
+        return None
+    start_ts, end_ts = date_start.timestamp(), date_end.timestamp()
+    occupancy = get_venue_occupancy(venue_id)
+    if not occupancy.covers(start_ts):
+        return None
+    return occupancy.overlaps(start_ts, end_ts)
+
+
+def get_occupied_intervals(venue_id, date_start, date_end):
+    """
+    Объединённые интервалы занятости площадки, пересекающиеся с периодом,
+    в виде пар datetime (UTC). None - индекс не может ответить.
+    """
+    if not is_enabled():
+        return None
+    start_ts, end_ts = date_start.timestamp(), date_end.timestamp()
+    occupancy = get_venue_occupancy(venue_id)
+    if not occupancy.covers(start_ts):
+        return None
+    return [
+        (datetime.fromtimestamp(start, tz=dt_timezone.utc), datetime.fromtimestamp(end, tz=dt_timezone.utc))
+        for start, end in occupancy.between(start_ts, end_ts)
+    ]
+
+
+def invalidate_venue_occupancy(venue_id):
+    """Сбросить индекс площадки в этом процессе (остальные увидят новое поколение)"""
+    _occupancy.pop(venue_id, None)
+
+
+def invalidate_venue_slots(venue_id):
+    """Сбросить кэш календаря и индекс занятости площадки"""
+    invalidate_venue_availability(venue_id)
+    invalidate_venue_occupancy(venue_id)
+
+
+def clear_occupancy_index():
+    _occupancy.clear()
@@ -1,12 +1,31 @@
 from rest_framework import serializers
 from django.utils import timezone
 from django.conf import settings
+from django.core.files.storage import default_storage
 from datetime import timedelta
-from .models import Booking, Payment
+from .models import ACTIVE_BOOKING_STATUSES, ArchivedBooking, Booking, Payment
+from venues.models import Venue
+from .occupancy import is_venue_busy
+from .services import (
+    RECURRENCE_STEPS,
+    SLOT_CREATED,
+    SLOT_CONFLICT,
+    SLOT_SKIPPED,
+    BookingConflictError,
+    create_booking,
+    create_bookings_bulk,
+    expand_recurrence,
+    update_booking_status
+)
 from venues.serializers import VenueListSerializer
+from rentalall.serializers import SparseModelSerializer, is_expanded
 
 
-class BookingSerializer(serializers.ModelSerializer):
+BOOKING_OVERLAP_MESSAGE = 'Площадка недоступна на выбранное время. Пожалуйста, выберите другой временной слот.'
+BOOKING_HOLD_EXPIRED_MESSAGE = 'Время удержания брони истекло. Создайте бронирование заново.'
+
+
+class BookingSerializer(SparseModelSerializer):
     """Сериализатор для отображения бронирования"""
     venue_details = VenueListSerializer(source='venue', read_only=True)
     user_name = serializers.CharField(source='user.full_name', read_only=True)
@@ -31,6 +50,79 @@ class BookingSerializer(serializers.ModelSerializer):
         return hasattr(obj, 'review')
 
 
+class ArchivedBookingSerializer(SparseModelSerializer):
+    """
+    Сериализатор архивного бронирования (GET /api/bookings/?archived=true).
+    Формат совпадает с BookingSerializer; архивные брони только для чтения.
+    """
+    venue_details = VenueListSerializer(source='venue', read_only=True)
+    user_name = serializers.CharField(source='user.full_name', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    can_be_cancelled = serializers.SerializerMethodField()
+    has_review = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ArchivedBooking
+        fields = (
+            'id', 'user', 'user_name', 'venue', 'venue_details', 'date_start',
+            'date_end', 'status', 'status_display', 'total_price', 'created_at',
+            'can_be_cancelled', 'has_review', 'archived_at'
+        )
+        read_only_fields = fields
+    
+    def get_can_be_cancelled(self, obj):
+        return False
+    
+    def get_has_review(self, obj):
+        """Брони с отзывами не архивируются"""
+        return False
+
+
+def validate_booking_period(date_start, date_end):
+    """Проверка периода бронирования: не в прошлом, не дальше BOOKING_MAX_ADVANCE_DAYS, допустимая длительность"""
+    # Получаем настройки бронирования
+    min_duration_hours = getattr(settings, 'BOOKING_MIN_DURATION_HOURS', 1)
+    max_duration_hours = getattr(settings, 'BOOKING_MAX_DURATION_HOURS', 24)
+    max_advance_days = getattr(settings, 'BOOKING_MAX_ADVANCE_DAYS', 90)
+    
+    now = timezone.now()
+    
+    # Проверка, что дата начала не в прошлом
+    if date_start < now:
+        raise serializers.ValidationError({
+            'date_start': 'Дата начала не может быть в прошлом'
+        })
+    
+    # Проверка максимального срока бронирования заранее
+    max_future_date = now + timedelta(days=max_advance_days)
+    if date_start > max_future_date:
+        raise serializers.ValidationError({
+            'date_start': f'Бронирование доступно максимум за {max_advance_days} дней'
+        })
+    
+    # Проверка, что дата окончания после даты начала
+    if date_end <= date_start:
+        raise serializers.ValidationError({
+            'date_end': 'Дата окончания должна быть после даты начала'
+        })
+    
+    # Проверка длительности бронирования
+    duration = date_end - date_start
+    duration_hours = duration.total_seconds() / 3600
+    
+    # Минимальная длительность
+    if duration_hours < min_duration_hours:
+        raise serializers.ValidationError({
+            'date_end': f'Минимальная длительность бронирования - {min_duration_hours} ч.'
+        })
+    
+    # Максимальная длительность
+    if duration_hours > max_duration_hours:
+        raise serializers.ValidationError({
+            'date_end': f'Максимальная длительность бронирования - {max_duration_hours} ч.'
+        })
+
+
 class BookingCreateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания бронирования"""
     
@@ -44,68 +136,155 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         date_end = attrs.get('date_end')
         venue = attrs.get('venue')
         
-        # Получаем настройки бронирования
-        min_duration_hours = getattr(settings, 'BOOKING_MIN_DURATION_HOURS', 1)
-        max_duration_hours = getattr(settings, 'BOOKING_MAX_DURATION_HOURS', 24)
-        max_advance_days = getattr(settings, 'BOOKING_MAX_ADVANCE_DAYS', 90)
-        
-        now = timezone.now()
-        
-        # Проверка, что дата начала не в прошлом
-        if date_start < now:
-            raise serializers.ValidationError({
-                'date_start': 'Дата начала не может быть в прошлом'
-            })
-        
-        # Проверка максимального срока бронирования заранее
-        max_future_date = now + timedelta(days=max_advance_days)
-        if date_start > max_future_date:
-            raise serializers.ValidationError({
-                'date_start': f'Бронирование доступно максимум за {max_advance_days} дней'
-            })
+        validate_booking_period(date_start, date_end)
         
-        # Проверка, что дата окончания после даты начала
-        if date_end <= date_start:
+        # Проверка, что площадка активна
+        if not venue.is_active:
             raise serializers.ValidationError({
-                'date_end': 'Дата окончания должна быть после даты начала'
+                'venue': 'Площадка недоступна для бронирования'
             })
         
-        # Проверка длительности бронирования
-        duration = date_end - date_start
-        duration_hours = duration.total_seconds() / 3600
+        # Проверка доступности площадки: сначала по индексу занятости в памяти,
+        # в БД - только если индекс не может ответить. Окончательная проверка - в create()
+        busy = is_venue_busy(venue.id, date_start, date_end)
+        if busy is None:
+            busy = not Booking.check_availability(venue, date_start, date_end)
+        if busy:
+            raise serializers.ValidationError({'venue': BOOKING_OVERLAP_MESSAGE})
         
-        # Минимальная длительность
-        if duration_hours < min_duration_hours:
-            raise serializers.ValidationError({
-                'date_end': f'Минимальная длительность бронирования - {min_duration_hours} ч.'
-            })
-        
-        # Максимальная длительность
-        if duration_hours > max_duration_hours:
-            raise serializers.ValidationError({
-                'date_end': f'Максимальная длительность бронирования - {max_duration_hours} ч.'
-            })
+        return attrs
+    
+    def create(self, validated_data):
+        """
+        Создание бронирования через bookings.services.create_booking.
+        Проверка в validate() выполняется без блокировок, поэтому параллельные запросы
+        ловятся в сервисе: под блокировкой строки площадки и exclusion constraint.
+        """
+        try:
+            return create_booking(**validated_data)
+        except BookingConflictError:
+            raise serializers.ValidationError({'venue': BOOKING_OVERLAP_MESSAGE})
+
+
+class BookingIntervalSerializer(serializers.Serializer):
+    """Период одной брони серии"""
+    date_start = serializers.DateTimeField()
+    date_end = serializers.DateTimeField()
+
+
+class RecurrenceSerializer(serializers.Serializer):
+    """Правило повторения серии (подмножество RRULE): freq, interval, count или until"""
+    freq = serializers.ChoiceField(choices=list(RECURRENCE_STEPS))
+    interval = serializers.IntegerField(min_value=1, max_value=52, default=1)
+    count = serializers.IntegerField(min_value=1, required=False)
+    until = serializers.DateField(required=False)
+    
+    def validate(self, attrs):
+        if 'count' not in attrs and 'until' not in attrs:
+            raise serializers.ValidationError('Укажите count или until')
+        return attrs
+
+
+class BookingBulkCreateSerializer(serializers.Serializer):
+    """
+    Серия бронирований одной площадки: явный список intervals или
+    первый период (date_start, date_end) и правило recurrence.
+    allow_partial=True - создать свободные слоты, даже если часть серии недоступна.
+    """
+    venue = serializers.PrimaryKeyRelatedField(queryset=Venue.objects.all())
+    intervals = BookingIntervalSerializer(many=True, required=False)
+    date_start = serializers.DateTimeField(required=False)
+    date_end = serializers.DateTimeField(required=False)
+    recurrence = RecurrenceSerializer(required=False)
+    allow_partial = serializers.BooleanField(default=False)
+    
+    def validate(self, attrs):
+        max_slots = getattr(settings, 'BOOKING_BULK_MAX_SLOTS', 52)
         
-        # Проверка, что площадка активна
-        if not venue.is_active:
+        if not attrs['venue'].is_active:
             raise serializers.ValidationError({
                 'venue': 'Площадка недоступна для бронирования'
             })
         
-        # Проверка доступности площадки
-        if not Booking.check_availability(venue, date_start, date_end):
-            raise serializers.ValidationError({
-                'venue': 'Площадка недоступна на выбранное время. Пожалуйста, выберите другой временной слот.'
-            })
+        if 'intervals' in attrs:
+            if 'recurrence' in attrs:
+                raise serializers.ValidationError('Укажите либо intervals, либо recurrence')
+            periods = [(item['date_start'], item['date_end']) for item in attrs['intervals']]
+        elif 'recurrence' in attrs:
+            if 'date_start' not in attrs or 'date_end' not in attrs:
+                raise serializers.ValidationError('Для recurrence нужны date_start и date_end первого слота')
+            if attrs['date_end'] <= attrs['date_start']:
+                raise serializers.ValidationError({
+                    'date_end': 'Дата окончания должна быть после даты начала'
+                })
+            periods = expand_recurrence(
+                attrs['date_start'], attrs['date_end'], limit=max_slots, **attrs['recurrence']
+            )
+        else:
+            raise serializers.ValidationError('Укажите intervals или recurrence')
+        
+        if not periods:
+            raise serializers.ValidationError('Серия не содержит ни одного слота')
+        if len(periods) > max_slots:
+            raise serializers.ValidationError(f'Серия не может содержать больше {max_slots} слотов')
         
+        # Ошибки отдельных слотов не отклоняют запрос - они возвращаются в результатах
+        slots = []
+        for date_start, date_end in periods:
+            try:
+                validate_booking_period(date_start, date_end)
+                errors = None
+            except serializers.ValidationError as e:
+                errors = e.detail
+            slots.append({'date_start': date_start, 'date_end': date_end, 'errors': errors})
+        attrs['slots'] = slots
         return attrs
     
     def create(self, validated_data):
-        """Создание бронирования с автоматическим расчетом цены"""
-        booking = Booking(**validated_data)
-        booking.total_price = booking.calculate_total_price()
-        booking.save()
-        return booking
+        """
+        Создание серии через bookings.services.create_bookings_bulk.
+        Возвращает сводку с результатом по каждому слоту в порядке запроса.
+        """
+        slots = validated_data['slots']
+        allow_partial = validated_data['allow_partial']
+        valid = [slot for slot in slots if not slot['errors']]
+        
+        outcomes = []
+        if valid and (allow_partial or len(valid) == len(slots)):
+            try:
+                outcomes = create_bookings_bulk(
+                    validated_data['user'], validated_data['venue'],
+                    [(slot['date_start'], slot['date_end']) for slot in valid],
+                    allow_partial=allow_partial
+                )
+            except BookingConflictError:
+                raise serializers.ValidationError({'venue': BOOKING_OVERLAP_MESSAGE})
+        outcomes = iter(outcomes)
+        
+        datetime_field = serializers.DateTimeField()
+        price_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+        results = []
+        for slot in slots:
+            result = {
+                'date_start': datetime_field.to_representation(slot['date_start']),
+                'date_end': datetime_field.to_representation(slot['date_end']),
+            }
+            if slot['errors']:
+                result.update(status='invalid', errors=slot['errors'])
+            else:
+                slot_status, booking = next(outcomes, (SLOT_SKIPPED, None))
+                result['status'] = slot_status
+                if slot_status == SLOT_CREATED:
+                    result.update(id=booking.id, total_price=price_field.to_representation(booking.total_price))
+                elif slot_status == SLOT_CONFLICT:
+                    result['error'] = BOOKING_OVERLAP_MESSAGE
+            results.append(result)
+        
+        return {
+            'venue': validated_data['venue'].id,
+            'created': sum(result['status'] == SLOT_CREATED for result in results),
+            'results': results,
+        }
 
 
 class BookingUpdateSerializer(serializers.ModelSerializer):
@@ -127,11 +306,57 @@ class BookingUpdateSerializer(serializers.ModelSerializer):
                 )
         
         return value
+    
+    def update(self, instance, validated_data):
+        """
+        Смена статуса через bookings.services.update_booking_status: возврат брони
+        в активный статус проверяется на пересечение под блокировкой площадки.
+        """
+        if 'status' not in validated_data:
+            return instance
+        try:
+            return update_booking_status(instance, validated_data['status'])
+        except BookingConflictError:
+            raise serializers.ValidationError({'status': BOOKING_OVERLAP_MESSAGE})
 
 
-class PaymentSerializer(serializers.ModelSerializer):
-    """Сериализатор для платежа"""
-    booking_details = BookingSerializer(source='booking', read_only=True)
+class PaymentBookingSerializer(SparseModelSerializer):
+    """
+    Краткие данные бронирования в платеже: без вложенной площадки и её фото.
+    Площадка представлена названием и миниатюрой главного фото (денормализованы в Venue).
+    """
+    user_name = serializers.CharField(source='user.full_name', read_only=True)
+    venue_title = serializers.CharField(source='venue.title', read_only=True)
+    venue_thumbnail = serializers.SerializerMethodField()
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    class Meta:
+        model = Booking
+        fields = (
+            'id', 'user', 'user_name', 'venue', 'venue_title', 'venue_thumbnail',
+            'date_start', 'date_end', 'status', 'status_display', 'total_price'
+        )
+        read_only_fields = fields
+    
+    def get_venue_thumbnail(self, obj):
+        """Средняя JPEG-миниатюра главного фото площадки"""
+        name = obj.venue.main_thumbnail_path
+        if not name:
+            return None
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class PaymentSerializer(SparseModelSerializer):
+    """
+    Сериализатор для платежа.
+    booking_details по умолчанию краткий (PaymentBookingSerializer);
+    ?expand=booking_details - полное бронирование с площадкой (BookingSerializer).
+    """
+    booking_details = PaymentBookingSerializer(source='booking', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     payment_method_display = serializers.CharField(source='get_payment_method_display', read_only=True)
     
@@ -142,6 +367,13 @@ class PaymentSerializer(serializers.ModelSerializer):
             'status_display', 'payment_method', 'payment_method_display', 'created_at'
         )
         read_only_fields = ('id', 'created_at')
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        path = f'{self.get_sparse_prefix()}booking_details'
+        if 'booking_details' in fields and is_expanded(self.context.get('request'), path):
+            fields['booking_details'] = BookingSerializer(source='booking', read_only=True)
+        return fields
 
 
 class PaymentCreateSerializer(serializers.ModelSerializer):
@@ -156,6 +388,10 @@ class PaymentCreateSerializer(serializers.ModelSerializer):
         if value.status == 'cancelled':
             raise serializers.ValidationError('Отменённое бронирование не может быть оплачено')
         
+        # Оплатить можно только подтверждённую бронь или ожидающую с действующим удержанием
+        if value.status not in ACTIVE_BOOKING_STATUSES or value.is_hold_expired():
+            raise serializers.ValidationError(BOOKING_HOLD_EXPIRED_MESSAGE)
+        
         # Проверка, что нет успешного платежа
         if value.payments.filter(status='paid').exists():
             raise serializers.ValidationError('Бронирование уже оплачено')
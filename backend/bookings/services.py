@@ -0,0 +1,296 @@
+"""
+Создание бронирования одной транзакцией.
+
+Порядок внутри транзакции: блокировка строки площадки (SELECT ... FOR UPDATE),
+проверка пересечения, расчёт цены и вставка. Параллельные запросы на одну
+площадку выполняются по очереди, поэтому между проверкой и вставкой чужая
+бронь появиться не может; exclusion constraint PostgreSQL остаётся
+дополнительной защитой. Созданная бронь возвращается вместе со связанными
+данными, нужными для ответа API, - без ленивых запросов при сериализации.
+"""
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rentalall.serializers import is_expanded, is_field_included
+from venues.models import Venue
+from .availability import merge_intervals
+from .models import (
+    ACTIVE_BOOKING_STATUSES,
+    EXPIRED_BOOKING_STATUS,
+    ArchivedBooking,
+    Booking,
+    Payment,
+    get_hold_expiry,
+    is_overlap_violation,
+    uses_overlap_constraint
+)
+from .occupancy import VenueOccupancy, invalidate_venue_slots
+
+# Результаты слотов серии бронирований
+SLOT_CREATED = 'created'    # Бронь создана
+SLOT_CONFLICT = 'conflict'  # Пересекается с существующей бронью или другим слотом серии
+SLOT_SKIPPED = 'skipped'    # Свободен, но не создан: в серии есть конфликт, а allow_partial=False
+
+RECURRENCE_STEPS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+
+
+class BookingConflictError(Exception):
+    """Период пересекается с активной бронью площадки"""
+    pass
+
+
+def get_booking_with_related(booking_id):
+    """Бронь с пользователем, площадкой, её категориями и отзывом - два запроса"""
+    return Booking.objects.select_related(
+        'user', 'venue', 'review'
+    ).prefetch_related(
+        'venue__categories'
+    ).get(pk=booking_id)
+
+
+def select_booking_related(queryset, request=None, path='', lookup=''):
+    """
+    План загрузки связанных данных для списка броней (BookingSerializer),
+    число запросов не зависит от размера страницы.
+    Пользователь, площадка и отзыв - JOIN; категории и фото площадок - по одному
+    запросу на страницу и только если они попадут в ответ (?fields=, ?expand=).
+    Рейтинг площадки денормализован в Venue и приходит вместе с ней.
+    path - путь сериализатора броней в ответе ('' для корневого),
+    lookup - путь к брони в queryset ('booking__' для платежей).
+    """
+    related = []
+    if is_field_included(request, f'{path}user_name'):
+        related.append(f'{lookup}user')
+    if is_field_included(request, f'{path}venue_details'):
+        related.append(f'{lookup}venue')
+        if is_field_included(request, f'{path}venue_details.categories'):
+            queryset = queryset.prefetch_related(f'{lookup}venue__categories')
+        if is_expanded(request, f'{path}venue_details.images'):
+            queryset = queryset.prefetch_related(f'{lookup}venue__images')
+    # У архивных броней отзывов нет
+    if queryset.model is not ArchivedBooking and is_field_included(request, f'{path}has_review'):
+        related.append(f'{lookup}review')
+    return queryset.select_related(*related)
+
+
+def select_payment_related(queryset, request=None):
+    """
+    План загрузки для списка платежей (PaymentSerializer): бронь с пользователем
+    и площадкой - одним JOIN; для ?expand=booking_details - по плану select_booking_related.
+    """
+    if not is_field_included(request, 'booking_details'):
+        return queryset
+    if is_expanded(request, 'booking_details'):
+        return select_booking_related(
+            queryset.select_related('booking'), request, path='booking_details.', lookup='booking__'
+        )
+    return queryset.select_related('booking__user', 'booking__venue')
+
+
+def expire_stale_holds(venue_id=None, batch_size=500, now=None):
+    """
+    Снять истёкшие удержания: неоплаченные брони со сроком expires_at <= now
+    переводятся в статус expired, их ожидающие платежи - в failed.
+    Работает пачками по batch_size в отдельных транзакциях; параллельные
+    запуски пропускают чужие заблокированные строки (SKIP LOCKED).
+    Возвращает количество снятых броней.
+    """
+    now = now or timezone.now()
+    stale = Booking.objects.filter(status='pending', expires_at__lte=now)
+    if venue_id is not None:
+        stale = stale.filter(venue_id=venue_id)
+    
+    expired = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                stale.select_for_update(skip_locked=True).order_by('expires_at').values_list('id', 'venue_id')[:batch_size]
+            )
+            if not batch:
+                break
+            booking_ids = [booking_id for booking_id, _ in batch]
+            Booking.objects.filter(id__in=booking_ids).update(status=EXPIRED_BOOKING_STATUS)
+            Payment.objects.filter(booking_id__in=booking_ids, status='pending').update(status='failed')
+        
+        # update() не отправляет post_save - сбрасываем занятость площадок явно
+        for expired_venue_id in {venue for _, venue in batch}:
+            invalidate_venue_slots(expired_venue_id)
+        expired += len(batch)
+        if len(batch) < batch_size:
+            break
+    
+    return expired
+
+
+def expire_venue_holds(venue_id, now=None):
+    """
+    Снять истёкшие удержания одной площадки двумя UPDATE без вложенной транзакции.
+    Вызывается под блокировкой строки площадки (lock_venue), поэтому SKIP LOCKED
+    и разбиение на пачки не нужны. Возвращает количество снятых броней.
+    """
+    now = now or timezone.now()
+    stale = Booking.objects.filter(venue_id=venue_id, status='pending', expires_at__lte=now)
+    Payment.objects.filter(
+        booking__venue_id=venue_id, booking__status='pending', booking__expires_at__lte=now, status='pending'
+    ).update(status='failed')
+    expired = stale.update(status=EXPIRED_BOOKING_STATUS)
+    if expired:
+        invalidate_venue_slots(venue_id)
+    return expired
+
+
+def lock_venue(venue_id):
+    """
+    Заблокировать строку площадки до конца транзакции.
+    В PostgreSQL истёкшие, но ещё не снятые удержания мешают exclusion constraint -
+    снимаем их для этой площадки под той же блокировкой.
+    """
+    Venue.objects.select_for_update().only('id').get(pk=venue_id)
+    if uses_overlap_constraint():
+        expire_venue_holds(venue_id)
+
+
+def create_booking(user, venue, date_start, date_end):
+    """
+    Создать бронирование площадки на период [date_start, date_end).
+    Данные должны быть проверены заранее (BookingCreateSerializer.validate);
+    при пересечении с другой бронью бросает BookingConflictError.
+    """
+    booking = Booking(
+        user=user, venue=venue, date_start=date_start, date_end=date_end, expires_at=get_hold_expiry()
+    )
+    booking.total_price = booking.calculate_total_price()
+    # Проверки дат без запросов к БД; полная валидация с запросами по FK не нужна
+    booking.clean()
+    
+    try:
+        with transaction.atomic():
+            lock_venue(venue.pk)
+            if not Booking.check_availability(venue.pk, date_start, date_end):
+                raise BookingConflictError()
+            booking.save(validate=False)
+    except IntegrityError as e:
+        if is_overlap_violation(e):
+            raise BookingConflictError() from e
+        raise
+    
+    return get_booking_with_related(booking.pk)
+
+
+def update_booking_status(booking, status):
+    """
+    Сменить статус брони. Бронь, которая сейчас не занимает площадку (отменена,
+    снята или удержание истекло), при переводе в активный статус проверяется
+    на пересечение под блокировкой площадки, как при создании; возвращённое
+    в pending удержание получает новый срок. При пересечении бросает BookingConflictError.
+    """
+    occupies = booking.status in ACTIVE_BOOKING_STATUSES and not booking.is_hold_expired()
+    booking.status = status
+    if status not in ACTIVE_BOOKING_STATUSES or occupies:
+        booking.save()
+        return booking
+    
+    if status == 'pending':
+        booking.expires_at = get_hold_expiry()
+    try:
+        with transaction.atomic():
+            lock_venue(booking.venue_id)
+            if not Booking.check_availability(
+                booking.venue_id, booking.date_start, booking.date_end, exclude_booking_id=booking.pk
+            ):
+                raise BookingConflictError()
+            booking.save()
+    except IntegrityError as e:
+        if is_overlap_violation(e):
+            raise BookingConflictError() from e
+        raise
+    return booking
+
+
+def expand_recurrence(date_start, date_end, freq, interval=1, count=None, until=None, limit=None):
+    """
+    Периоды серии по правилу в духе RRULE: FREQ=daily|weekly, INTERVAL, COUNT или UNTIL (дата, включительно).
+    Шаг прибавляется к локальному времени settings.TIME_ZONE, поэтому серия
+    "каждый вторник в 18:00" не сдвигается при переходе на летнее время.
+    limit - не генерировать больше limit + 1 периодов (для проверки ограничения размера серии).
+    """
+    tz = timezone.get_default_timezone()
+    local_start = date_start.astimezone(tz)
+    duration = date_end - date_start
+    step = RECURRENCE_STEPS[freq] * interval
+    
+    periods = []
+    while count is None or len(periods) < count:
+        current = local_start + step * len(periods)
+        if until is not None and current.date() > until:
+            break
+        periods.append((current, current + duration))
+        if limit is not None and len(periods) > limit:
+            break
+    return periods
+
+
+def create_bookings_bulk(user, venue, periods, allow_partial=False):
+    """
+    Создать серию бронирований площадки одной транзакцией.
+    Все периоды проверяются одним запросом по диапазону серии под блокировкой
+    площадки и вставляются через bulk_create.
+    Возвращает список (статус, бронь или None) в порядке periods.
+    """
+    results = [(SLOT_SKIPPED, None)] * len(periods)
+    if not periods:
+        return results
+    
+    expires_at = get_hold_expiry()
+    try:
+        with transaction.atomic():
+            lock_venue(venue.pk)
+            
+            range_start = min(date_start for date_start, _ in periods)
+            range_end = max(date_end for _, date_end in periods)
+            existing = Booking.get_overlapping(venue.pk, range_start, range_end).order_by(
+                'date_start'
+            ).values_list('date_start', 'date_end')
+            occupancy = VenueOccupancy(
+                merge_intervals((start.timestamp(), end.timestamp()) for start, end in existing),
+                horizon=range_start.timestamp(), generation=None
+            )
+            
+            # Слоты проверяем по возрастанию начала: пересечение с уже принятым слотом
+            # серии означает, что начало раньше максимального конца принятых
+            accepted_end = None
+            bookings = {}
+            for index in sorted(range(len(periods)), key=lambda i: periods[i][0]):
+                date_start, date_end = periods[index]
+                if occupancy.overlaps(date_start.timestamp(), date_end.timestamp()) or (
+                        accepted_end is not None and date_start < accepted_end):
+                    results[index] = (SLOT_CONFLICT, None)
+                    continue
+                accepted_end = date_end if accepted_end is None else max(accepted_end, date_end)
+                booking = Booking(
+                    user=user, venue=venue, date_start=date_start, date_end=date_end, expires_at=expires_at
+                )
+                booking.total_price = booking.calculate_total_price()
+                booking.clean()
+                bookings[index] = booking
+            
+            has_conflicts = len(bookings) < len(periods)
+            if not bookings or (has_conflicts and not allow_partial):
+                return results
+            
+            Booking.objects.bulk_create(bookings.values())
+    except IntegrityError as e:
+        if is_overlap_violation(e):
+            raise BookingConflictError() from e
+        raise
+    
+    # bulk_create не отправляет post_save - сбрасываем занятость площадки явно
+    invalidate_venue_slots(venue.pk)
+    transaction.on_commit(lambda: invalidate_venue_slots(venue.pk))
+    
+    for index, booking in bookings.items():
+        results[index] = (SLOT_CREATED, booking)
+    return results
@@ -0,0 +1,21 @@
+"""
+Сигналы для сброса кэша календаря занятости и индекса занятости площадок
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Booking
+from .occupancy import invalidate_venue_slots
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_availability_on_booking_change(sender, instance, **kwargs):
+    """
+    Любое изменение брони (создание, подтверждение, отмена) меняет занятость площадки.
+    Сбрасываем сразу и ещё раз после коммита: воркер, перечитавший занятость
+    до коммита транзакции, иначе закэшировал бы старые данные под новым поколением.
+    """
+    venue_id = instance.venue_id
+    invalidate_venue_slots(venue_id)
+    transaction.on_commit(lambda: invalidate_venue_slots(venue_id))
@@ -0,0 +1,118 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from .archive import archive_bookings, get_archive_cutoff
+from .models import ArchivedBooking, ArchivedPayment, Booking, Payment
+from reviews.models import Review
+from venues.models import Venue
+
+User = get_user_model()
+
+
+@override_settings(APPEND_SLASH=False, SECURE_SSL_REDIRECT=False, SECURE_PROXY_SSL_HEADER=None)
+class BookingArchiveTestCase(TestCase):
+    """Тесты переноса старых бронирований в архив"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        self.user = User.objects.create_user(
+            username='archive_user',
+            email='archive@test.com',
+            password='testpass123',
+            phone='+79001234586'
+        )
+        self.venue = Venue.objects.create(
+            owner=self.user,
+            title='Площадка',
+            description='Описание',
+            capacity=50,
+            price_per_hour=Decimal('1000.00'),
+            address='ул. Тестовая, д. 1',
+            is_active=True
+        )
+        self.now = timezone.now()
+        self.cutoff = get_archive_cutoff(12, now=self.now)
+    
+    def book(self, days_ago, status='confirmed'):
+        start = self.now - timedelta(days=days_ago)
+        return Booking.objects.create(
+            user=self.user, venue=self.venue, date_start=start, date_end=start + timedelta(hours=2),
+            status=status, total_price=Decimal('2000.00')
+        )
+    
+    def test_cutoff(self):
+        now = self.now.replace(year=2030, month=3, day=31)
+        self.assertEqual(get_archive_cutoff(1, now=now).date(), now.replace(month=2, day=28).date())
+        self.assertEqual(get_archive_cutoff(14, now=now).date(), now.replace(year=2029, month=1).date())
+    
+    def test_moves_old_bookings_with_payments(self):
+        """Старые брони и их платежи переносятся с сохранением id, свежие и с отзывами остаются"""
+        old = self.book(400)
+        old_cancelled = self.book(500, status='cancelled')
+        recent = self.book(30)
+        reviewed = self.book(450)
+        Review.objects.create(user=self.user, venue=self.venue, booking=reviewed, rating=5, comment='Отлично')
+        payments = [
+            Payment.objects.create(booking=old, amount=Decimal('2000.00'), status='paid'),
+            Payment.objects.create(booking=old, amount=Decimal('100.00'), status='failed'),
+        ]
+        
+        self.assertEqual(archive_bookings(self.cutoff, chunk_size=1), 2)
+        
+        self.assertEqual(set(Booking.objects.values_list('id', flat=True)), {recent.id, reviewed.id})
+        self.assertFalse(Payment.objects.exists())
+        
+        archived = ArchivedBooking.objects.get(pk=old.pk)
+        self.assertEqual(
+            (archived.user_id, archived.venue_id, archived.date_start, archived.date_end, archived.status, archived.total_price),
+            (old.user_id, old.venue_id, old.date_start, old.date_end, old.status, old.total_price)
+        )
+        self.assertIsNotNone(archived.archived_at)
+        self.assertEqual(ArchivedBooking.objects.get(pk=old_cancelled.pk).status, 'cancelled')
+        self.assertEqual(
+            set(ArchivedPayment.objects.filter(booking=archived).values_list('id', 'amount', 'status')),
+            {(payment.id, payment.amount, payment.status) for payment in payments}
+        )
+    
+    def test_command(self):
+        self.book(400)
+        out = StringIO()
+        
+        call_command('archive_bookings', months=12, chunk_size=10, stdout=out)
+        
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(ArchivedBooking.objects.count(), 1)
+        self.assertFalse(Booking.objects.exists())
+    
+    def test_archived_history_api(self):
+        """Архив доступен через ?archived=true, в обычном списке его нет"""
+        old = self.book(400)
+        recent = self.book(30)
+        other = User.objects.create_user(username='other', email='other@test.com', password='testpass123')
+        Booking.objects.create(
+            user=other, venue=self.venue, date_start=self.now - timedelta(days=420),
+            date_end=self.now - timedelta(days=420) + timedelta(hours=2), total_price=Decimal('2000.00')
+        )
+        archive_bookings(self.cutoff)
+        self.client.force_authenticate(user=self.user)
+        
+        response = self.client.get('/api/bookings/', {'archived': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([item['id'] for item in results], [old.id])
+        self.assertFalse(results[0]['can_be_cancelled'])
+        self.assertIn('archived_at', results[0])
+        self.assertEqual(results[0]['venue_details']['title'], 'Площадка')
+        
+        response = self.client.get('/api/bookings/')
+        self.assertEqual([item['id'] for item in response.data['results']], [recent.id])
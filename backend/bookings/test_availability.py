@@ -0,0 +1,233 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from .availability import merge_intervals, split_by_day
+from .models import Booking
+from venues.models import Venue
+
+User = get_user_model()
+
+
+@override_settings(APPEND_SLASH=False, SECURE_SSL_REDIRECT=False, SECURE_PROXY_SSL_HEADER=None)
+class VenueAvailabilityTestCase(TestCase):
+    """Тесты календаря занятости площадки"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        self.user = User.objects.create_user(
+            username='availability_user',
+            email='availability@test.com',
+            password='testpass123',
+            phone='+79001234580'
+        )
+        self.venue = Venue.objects.create(
+            owner=self.user,
+            title='Площадка',
+            description='Описание',
+            capacity=50,
+            price_per_hour=Decimal('1000.00'),
+            address='ул. Тестовая, д. 1',
+            is_active=True
+        )
+        self.tz = timezone.get_default_timezone()
+        self.day = timezone.localdate() + timedelta(days=10)
+        self.url = '/api/bookings/availability/'
+    
+    def local(self, day, hour, minute=0):
+        return datetime.combine(day, time(hour, minute), tzinfo=self.tz)
+    
+    def book(self, start, end, status='confirmed'):
+        return Booking.objects.create(
+            user=self.user, venue=self.venue, date_start=start, date_end=end, status=status,
+            total_price=Decimal('1000.00')
+        )
+    
+    def get(self, date_from, date_to=None, **headers):
+        params = {'venue': self.venue.id, 'from': date_from.isoformat()}
+        if date_to:
+            params['to'] = date_to.isoformat()
+        return self.client.get(self.url, params, **headers)
+    
+    def test_merge_intervals(self):
+        """Пересекающиеся и смежные интервалы объединяются"""
+        merged = merge_intervals([(1, 3), (2, 4), (4, 5), (7, 8)])
+        self.assertEqual(merged, [[1, 5], [7, 8]])
+    
+    def test_split_by_day(self):
+        """Интервал через полночь раскладывается на два дня"""
+        next_day = self.day + timedelta(days=1)
+        days = split_by_day(
+            [[self.local(self.day, 22), self.local(next_day, 2)]],
+            self.local(self.day, 0), self.local(next_day + timedelta(days=1), 0), self.tz
+        )
+        self.assertEqual(days, {
+            self.day.isoformat(): [['22:00', '24:00']],
+            next_day.isoformat(): [['00:00', '02:00']],
+        })
+    
+    def test_availability_period(self):
+        """Занятость за период одним запросом, смежные брони объединяются, отменённые брони не учитываются"""
+        next_day = self.day + timedelta(days=1)
+        self.book(self.local(self.day, 10), self.local(self.day, 12))
+        self.book(self.local(self.day, 12), self.local(self.day, 13), status='pending')
+        self.book(self.local(self.day, 15), self.local(self.day, 17), status='cancelled')
+        self.book(self.local(next_day, 9), self.local(next_day, 10))
+        
+        with self.assertNumQueries(1):
+            response = self.get(self.day, next_day)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['timezone'], str(self.tz))
+        self.assertEqual(response.data['days'], {
+            self.day.isoformat(): [['10:00', '13:00']],
+            next_day.isoformat(): [['09:00', '10:00']],
+        })
+    
+    def test_not_modified(self):
+        """Повторный запрос с If-None-Match получает 304 без обращения к БД"""
+        self.book(self.local(self.day, 10), self.local(self.day, 12))
+        response = self.get(self.day)
+        etag = response['ETag']
+        
+        with self.assertNumQueries(0):
+            response = self.get(self.day, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+    
+    def test_etag_changes_after_booking(self):
+        """Новая бронь меняет ETag и содержимое календаря"""
+        etag = self.get(self.day)['ETag']
+        self.book(self.local(self.day, 14), self.local(self.day, 16))
+        
+        response = self.get(self.day, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['days'], {self.day.isoformat(): [['14:00', '16:00']]})
+    
+    def test_expired_hold_frees_slot(self):
+        """Истёкшее удержание освобождает время и меняет ETag без изменения поколения площадки"""
+        now = timezone.now()
+        hold = self.book(self.local(self.day, 14), self.local(self.day, 16), status='pending')
+        Booking.objects.filter(pk=hold.pk).update(expires_at=now + timedelta(minutes=15))
+        response = self.get(self.day)
+        self.assertEqual(response.data['days'], {self.day.isoformat(): [['14:00', '16:00']]})
+        etag = response['ETag']
+        
+        with patch('bookings.availability.time_module.time', return_value=(now + timedelta(minutes=16)).timestamp()), \
+                patch('django.utils.timezone.now', return_value=now + timedelta(minutes=16)):
+            response = self.get(self.day, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['days'], {})
+    
+    def test_validation(self):
+        """Некорректные параметры возвращают 400"""
+        too_far = self.day + timedelta(days=100)
+        cases = [
+            {'from': self.day.isoformat()},
+            {'venue': 'abc', 'from': self.day.isoformat()},
+            {'venue': self.venue.id},
+            {'venue': self.venue.id, 'from': '2024-13-01'},
+            {'venue': self.venue.id, 'from': self.day.isoformat(), 'to': (self.day - timedelta(days=1)).isoformat()},
+            {'venue': self.venue.id, 'from': self.day.isoformat(), 'to': too_far.isoformat()},
+        ]
+        for params in cases:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn('error', response.data)
+
+
+@override_settings(APPEND_SLASH=False, SECURE_SSL_REDIRECT=False, SECURE_PROXY_SSL_HEADER=None)
+class OccupiedSlotsTestCase(TestCase):
+    """Тесты занятых слотов площадки на дату"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        self.user = User.objects.create_user(
+            username='slots_user',
+            email='slots@test.com',
+            password='testpass123',
+            phone='+79001234581'
+        )
+        self.venue = Venue.objects.create(
+            owner=self.user,
+            title='Площадка',
+            description='Описание',
+            capacity=50,
+            price_per_hour=Decimal('1000.00'),
+            address='ул. Тестовая, д. 1',
+            is_active=True
+        )
+        self.tz = timezone.get_default_timezone()
+        self.day = timezone.localdate() + timedelta(days=10)
+        self.url = '/api/bookings/occupied-slots/'
+    
+    def local(self, day, hour):
+        return datetime.combine(day, time(hour), tzinfo=self.tz)
+    
+    def book(self, start, end, status='confirmed'):
+        return Booking.objects.create(
+            user=self.user, venue=self.venue, date_start=start, date_end=end, status=status,
+            total_price=Decimal('1000.00')
+        )
+    
+    def get(self, day):
+        return self.client.get(self.url, {'venue': self.venue.id, 'date': day.isoformat()})
+    
+    def test_booking_across_midnight(self):
+        """Бронь, начавшаяся накануне, попадает в слоты обоих дней с обрезкой по границе дня"""
+        next_day = self.day + timedelta(days=1)
+        self.book(self.local(self.day, 22), self.local(next_day, 2))
+        
+        response = self.get(self.day)
+        self.assertEqual(response.data['occupied_slots'], ['22:00 - 24:00'])
+        
+        response = self.get(next_day)
+        self.assertEqual(response.data['occupied_slots'], ['00:00 - 02:00'])
+        slot = response.data['slots'][0]
+        self.assertEqual(slot['start'], self.local(self.day, 22).isoformat())
+        self.assertEqual(slot['end'], self.local(next_day, 2).isoformat())
+        self.assertEqual(response.data['timezone'], str(self.tz))
+    
+    def test_day_boundaries(self):
+        """Брони, заканчивающиеся в полночь или отменённые, не занимают следующий день"""
+        next_day = self.day + timedelta(days=1)
+        self.book(self.local(self.day, 20), self.local(next_day, 0))
+        self.book(self.local(next_day, 10), self.local(next_day, 12), status='cancelled')
+        self.book(self.local(next_day, 14), self.local(next_day, 15))
+        
+        response = self.get(next_day)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['occupied_slots'], ['14:00 - 15:00'])
+    
+    def test_range_predicate(self):
+        """Фильтр по дню - сравнение столбцов с границами, без функций над date_start"""
+        # Прошедший день - индекс занятости его не хранит, запрос идёт в БД
+        with CaptureQueriesContext(connection) as queries:
+            self.get(timezone.localdate() - timedelta(days=10))
+        sql = queries.captured_queries[-1]['sql']
+        self.assertIn('"date_start" <', sql)
+        self.assertNotIn('django_datetime_cast_date', sql)
+    
+    def test_validation(self):
+        """Некорректные параметры возвращают 400"""
+        cases = [
+            {'venue': self.venue.id},
+            {'venue': 'abc', 'date': self.day.isoformat()},
+            {'venue': self.venue.id, 'date': '10.10.2026'},
+        ]
+        for params in cases:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
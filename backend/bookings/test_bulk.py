@@ -0,0 +1,164 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from .models import Booking
+from .services import expand_recurrence
+from venues.models import Venue
+
+User = get_user_model()
+
+
+class ExpandRecurrenceTestCase(TestCase):
+    """Тесты развёртки правила повторения"""
+    
+    def test_weekly_count(self):
+        start = timezone.now().replace(microsecond=0)
+        periods = expand_recurrence(start, start + timedelta(hours=2), 'weekly', count=3)
+        
+        self.assertEqual([p[0] - start for p in periods], [timedelta(0), timedelta(weeks=1), timedelta(weeks=2)])
+        self.assertTrue(all(end - begin == timedelta(hours=2) for begin, end in periods))
+    
+    def test_until_inclusive(self):
+        tz = timezone.get_default_timezone()
+        start = datetime(2030, 1, 1, 10, tzinfo=tz)
+        periods = expand_recurrence(start, start + timedelta(hours=1), 'daily', interval=2, until=start.date() + timedelta(days=4))
+        
+        self.assertEqual([p[0].day for p in periods], [1, 3, 5])
+    
+    @override_settings(TIME_ZONE='Europe/Berlin')
+    def test_keeps_local_time_across_dst(self):
+        """Серия сохраняет локальное время при переходе на летнее время"""
+        tz = timezone.get_default_timezone()
+        start = datetime(2030, 3, 26, 18, tzinfo=tz)
+        periods = expand_recurrence(start, start + timedelta(hours=2), 'weekly', count=2)
+        
+        self.assertEqual([p[0].astimezone(tz).hour for p in periods], [18, 18])
+        # Между слотами на час меньше недели
+        self.assertEqual(periods[1][0].timestamp() - periods[0][0].timestamp(), (timedelta(weeks=1) - timedelta(hours=1)).total_seconds())
+
+
+@override_settings(APPEND_SLASH=False, SECURE_SSL_REDIRECT=False, SECURE_PROXY_SSL_HEADER=None)
+class BookingBulkCreateTestCase(TestCase):
+    """Тесты создания серии бронирований"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        self.user = User.objects.create_user(
+            username='bulk_user',
+            email='bulk@test.com',
+            password='testpass123',
+            phone='+79001234584'
+        )
+        self.venue = Venue.objects.create(
+            owner=self.user,
+            title='Переговорная',
+            description='Описание',
+            capacity=12,
+            price_per_hour=Decimal('1000.00'),
+            address='ул. Тестовая, д. 1',
+            is_active=True
+        )
+        self.client.force_authenticate(user=self.user)
+        self.tz = timezone.get_default_timezone()
+        self.start = datetime.combine(timezone.localdate() + timedelta(days=3), time(18), tzinfo=self.tz)
+        self.end = self.start + timedelta(hours=2)
+        self.url = '/api/bookings/bulk/'
+    
+    def post_weekly(self, count=4, **extra):
+        data = {
+            'venue': self.venue.id,
+            'date_start': self.start.isoformat(),
+            'date_end': self.end.isoformat(),
+            'recurrence': {'freq': 'weekly', 'count': count},
+        }
+        data.update(extra)
+        return self.client.post(self.url, data)
+    
+    def book(self, start, end):
+        return Booking.objects.create(
+            user=self.user, venue=self.venue, date_start=start, date_end=end,
+            status='confirmed', total_price=Decimal('1000.00')
+        )
+    
+    def test_weekly_series(self):
+        """Серия создаётся одной вставкой после одной проверки по диапазону"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_weekly()
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 4)
+        self.assertEqual([r['status'] for r in response.data['results']], ['created'] * 4)
+        self.assertEqual(response.data['results'][0]['total_price'], '2000.00')
+        self.assertEqual(Booking.objects.filter(venue=self.venue).count(), 4)
+        
+        sqls = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual(len([sql for sql in sqls if sql.startswith('SELECT') and 'FROM "bookings"' in sql]), 1)
+        self.assertEqual(len([sql for sql in sqls if sql.startswith('INSERT INTO "bookings"')]), 1)
+    
+    def test_conflict_rejects_whole_series(self):
+        """Без allow_partial конфликт одного слота отменяет всю серию"""
+        self.book(self.start + timedelta(weeks=1, hours=1), self.end + timedelta(weeks=1, hours=1))
+        
+        response = self.post_weekly()
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(
+            [r['status'] for r in response.data['results']],
+            ['skipped', 'conflict', 'skipped', 'skipped']
+        )
+        self.assertEqual(Booking.objects.filter(venue=self.venue).count(), 1)
+    
+    def test_allow_partial(self):
+        """С allow_partial создаются свободные слоты, занятые и некорректные возвращаются с ошибкой"""
+        self.book(self.start + timedelta(weeks=1), self.end + timedelta(weeks=1))
+        past = timezone.now() - timedelta(days=1)
+        intervals = [
+            {'date_start': self.start.isoformat(), 'date_end': self.end.isoformat()},
+            {'date_start': (self.start + timedelta(weeks=1)).isoformat(), 'date_end': (self.end + timedelta(weeks=1)).isoformat()},
+            {'date_start': past.isoformat(), 'date_end': (past + timedelta(hours=2)).isoformat()},
+            # Пересекается с первым слотом этой же серии
+            {'date_start': (self.start + timedelta(hours=1)).isoformat(), 'date_end': (self.end + timedelta(hours=1)).isoformat()},
+        ]
+        
+        response = self.client.post(self.url, {'venue': self.venue.id, 'intervals': intervals, 'allow_partial': True})
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [r['status'] for r in response.data['results']],
+            ['created', 'conflict', 'invalid', 'conflict']
+        )
+        self.assertIn('date_start', response.data['results'][2]['errors'])
+        self.assertEqual(Booking.objects.filter(venue=self.venue).count(), 2)
+    
+    def test_invalidates_occupancy(self):
+        """Серия сразу видна в занятых слотах площадки"""
+        self.client.get('/api/bookings/occupied-slots/', {'venue': self.venue.id, 'date': self.start.date().isoformat()})
+        self.post_weekly(count=2)
+        
+        response = self.client.get(
+            '/api/bookings/occupied-slots/', {'venue': self.venue.id, 'date': self.start.date().isoformat()}
+        )
+        self.assertEqual(response.data['occupied_slots'], ['18:00 - 20:00'])
+    
+    @override_settings(BOOKING_BULK_MAX_SLOTS=3)
+    def test_validation(self):
+        """Ограничение размера серии и обязательные параметры"""
+        response = self.post_weekly(count=4)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.client.post(self.url, {'venue': self.venue.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.post_weekly(recurrence={'freq': 'weekly'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Booking.objects.count(), 0)
@@ -0,0 +1,171 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from .models import Booking, Payment
+from .services import expire_stale_holds
+from venues.models import Venue
+
+User = get_user_model()
+
+
+@override_settings(
+    APPEND_SLASH=False,
+    SECURE_SSL_REDIRECT=False,
+    SECURE_PROXY_SSL_HEADER=None,
+    BOOKING_HOLD_MINUTES=15
+)
+class BookingHoldTestCase(TestCase):
+    """Тесты удержания слотов неоплаченными бронями"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        self.user = User.objects.create_user(
+            username='hold_user',
+            email='hold@test.com',
+            password='testpass123',
+            phone='+79001234585'
+        )
+        self.venue = Venue.objects.create(
+            owner=self.user,
+            title='Площадка',
+            description='Описание',
+            capacity=50,
+            price_per_hour=Decimal('1000.00'),
+            address='ул. Тестовая, д. 1',
+            is_active=True
+        )
+        self.client.force_authenticate(user=self.user)
+        self.now = timezone.now()
+        self.start = self.now + timedelta(days=1)
+        self.end = self.start + timedelta(hours=2)
+    
+    def book(self, status='pending', expires_at=None, start=None):
+        start = start or self.start
+        return Booking.objects.create(
+            user=self.user, venue=self.venue, date_start=start, date_end=start + timedelta(hours=2),
+            status=status, expires_at=expires_at, total_price=Decimal('2000.00')
+        )
+    
+    def post_booking(self):
+        return self.client.post('/api/bookings/', {
+            'venue': self.venue.id,
+            'date_start': self.start.isoformat(),
+            'date_end': self.end.isoformat()
+        })
+    
+    def test_new_booking_gets_hold(self):
+        """Новая бронь удерживает слот BOOKING_HOLD_MINUTES минут"""
+        response = self.post_booking()
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        booking = Booking.objects.get(pk=response.data['id'])
+        self.assertAlmostEqual(
+            (booking.expires_at - self.now).total_seconds(), 15 * 60, delta=60
+        )
+    
+    def test_expired_hold_does_not_block(self):
+        """Истёкшее удержание не мешает новой брони, действующее - мешает"""
+        self.book(expires_at=self.now + timedelta(minutes=5))
+        self.assertEqual(self.post_booking().status_code, status.HTTP_400_BAD_REQUEST)
+        
+        Booking.objects.update(expires_at=self.now - timedelta(minutes=1))
+        self.assertEqual(self.post_booking().status_code, status.HTTP_201_CREATED)
+    
+    def test_reaper_expires_stale_holds(self):
+        """Истёкшие удержания снимаются пачками, их платежи отклоняются"""
+        stale = [
+            self.book(expires_at=self.now - timedelta(minutes=1), start=self.start + timedelta(days=day))
+            for day in range(3)
+        ]
+        active = self.book(expires_at=self.now + timedelta(minutes=5), start=self.start + timedelta(days=5))
+        unlimited = self.book(start=self.start + timedelta(days=6))
+        confirmed = self.book(status='confirmed', expires_at=self.now - timedelta(minutes=1), start=self.start + timedelta(days=7))
+        payment = Payment.objects.create(booking=stale[0], amount=Decimal('2000.00'))
+        
+        self.assertEqual(expire_stale_holds(batch_size=2), 3)
+        
+        statuses = dict(Booking.objects.values_list('id', 'status'))
+        self.assertEqual([statuses[booking.id] for booking in stale], ['expired'] * 3)
+        self.assertEqual(statuses[active.id], 'pending')
+        self.assertEqual(statuses[unlimited.id], 'pending')
+        self.assertEqual(statuses[confirmed.id], 'confirmed')
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'failed')
+    
+    def test_reaper_command(self):
+        self.book(expires_at=self.now - timedelta(minutes=1))
+        out = StringIO()
+        
+        call_command('expire_booking_holds', batch_size=10, stdout=out)
+        
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(Booking.objects.get().status, 'expired')
+    
+    def test_payment_after_expiry_rejected(self):
+        """Оплата после истечения удержания не подтверждает бронь"""
+        booking = self.book(expires_at=self.now - timedelta(minutes=1))
+        payment = Payment.objects.create(booking=booking, amount=Decimal('2000.00'))
+        
+        response = self.client.post(f'/api/bookings/payments/{payment.id}/process/')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'pending')
+    
+    def test_payment_after_reaping_rejected(self):
+        """Снятую сборщиком бронь нельзя ни оплатить, ни подтвердить"""
+        booking = self.book(expires_at=self.now - timedelta(minutes=1))
+        expire_stale_holds()
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'expired')
+        self.assertTrue(booking.is_hold_expired())
+        
+        response = self.client.post('/api/bookings/payments/', {'booking': booking.id, 'payment_method': 'card'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('booking', response.data)
+        self.assertFalse(Payment.objects.filter(booking=booking).exists())
+        
+        # Платёж, созданный до снятия удержания, тоже не проводится
+        payment = Payment.objects.create(booking=booking, amount=Decimal('2000.00'))
+        response = self.client.post(f'/api/bookings/payments/{payment.id}/process/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'pending')
+        
+        admin = User.objects.create_user(
+            username='hold_admin', email='hold_admin@test.com', password='testpass123', role='admin'
+        )
+        self.client.force_authenticate(user=admin)
+        response = self.client.post(f'/api/bookings/{booking.id}/confirm/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'expired')
+    
+    def test_payment_create_after_expiry_rejected(self):
+        """Платёж за бронь с истёкшим, но ещё не снятым удержанием не создаётся"""
+        booking = self.book(expires_at=self.now - timedelta(minutes=1))
+        
+        response = self.client.post('/api/bookings/payments/', {'booking': booking.id, 'payment_method': 'card'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_payment_confirms_and_clears_hold(self):
+        booking = self.book(expires_at=self.now + timedelta(minutes=5))
+        payment = Payment.objects.create(booking=booking, amount=Decimal('2000.00'))
+        
+        response = self.client.post(f'/api/bookings/payments/{payment.id}/process/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'confirmed')
+        self.assertIsNone(booking.expires_at)
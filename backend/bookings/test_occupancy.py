@@ -0,0 +1,130 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, TransactionTestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from . import occupancy
+from .availability import invalidate_venue_availability
+from .models import Booking
+from .occupancy import (
+    VenueOccupancy,
+    clear_occupancy_index,
+    get_occupied_intervals,
+    is_venue_busy
+)
+from venues.models import Venue
+
+User = get_user_model()
+
+
+class VenueOccupancyTestCase(SimpleTestCase):
+    """Тесты поиска пересечений в индексе занятости"""
+    
+    def setUp(self):
+        self.occupancy = VenueOccupancy([(10, 20), (30, 40), (50, 60)], horizon=0, generation=(1, 1))
+    
+    def test_overlaps(self):
+        """Полуоткрытые интервалы: касание границ не считается пересечением"""
+        self.assertTrue(self.occupancy.overlaps(15, 16))
+        self.assertTrue(self.occupancy.overlaps(0, 11))
+        self.assertTrue(self.occupancy.overlaps(39, 45))
+        self.assertTrue(self.occupancy.overlaps(0, 100))
+        self.assertFalse(self.occupancy.overlaps(20, 30))
+        self.assertFalse(self.occupancy.overlaps(0, 10))
+        self.assertFalse(self.occupancy.overlaps(60, 70))
+    
+    def test_between(self):
+        """Интервалы, пересекающиеся с периодом"""
+        self.assertEqual(self.occupancy.between(15, 35), [(10, 20), (30, 40)])
+        self.assertEqual(self.occupancy.between(20, 30), [])
+        self.assertEqual(self.occupancy.between(0, 100), [(10, 20), (30, 40), (50, 60)])
+    
+    def test_covers(self):
+        """Индекс отвечает только на периоды после горизонта"""
+        occupancy = VenueOccupancy([], horizon=100, generation=(1, 1))
+        self.assertTrue(occupancy.covers(100))
+        self.assertFalse(occupancy.covers(99))
+
+
+class VenueOccupancyIndexTestCase(TransactionTestCase):
+    """Тесты загрузки и сброса индекса занятости"""
+    
+    def setUp(self):
+        cache.clear()
+        clear_occupancy_index()
+        self.user = User.objects.create_user(
+            username='occupancy_user',
+            email='occupancy@test.com',
+            password='testpass123',
+            phone='+79001234582'
+        )
+        self.venue = Venue.objects.create(
+            owner=self.user,
+            title='Площадка',
+            description='Описание',
+            capacity=50,
+            price_per_hour=Decimal('1000.00'),
+            address='ул. Тестовая, д. 1',
+            is_active=True
+        )
+        self.start = timezone.now() + timedelta(days=2)
+        self.end = self.start + timedelta(hours=2)
+        self.booking = Booking.objects.create(
+            user=self.user, venue=self.venue, date_start=self.start, date_end=self.end,
+            status='confirmed', total_price=Decimal('2000.00')
+        )
+    
+    def tearDown(self):
+        clear_occupancy_index()
+    
+    def test_lookup_without_queries(self):
+        """После загрузки индекса проверки занятости не обращаются к БД"""
+        with self.assertNumQueries(1):
+            self.assertTrue(is_venue_busy(self.venue.id, self.start, self.end))
+        
+        with self.assertNumQueries(0):
+            self.assertTrue(is_venue_busy(self.venue.id, self.start + timedelta(hours=1), self.end))
+            self.assertFalse(is_venue_busy(self.venue.id, self.end, self.end + timedelta(hours=1)))
+            intervals = get_occupied_intervals(self.venue.id, self.start - timedelta(days=1), self.end)
+        
+        self.assertEqual(intervals, [(self.start, self.end)])
+    
+    def test_cancel_invalidates_index(self):
+        """Отмена брони сбрасывает индекс площадки"""
+        self.assertTrue(is_venue_busy(self.venue.id, self.start, self.end))
+        
+        self.booking.status = 'cancelled'
+        self.booking.save()
+        
+        self.assertFalse(is_venue_busy(self.venue.id, self.start, self.end))
+    
+    def test_other_process_invalidation(self):
+        """Новое поколение в общем кэше сбрасывает индекс, загруженный этим процессом"""
+        self.assertTrue(is_venue_busy(self.venue.id, self.start, self.end))
+        
+        # Имитируем изменение брони в другом воркере: БД и поколение меняются без локального сброса
+        Booking.objects.filter(pk=self.booking.pk).update(status='cancelled')
+        invalidate_venue_availability(self.venue.id)
+        
+        self.assertFalse(is_venue_busy(self.venue.id, self.start, self.end))
+    
+    def test_past_period_not_covered(self):
+        """На периоды раньше горизонта индекс не отвечает"""
+        past = timezone.now() - timedelta(days=3)
+        self.assertIsNone(is_venue_busy(self.venue.id, past, past + timedelta(hours=1)))
+        self.assertIsNone(get_occupied_intervals(self.venue.id, past, past + timedelta(hours=1)))
+    
+    def test_not_shared_inside_transaction(self):
+        """Индекс, прочитанный внутри транзакции, не сохраняется для других запросов"""
+        with transaction.atomic():
+            self.assertTrue(is_venue_busy(self.venue.id, self.start, self.end))
+        
+        self.assertEqual(occupancy._occupancy, {})
+    
+    @override_settings(BOOKING_OCCUPANCY_INDEX_ENABLED=False)
+    def test_disabled(self):
+        """Выключенный индекс не отвечает - проверка идёт в БД"""
+        self.assertIsNone(is_venue_busy(self.venue.id, self.start, self.end))
@@ -4,14 +4,19 @@ from django.utils import timezone
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.test.utils import override_settings
-from django.db import transaction
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
 from rest_framework.test import APIClient
 from rest_framework import status
 from datetime import timedelta
 from decimal import Decimal
 from unittest.mock import patch
+from rest_framework import serializers
 from .models import Booking, Payment
-from venues.models import Venue, Category
+from .serializers import BookingCreateSerializer
+from .services import BookingConflictError, create_booking
+from venues.models import Venue, VenueImage, Category
+from reviews.models import Review
 
 User = get_user_model()
 
@@ -245,6 +250,41 @@ class BookingAPITestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('venue', response.data)
     
+    def test_reactivate_booking_overlapping_time_api(self):
+        """API: отменённую бронь нельзя вернуть в активный статус на занятое время"""
+        start = timezone.now() + timedelta(days=1)
+        end = start + timedelta(hours=2)
+        cancelled = Booking.objects.create(
+            user=self.user, venue=self.venue, date_start=start, date_end=end,
+            total_price=Decimal('2000.00'), status='cancelled'
+        )
+        Booking.objects.create(
+            user=self.user, venue=self.venue, date_start=start + timedelta(hours=1), date_end=end + timedelta(hours=1),
+            total_price=Decimal('2000.00'), status='confirmed'
+        )
+        
+        for new_status in ('pending', 'confirmed'):
+            response = self.client.patch(f'/api/bookings/{cancelled.id}/', {'status': new_status})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, new_status)
+            self.assertIn('status', response.data)
+        cancelled.refresh_from_db()
+        self.assertEqual(cancelled.status, 'cancelled')
+    
+    def test_reactivate_expired_hold_api(self):
+        """API: снятое удержание возвращается в pending на свободное время с новым сроком"""
+        start = timezone.now() + timedelta(days=1)
+        expired = Booking.objects.create(
+            user=self.user, venue=self.venue, date_start=start, date_end=start + timedelta(hours=2),
+            total_price=Decimal('2000.00'), status='expired', expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        
+        response = self.client.patch(f'/api/bookings/{expired.id}/', {'status': 'pending'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expired.refresh_from_db()
+        self.assertEqual(expired.status, 'pending')
+        self.assertFalse(expired.is_hold_expired())
+    
     def test_create_booking_valid_api(self):
         """API: Создание корректного бронирования"""
         now = timezone.now()
@@ -483,3 +523,348 @@ class BookingTransactionTestCase(TestCase):
     #     self.payment.refresh_from_db()
     #     self.assertEqual(self.payment.status, 'paid')
 
+
+class BookingOverlapProtectionTestCase(TestCase):
+    """Тесты защиты от двойного бронирования между validate() и save()"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.venue = Venue.objects.create(
+            owner=self.user,
+            title='Тестовая площадка',
+            description='Описание',
+            capacity=50,
+            price_per_hour=Decimal('1000.00'),
+            address='ул. Тестовая, д. 1',
+            is_active=True
+        )
+        self.start = timezone.now() + timedelta(days=1)
+        self.end = self.start + timedelta(hours=2)
+    
+    def get_valid_serializer(self):
+        serializer = BookingCreateSerializer(data={
+            'venue': self.venue.id,
+            'date_start': self.start.isoformat(),
+            'date_end': self.end.isoformat()
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer
+    
+    def test_conflict_after_validation_rejected(self):
+        """Бронь, созданная параллельно после validate(), не приводит к двойному бронированию"""
+        serializer = self.get_valid_serializer()
+        Booking.objects.create(
+            user=self.user,
+            venue=self.venue,
+            date_start=self.start + timedelta(hours=1),
+            date_end=self.end + timedelta(hours=1),
+            total_price=Decimal('2000.00')
+        )
+        
+        with self.assertRaises(serializers.ValidationError) as context:
+            serializer.save(user=self.user)
+        
+        self.assertIn('venue', context.exception.detail)
+        self.assertEqual(Booking.objects.filter(venue=self.venue).count(), 1)
+    
+    def test_exclusion_violation_becomes_validation_error(self):
+        """Нарушение exclusion constraint (PostgreSQL) превращается в ошибку валидации"""
+        serializer = self.get_valid_serializer()
+        error = IntegrityError('conflicting key value violates exclusion constraint "bookings_no_overlap"')
+        
+        with patch.object(Booking, 'save', side_effect=error):
+            with self.assertRaises(serializers.ValidationError) as context:
+                serializer.save(user=self.user)
+        
+        self.assertIn('venue', context.exception.detail)
+    
+    def test_other_integrity_errors_propagate(self):
+        serializer = self.get_valid_serializer()
+        
+        with patch.object(Booking, 'save', side_effect=IntegrityError('null value in column "user_id"')):
+            with self.assertRaises(IntegrityError):
+                serializer.save(user=self.user)
+
+
+
+@override_settings(
+    APPEND_SLASH=False,
+    SECURE_SSL_REDIRECT=False,
+    SECURE_PROXY_SSL_HEADER=None
+)
+class BookingCreateServiceTestCase(TestCase):
+    """Тесты сервиса создания бронирования"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        self.user = User.objects.create_user(
+            username='service_user',
+            email='service@test.com',
+            password='testpass123',
+            phone='+79001234583'
+        )
+        self.venue = Venue.objects.create(
+            owner=self.user,
+            title='Тестовая площадка',
+            description='Описание',
+            capacity=50,
+            price_per_hour=Decimal('1000.00'),
+            address='ул. Тестовая, д. 1',
+            is_active=True
+        )
+        self.venue.categories.add(Category.objects.create(name='Лофт'), Category.objects.create(name='Зал'))
+        self.client.force_authenticate(user=self.user)
+        self.start = timezone.now() + timedelta(days=1)
+        self.end = self.start + timedelta(hours=2)
+    
+    def post_booking(self, start, end):
+        return self.client.post('/api/bookings/', {
+            'venue': self.venue.id,
+            'date_start': start.isoformat(),
+            'date_end': end.isoformat()
+        })
+    
+    def test_create_query_budget(self):
+        """Создание брони через API - фиксированное число запросов, без ленивых загрузок в ответе"""
+        # Площадка (валидация), индекс занятости, SAVEPOINT, блокировка площадки,
+        # проверка пересечения, INSERT, RELEASE, бронь со связями, категории площадки
+        with self.assertNumQueries(9):
+            response = self.post_booking(self.start, self.end)
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['total_price'], '2000.00')
+        self.assertEqual(response.data['user_name'], self.user.full_name)
+        self.assertEqual(len(response.data['venue_details']['categories']), 2)
+        self.assertFalse(response.data['has_review'])
+        
+        # Число запросов не зависит от количества категорий площадки
+        self.venue.categories.add(Category.objects.create(name='Терраса'))
+        with self.assertNumQueries(9):
+            response = self.post_booking(self.end, self.end + timedelta(hours=2))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+    
+    def test_create_query_budget_with_overlap_constraint(self):
+        """
+        PostgreSQL: под блокировкой площадки истёкшие удержания снимаются двумя UPDATE
+        (платежи и брони) без вложенного SAVEPOINT - 9 + 2 запроса
+        """
+        stale = Booking.objects.create(
+            user=self.user, venue=self.venue, date_start=self.start, date_end=self.end,
+            total_price=Decimal('2000.00'), expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        payment = Payment.objects.create(booking=stale, amount=Decimal('2000.00'))
+        
+        with patch('bookings.services.uses_overlap_constraint', return_value=True):
+            with self.assertNumQueries(11):
+                response = self.post_booking(self.end, self.end + timedelta(hours=2))
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        stale.refresh_from_db()
+        payment.refresh_from_db()
+        self.assertEqual((stale.status, payment.status), ('expired', 'failed'))
+    
+    def test_service_returns_related_data(self):
+        """create_booking возвращает бронь с загруженными связями и рассчитанной ценой"""
+        booking = create_booking(self.user, self.venue, self.start, self.end)
+        
+        self.assertEqual(booking.total_price, Decimal('2000.00'))
+        with self.assertNumQueries(0):
+            booking.user.full_name
+            booking.venue.title
+            list(booking.venue.categories.all())
+            self.assertFalse(hasattr(booking, 'review'))
+    
+    def test_service_conflict(self):
+        """Пересечение с активной бронью - BookingConflictError, новая бронь не создаётся"""
+        create_booking(self.user, self.venue, self.start, self.end)
+        
+        with self.assertRaises(BookingConflictError):
+            create_booking(self.user, self.venue, self.start + timedelta(hours=1), self.end + timedelta(hours=1))
+        
+        self.assertEqual(Booking.objects.filter(venue=self.venue).count(), 1)
+    
+    def test_service_allows_adjacent_booking(self):
+        """Бронь, начинающаяся в момент окончания другой, допустима"""
+        create_booking(self.user, self.venue, self.start, self.end)
+        create_booking(self.user, self.venue, self.end, self.end + timedelta(hours=1))
+        
+        self.assertEqual(Booking.objects.filter(venue=self.venue).count(), 2)
+
+
+@override_settings(APPEND_SLASH=False, SECURE_SSL_REDIRECT=False, SECURE_PROXY_SSL_HEADER=None)
+class BookingListQueryBudgetTestCase(TestCase):
+    """Число запросов списка броней не зависит от количества строк (нет N+1)"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        self.user = User.objects.create_user(
+            username='budget_user',
+            email='budget@test.com',
+            password='testpass123',
+            phone='+79001234587'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.categories = [Category.objects.create(name='Лофт'), Category.objects.create(name='Зал')]
+        self.start = timezone.now() + timedelta(days=1)
+        self.count = 0
+    
+    def add_bookings(self, count):
+        """Брони на разных площадках с категориями, фото и отзывами"""
+        for _ in range(count):
+            self.count += 1
+            venue = Venue.objects.create(
+                owner=self.user,
+                title=f'Площадка {self.count}',
+                description='Описание',
+                capacity=50,
+                price_per_hour=Decimal('1000.00'),
+                address='ул. Тестовая, д. 1',
+                is_active=True
+            )
+            venue.categories.add(*self.categories)
+            VenueImage.objects.bulk_create([
+                VenueImage(venue=venue, image=f'venue_images/{self.count}_{index}.jpg') for index in range(2)
+            ])
+            booking = Booking.objects.create(
+                user=self.user, venue=venue, date_start=self.start, date_end=self.start + timedelta(hours=2),
+                status='confirmed', total_price=Decimal('2000.00')
+            )
+            if self.count % 2:
+                Review.objects.create(user=self.user, venue=venue, booking=booking, rating=5, comment='Отлично')
+    
+    def assert_constant_queries(self, expected, params=None):
+        """Одинаковое число запросов для 2 и 10 броней на странице"""
+        self.add_bookings(2)
+        with self.assertNumQueries(expected):
+            response = self.client.get('/api/bookings/', params)
+        self.assertEqual(len(response.data['results']), 2)
+        
+        self.add_bookings(8)
+        with self.assertNumQueries(expected):
+            response = self.client.get('/api/bookings/', params)
+        self.assertEqual(len(response.data['results']), 10)
+        return response.data['results']
+    
+    def test_list_query_budget(self):
+        """COUNT, брони с пользователем, площадкой и отзывом, категории площадок"""
+        results = self.assert_constant_queries(3)
+        
+        self.assertEqual(results[0]['user_name'], self.user.full_name)
+        self.assertEqual(len(results[0]['venue_details']['categories']), 2)
+        self.assertIn('average_rating', results[0]['venue_details'])
+        self.assertIn('reviews_count', results[0]['venue_details'])
+        self.assertEqual(sum(item['has_review'] for item in results), 5)
+    
+    def test_list_query_budget_with_images(self):
+        """?expand=venue_details.images - один дополнительный запрос на страницу"""
+        results = self.assert_constant_queries(4, {'expand': 'venue_details.images'})
+        
+        self.assertEqual(len(results[0]['venue_details']['images']), 2)
+    
+    def test_list_query_budget_sparse_fields(self):
+        """Не запрошенные связи не загружаются"""
+        results = self.assert_constant_queries(2, {'fields': 'id,status,venue_details.title'})
+        
+        self.assertEqual(set(results[0]), {'id', 'status', 'venue_details'})
+    
+    def test_detail_query_budget(self):
+        """Детальная бронь: бронь со связями и категории площадки"""
+        self.add_bookings(1)
+        booking = Booking.objects.get()
+        
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/bookings/{booking.id}/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['has_review'])
+
+
+@override_settings(APPEND_SLASH=False, SECURE_SSL_REDIRECT=False, SECURE_PROXY_SSL_HEADER=None)
+class PaymentListQueryBudgetTestCase(BookingListQueryBudgetTestCase):
+    """Список платежей: краткая бронь по умолчанию, число запросов не зависит от количества строк"""
+    
+    def add_bookings(self, count):
+        super().add_bookings(count)
+        Payment.objects.bulk_create([
+            Payment(booking=booking, amount=booking.total_price)
+            for booking in Booking.objects.filter(payments__isnull=True)
+        ])
+    
+    def assert_constant_queries(self, expected, params=None):
+        """Одинаковое число запросов для 2 и 10 платежей на странице"""
+        self.add_bookings(2)
+        with self.assertNumQueries(expected):
+            response = self.client.get('/api/bookings/payments/', params)
+        self.assertEqual(len(response.data['results']), 2)
+        
+        self.add_bookings(8)
+        with self.assertNumQueries(expected):
+            response = self.client.get('/api/bookings/payments/', params)
+        self.assertEqual(len(response.data['results']), 10)
+        return response.data['results']
+    
+    def test_list_query_budget(self):
+        """COUNT и платежи с бронью, пользователем и площадкой одним JOIN"""
+        results = self.assert_constant_queries(2)
+        
+        details = results[0]['booking_details']
+        self.assertEqual(set(details), {
+            'id', 'user', 'user_name', 'venue', 'venue_title', 'venue_thumbnail',
+            'date_start', 'date_end', 'status', 'status_display', 'total_price'
+        })
+        self.assertEqual(details['user_name'], self.user.full_name)
+        self.assertTrue(details['venue_title'].startswith('Площадка'))
+    
+    def test_list_query_budget_with_images(self):
+        """?expand=booking_details - полная бронь, плюс запрос категорий площадок"""
+        results = self.assert_constant_queries(3, {'expand': 'booking_details'})
+        
+        details = results[0]['booking_details']
+        self.assertEqual(len(details['venue_details']['categories']), 2)
+        self.assertNotIn('images', details['venue_details'])
+        self.assertIn('has_review', details)
+        
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/bookings/payments/', {
+                'expand': 'booking_details,booking_details.venue_details.images'
+            })
+        self.assertEqual(len(response.data['results'][0]['booking_details']['venue_details']['images']), 2)
+    
+    def test_list_query_budget_sparse_fields(self):
+        """Без booking_details связанные таблицы не читаются"""
+        results = self.assert_constant_queries(2, {'fields': 'id,booking,amount'})
+        
+        self.assertEqual(set(results[0]), {'id', 'booking', 'amount'})
+    
+    def test_detail_query_budget(self):
+        """Детальный платёж: один запрос с бронью, пользователем и площадкой"""
+        self.add_bookings(1)
+        payment = Payment.objects.get()
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/bookings/payments/{payment.id}/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['booking_details']['id'], payment.booking_id)
+    
+    def test_process_response(self):
+        """Ответ оплаты: платёж перечитывается одним JOIN, URL в ответе абсолютные"""
+        self.add_bookings(1)
+        payment = Payment.objects.get()
+        Venue.objects.filter(pk=payment.booking.venue_id).update(main_thumbnail_path='venue_images/1_medium.jpg')
+        
+        with self.assertNumQueries(10):
+            response = self.client.post(f'/api/bookings/payments/{payment.id}/process/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        details = response.data['payment']['booking_details']
+        self.assertEqual(details['user_name'], self.user.full_name)
+        self.assertTrue(details['venue_thumbnail'].startswith('http://testserver/'))
@@ -1,19 +1,23 @@
 from django.urls import path
 from .views import (
     BookingListCreateView,
+    BookingBulkCreateView,
     BookingDetailView,
     BookingCancelView,
     BookingConfirmView,
     PaymentListCreateView,
     PaymentDetailView,
     PaymentProcessView,
-    OccupiedSlotsView
+    OccupiedSlotsView,
+    VenueAvailabilityView
 )
 
 urlpatterns = [
     # Бронирования
     path('', BookingListCreateView.as_view(), name='booking_list'),
+    path('bulk/', BookingBulkCreateView.as_view(), name='booking_bulk_create'),
     path('occupied-slots/', OccupiedSlotsView.as_view(), name='occupied_slots'),
+    path('availability/', VenueAvailabilityView.as_view(), name='venue_availability'),
     path('<int:pk>/', BookingDetailView.as_view(), name='booking_detail'),
     path('<int:pk>/cancel/', BookingCancelView.as_view(), name='booking_cancel'),
     path('<int:pk>/confirm/', BookingConfirmView.as_view(), name='booking_confirm'),
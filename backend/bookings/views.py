@@ -3,12 +3,28 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
 import logging
+from datetime import datetime
 from rentalall.throttling import BookingRateThrottle
-from .models import Booking, Payment
+from .models import ACTIVE_BOOKING_STATUSES, ArchivedBooking, Booking, Payment, occupies_venue_q
+from .availability import (
+    DATE_FORMAT,
+    END_OF_DAY,
+    get_availability,
+    get_day_bounds,
+    merge_intervals,
+    parse_period
+)
+from .occupancy import get_occupied_intervals
+from .services import select_booking_related, select_payment_related
 from .serializers import (
+    BOOKING_HOLD_EXPIRED_MESSAGE,
+    ArchivedBookingSerializer,
     BookingSerializer,
     BookingCreateSerializer,
+    BookingBulkCreateSerializer,
     BookingUpdateSerializer,
     PaymentSerializer,
     PaymentCreateSerializer
@@ -34,19 +50,30 @@ class BookingListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     throttle_classes = [BookingRateThrottle]  # Ограничение: 10 бронирований/час
     
+    def is_archive_request(self):
+        """?archived=true - история из архивной таблицы (bookings.archive)"""
+        return self.request.method == 'GET' and self.request.query_params.get('archived') in ('1', 'true')
+    
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return BookingCreateSerializer
+        if self.is_archive_request():
+            return ArchivedBookingSerializer
         return BookingSerializer
     
     def get_queryset(self):
         """Пользователи видят только свои бронирования, админы - все"""
-        if self.request.user.is_admin():
-            return Booking.objects.all()
-        return Booking.objects.filter(user=self.request.user)
+        queryset = ArchivedBooking.objects.all() if self.is_archive_request() else Booking.objects.all()
+        if not self.request.user.is_admin():
+            queryset = queryset.filter(user=self.request.user)
+        # Связанные данные загружаются заранее: число запросов не зависит от размера страницы
+        return select_booking_related(queryset, self.request)
     
     def create(self, request, *args, **kwargs):
-        """Создание бронирования с возвратом полного объекта"""
+        """
+        Создание бронирования с возвратом полного объекта.
+        Сервис create_booking возвращает бронь с уже загруженными связанными данными.
+        """
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         booking = serializer.save(user=request.user)
@@ -66,11 +93,36 @@ class BookingListCreateView(generics.ListCreateAPIView):
         )
 
 
+class BookingBulkCreateView(APIView):
+    """
+    Создание серии бронирований (каждую неделю, каждый день или явный список периодов).
+    Вся серия проверяется одним запросом и создаётся одной транзакцией;
+    для ограничения частоты считается одной операцией.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [BookingRateThrottle]
+    
+    def post(self, request):
+        serializer = BookingBulkCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save(user=request.user)
+        
+        logger.info(
+            f"Bulk booking: User={request.user.email}, Venue={result['venue']}, "
+            f"Slots={len(result['results'])}, Created={result['created']}"
+        )
+        
+        response_status = status.HTTP_201_CREATED if result['created'] else status.HTTP_400_BAD_REQUEST
+        return Response(result, status=response_status)
+
+
 class BookingDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Детальная информация о бронировании"""
-    queryset = Booking.objects.all()
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrAdmin]
     
+    def get_queryset(self):
+        return select_booking_related(Booking.objects.all(), self.request)
+    
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
             return BookingUpdateSerializer
@@ -145,7 +197,19 @@ class BookingConfirmView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # Слот истёкшего удержания мог уже занять другой пользователь
+        if booking.is_hold_expired():
+            logger.warning(
+                f"Booking confirm failed: ID={pk}, Admin={request.user.email}, "
+                f"Reason=Hold expired at {booking.expires_at}"
+            )
+            return Response(
+                {'error': BOOKING_HOLD_EXPIRED_MESSAGE},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         booking.status = 'confirmed'
+        booking.expires_at = None
         booking.save()
         
         logger.info(
@@ -170,9 +234,10 @@ class PaymentListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Пользователи видят только свои платежи, админы - все"""
-        if self.request.user.is_admin():
-            return Payment.objects.all()
-        return Payment.objects.filter(booking__user=self.request.user)
+        queryset = Payment.objects.all()
+        if not self.request.user.is_admin():
+            queryset = queryset.filter(booking__user=self.request.user)
+        return select_payment_related(queryset, self.request)
     
     def create(self, request, *args, **kwargs):
         """Создание платежа"""
@@ -190,20 +255,23 @@ class PaymentListCreateView(generics.ListCreateAPIView):
         payment = serializer.save()
         
         return Response(
-            PaymentSerializer(payment).data,
+            PaymentSerializer(payment, context=self.get_serializer_context()).data,
             status=status.HTTP_201_CREATED
         )
 
 
 class PaymentDetailView(generics.RetrieveAPIView):
     """Детальная информация о платеже"""
-    queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrAdmin]
+    
+    def get_queryset(self):
+        return select_payment_related(Payment.objects.all(), self.request)
 
 
-class PaymentProcessView(APIView):
+class PaymentProcessView(generics.GenericAPIView):
     """Обработка платежа (имитация оплаты для диплома)"""
+    serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     @transaction.atomic
@@ -234,6 +302,18 @@ class PaymentProcessView(APIView):
         payment = Payment.objects.select_for_update().get(pk=pk)
         booking = Booking.objects.select_for_update().get(pk=payment.booking.id)
         
+        # Оплатить можно только подтверждённую бронь или ожидающую с действующим удержанием:
+        # после истечения удержания слот мог быть занят
+        if booking.status not in ACTIVE_BOOKING_STATUSES or booking.is_hold_expired():
+            logger.warning(
+                f"Payment rejected: Payment={pk}, User={request.user.email}, "
+                f"Reason=Booking status {booking.status}, hold expires at {booking.expires_at}"
+            )
+            return Response(
+                {'error': BOOKING_HOLD_EXPIRED_MESSAGE},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         # Имитация успешной оплаты
         payment.status = 'paid'
         payment.save()
@@ -241,6 +321,7 @@ class PaymentProcessView(APIView):
         # Автоматически подтверждаем бронирование после оплаты
         if booking.status == 'pending':
             booking.status = 'confirmed'
+            booking.expires_at = None
             booking.save()
         
         logger.info(
@@ -248,17 +329,24 @@ class PaymentProcessView(APIView):
             f"Amount={payment.amount}, Booking={booking.id}"
         )
         
+        # Ответ - с тем же планом загрузки связанных данных, что и список платежей
+        payment = select_payment_related(Payment.objects.all(), request).get(pk=pk)
         return Response(
             {
                 'message': 'Платеж успешно обработан',
-                'payment': PaymentSerializer(payment).data
+                'payment': PaymentSerializer(payment, context=self.get_serializer_context()).data
             },
             status=status.HTTP_200_OK
         )
 
 
 class OccupiedSlotsView(APIView):
-    """Получение занятых временных слотов для площадки на определенную дату"""
+    """
+    Получение занятых временных слотов для площадки на определенную дату.
+    День - интервал [00:00, 24:00) в часовом поясе settings.TIME_ZONE; учитываются
+    и брони, начавшиеся накануне и переходящие через полночь. Смежные и
+    пересекающиеся брони объединяются в один слот.
+    """
     permission_classes = []  # Доступно всем
     
     def get(self, request):
@@ -270,54 +358,88 @@ class OccupiedSlotsView(APIView):
                 {'error': 'Параметры venue и date обязательны'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if not venue_id.isdigit():
+            return Response(
+                {'error': 'Параметр venue должен быть числом'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         try:
-            from datetime import datetime, timedelta
-            from django.db.models import Q
-            
-            # Парсим дату
-            date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            
-            # Получаем все бронирования для площадки на эту дату
-            # Исключаем только отмененные
-            bookings = Booking.objects.filter(
-                venue_id=venue_id,
-                date_start__date=date
-            ).exclude(
-                status='cancelled'
-            ).values('date_start', 'date_end')
-            
-            # Формируем список занятых слотов в формате "HH:MM - HH:MM"
-            # Конвертируем из UTC в локальное время
-            from zoneinfo import ZoneInfo
-            
-            # Определяем локальную временную зону
-            local_tz = ZoneInfo('Europe/Moscow')  # UTC+3 Москва
-            
-            occupied_slots = []
-            for booking in bookings:
-                # Конвертируем UTC время в локальное
-                start_local = booking['date_start'].astimezone(local_tz)
-                end_local = booking['date_end'].astimezone(local_tz)
-                
-                start_time = start_local.strftime('%H:%M')
-                end_time = end_local.strftime('%H:%M')
-                occupied_slots.append(f"{start_time} - {end_time}")
-            
-            return Response({
-                'date': date_str,
-                'venue': venue_id,
-                'occupied_slots': occupied_slots
-            })
-            
+            date = datetime.strptime(date_str, DATE_FORMAT).date()
         except ValueError:
             return Response(
                 {'error': 'Неверный формат даты. Используйте YYYY-MM-DD'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        except Exception as e:
+        
+        local_tz = timezone.get_default_timezone()
+        day_start, day_end = get_day_bounds(date, local_tz)
+        
+        # Прошедшие дни индекс занятости не хранит - для них читаем БД
+        intervals = get_occupied_intervals(int(venue_id), day_start, day_end)
+        if intervals is None:
+            # Пересечение с [day_start, day_end) без функций над столбцами - работает индекс
+            # bookings_venue_status_start
+            bookings = Booking.objects.filter(
+                occupies_venue_q(),
+                venue_id=venue_id,
+                status__in=ACTIVE_BOOKING_STATUSES,
+                date_start__lt=day_end,
+                date_end__gt=day_start
+            ).order_by('date_start').values_list('date_start', 'date_end')
+            intervals = merge_intervals(bookings)
+        
+        slots = []
+        for date_start, date_end in intervals:
+            start_local = date_start.astimezone(local_tz)
+            end_local = date_end.astimezone(local_tz)
+            # Подпись обрезается границами дня: "22:00 - 24:00", "00:00 - 02:00"
+            start_label = start_local.strftime('%H:%M') if date_start > day_start else '00:00'
+            end_label = end_local.strftime('%H:%M') if date_end < day_end else END_OF_DAY
+            slots.append({
+                'start': start_local.isoformat(),
+                'end': end_local.isoformat(),
+                'label': f'{start_label} - {end_label}',
+            })
+        
+        return Response({
+            'date': date_str,
+            'venue': venue_id,
+            'timezone': str(local_tz),
+            'occupied_slots': [slot['label'] for slot in slots],
+            'slots': slots
+        })
+
+
+class VenueAvailabilityView(APIView):
+    """
+    Календарь занятости площадки за период: ?venue=1&from=YYYY-MM-DD&to=YYYY-MM-DD.
+    Поддерживает условные запросы: при совпадении If-None-Match возвращается 304
+    (данные и ETag берутся из кэша, без обращения к БД).
+    """
+    permission_classes = []  # Доступно всем
+    
+    def get(self, request):
+        venue_id = request.query_params.get('venue', '')
+        if not venue_id.isdigit():
             return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'Параметр venue обязателен и должен быть числом'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-
+        try:
+            date_from, date_to = parse_period(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        venue_id = int(venue_id)
+        data, etag = get_availability(venue_id, date_from, date_to)
+        quoted_etag = quote_etag(etag)
+        
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if quoted_etag in if_none_match or '*' in if_none_match:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = quoted_etag
+        response['Cache-Control'] = 'no-cache'
+        return response
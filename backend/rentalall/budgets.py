@@ -0,0 +1,288 @@
+"""
+Бюджеты стоимости API: число SQL-запросов, время SQL, время сериализации и размер ответа.
+
+Данные заполняются быстрыми bulk-фабриками (seed_budget_fixtures), каждая точка API
+из rentalall/urls.py вызывается один раз с холодным кэшем (measure_endpoint),
+результат сравнивается с бюджетом из perf_budgets.json (check_budget).
+Запуск: python manage.py test rentalall.test_budgets
+(PERF_BUDGET_SCALE=1 - полный объём: 10k площадок, 100k броней, 50k отзывов;
+PERF_BUDGET_UPDATE=1 - перезаписать бюджеты текущей СУБД по результатам замеров).
+Бюджеты хранятся отдельно для каждой СУБД (connection.vendor): на PostgreSQL часть точек
+выполняет другие запросы (exclusion constraint, снятие удержаний под блокировкой площадки).
+Бюджеты снимаются на полном объёме и действуют для любого масштаба: число запросов
+на страницу от объёма не зависит, размер ответа и время на малых данных меньше.
+"""
+import json
+import math
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework import serializers
+
+BUDGET_FILE = Path(__file__).resolve().parent / 'perf_budgets.json'
+
+# Объём данных при PERF_BUDGET_SCALE=1
+FULL_FIXTURE_SIZES = {
+    'users': 1000,
+    'venues': 10000,
+    'bookings': 100000,
+    'reviews': 50000,
+}
+DEFAULT_SCALE = 0.01
+BULK_BATCH_SIZE = 2000
+CATEGORIES = 10
+PASSWORD = 'testpass123'
+
+# Метрики бюджета; время - в миллисекундах
+BUDGET_METRICS = ('queries', 'sql_ms', 'serializer_ms', 'bytes')
+# Запас при PERF_BUDGET_UPDATE=1 (множитель): число запросов - точно, остальное с запасом на шум
+BUDGET_HEADROOM = {
+    'sql_ms': 5,
+    'serializer_ms': 5,
+    'bytes': 1.25,
+}
+MIN_TIME_BUDGET_MS = 50
+
+# Точки API, для которых бюджет не нужен
+SKIPPED_URL_NAMES = {
+    'schema-swagger-ui',    # Документация
+    'schema-redoc',
+    'venue_image_upload',   # Стоимость определяется обработкой файлов, а не запросами
+    'venue_image_delete',
+}
+# Префиксы, которые не обходятся (админка Django)
+SKIPPED_URL_PREFIXES = ('admin/',)
+
+
+def get_fixture_sizes(scale):
+    """Размеры наборов данных для масштаба scale (не меньше, чем нужно для полной страницы)"""
+    return {name: max(int(size * scale), 10) for name, size in FULL_FIXTURE_SIZES.items()}
+
+
+def seed_budget_fixtures(scale=DEFAULT_SCALE):
+    """
+    Заполнить БД данными для замеров через bulk_create, без сигналов и хеширования паролей.
+    Возвращает словарь объектов, на которые ссылаются точки API (пользователь, площадка, бронь...).
+    """
+    from bookings.models import Booking, Payment
+    from reviews.models import Review
+    from venues.geo import get_geo_cell
+    from venues.models import Category, Venue, VenueCategory
+    
+    User = get_user_model()
+    sizes = get_fixture_sizes(scale)
+    now = timezone.now()
+    password = make_password(PASSWORD)
+    
+    users = User.objects.bulk_create([
+        User(username=f'budget{i}', email=f'budget{i}@test.com', password=password, full_name=f'Пользователь {i}')
+        for i in range(sizes['users'])
+    ], batch_size=BULK_BATCH_SIZE)
+    admin = User.objects.create(
+        username='budget_admin', email='budget_admin@test.com', password=password, role='admin', is_staff=True
+    )
+    categories = Category.objects.bulk_create([
+        Category(name=f'Категория {i}') for i in range(CATEGORIES)
+    ])
+    
+    venues = []
+    for i in range(sizes['venues']):
+        latitude = Decimal('55.750000') + Decimal(i % 100) / 1000
+        longitude = Decimal('37.600000') + Decimal(i // 100 % 100) / 1000
+        venues.append(Venue(
+            owner=admin,
+            title=f'Площадка {i}',
+            description='Просторный зал для мероприятий',
+            capacity=10 + i % 200,
+            price_per_hour=Decimal(500 + i % 50 * 100),
+            address=f'ул. Тестовая, д. {i}',
+            latitude=latitude,
+            longitude=longitude,
+            geo_cell=get_geo_cell(latitude, longitude),
+            is_active=i % 20 != 0,
+            main_image_path=f'venue_images/{i}.jpg',
+            main_thumbnail_path=f'venue_images/thumbnails/{i}_medium.jpg',
+            main_thumbnail_webp_path=f'venue_images/thumbnails/{i}_medium.webp'
+        ))
+    venues = Venue.objects.bulk_create(venues, batch_size=BULK_BATCH_SIZE)
+    VenueCategory.objects.bulk_create([
+        VenueCategory(venue=venue, category=categories[(i + k) % CATEGORIES])
+        for i, venue in enumerate(venues)
+        for k in range(2)
+    ], batch_size=BULK_BATCH_SIZE)
+    
+    # Брони каждой площадки идут подряд с шагом в неделю и не пересекаются;
+    # первые - в прошлом, последние - в ближайшие недели
+    per_venue = math.ceil(sizes['bookings'] / len(venues))
+    first_start = now - timedelta(weeks=per_venue - 2)
+    statuses = ('confirmed', 'confirmed', 'pending', 'cancelled')
+    bookings = []
+    for k in range(sizes['bookings']):
+        venue = venues[k % len(venues)]
+        start = (first_start + timedelta(weeks=k // len(venues), hours=k % 12)).replace(microsecond=0)
+        bookings.append(Booking(
+            user=users[k % len(users)],
+            venue=venue,
+            date_start=start,
+            date_end=start + timedelta(hours=2),
+            status=statuses[k % len(statuses)],
+            total_price=venue.price_per_hour * 2
+        ))
+    bookings = Booking.objects.bulk_create(bookings, batch_size=BULK_BATCH_SIZE)
+    Payment.objects.bulk_create([
+        Payment(booking=booking, amount=booking.total_price, status='paid' if booking.status == 'confirmed' else 'pending')
+        for booking in bookings if booking.status != 'cancelled'
+    ], batch_size=BULK_BATCH_SIZE)
+    
+    past_bookings = [booking for booking in bookings if booking.date_end < now]
+    Review.objects.bulk_create([
+        Review(
+            user=booking.user,
+            venue=booking.venue,
+            booking=booking,
+            rating=k % 5 + 1,
+            comment='Всё понравилось, рекомендую',
+            is_approved=k % 5 != 0
+        )
+        for k, booking in enumerate(past_bookings[:sizes['reviews']])
+    ], batch_size=BULK_BATCH_SIZE)
+    Venue.recalculate_ratings()
+    
+    # Объекты для точек API одной брони: ожидающая бронь с неоплаченным платежом
+    # и прошедшая подтверждённая бронь без отзыва
+    user = users[0]
+    booking = Booking.objects.filter(user=user, date_start__gt=now).order_by('date_start').first()
+    Booking.objects.filter(pk=booking.pk).update(status='pending')
+    Payment.objects.filter(booking=booking).delete()
+    payment = Payment.objects.create(booking=booking, amount=booking.total_price)
+    past_booking = Booking.objects.filter(user=user, date_end__lt=now, review__isnull=True).first()
+    Booking.objects.filter(pk=past_booking.pk).update(status='confirmed')
+    
+    return {
+        'user': user,
+        'admin': admin,
+        'venue': venues[1],
+        'booking': booking,
+        'past_booking': past_booking,
+        'payment': payment,
+        'review': Review.objects.filter(user=user).first(),
+        'pending_review': Review.objects.filter(is_approved=False).first(),
+        'now': now,
+    }
+
+
+def get_url_names(resolver=None, prefix=''):
+    """Имена всех точек API из rentalall/urls.py (кроме SKIPPED_URL_PREFIXES)"""
+    resolver = resolver or get_resolver()
+    names = set()
+    for pattern in resolver.url_patterns:
+        route = prefix + str(pattern.pattern)
+        if route.startswith(SKIPPED_URL_PREFIXES):
+            continue
+        if isinstance(pattern, URLResolver):
+            names |= get_url_names(pattern, route)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+@contextmanager
+def measure_serializers(timings):
+    """
+    Суммарное время в Serializer.data / ListSerializer.data (корневые сериализаторы),
+    включая ленивые запросы при сериализации. Результат добавляется в timings['serializer'].
+    """
+    originals = {cls: cls.data for cls in (serializers.Serializer, serializers.ListSerializer)}
+    depth = [0]
+    
+    def wrap(prop):
+        def data(self):
+            depth[0] += 1
+            started = time.perf_counter()
+            try:
+                return prop.fget(self)
+            finally:
+                depth[0] -= 1
+                if not depth[0]:
+                    timings['serializer'] += time.perf_counter() - started
+        return property(data)
+    
+    for cls, prop in originals.items():
+        cls.data = wrap(prop)
+    try:
+        yield timings
+    finally:
+        for cls, prop in originals.items():
+            cls.data = prop
+
+
+def measure_endpoint(client, connection, method, url, data=None):
+    """
+    Вызвать точку API с холодным кэшем и вернуть (response, метрики).
+    Изменения в БД откатываются, чтобы точки не влияли друг на друга.
+    Кэш очищается целиком, поэтому вызывающий код подменяет CACHES локальным кэшем.
+    """
+    cache.clear()
+    timings = {'serializer': 0.0}
+    with transaction.atomic():
+        with CaptureQueriesContext(connection) as queries, measure_serializers(timings):
+            response = getattr(client, method)(url, data)
+        transaction.set_rollback(True)
+    
+    metrics = {
+        'queries': len(queries.captured_queries),
+        'sql_ms': round(sum(float(query['time']) for query in queries.captured_queries) * 1000, 2),
+        'serializer_ms': round(timings['serializer'] * 1000, 2),
+        'bytes': len(response.content),
+    }
+    return response, metrics
+
+
+def load_budgets(vendor, path=BUDGET_FILE):
+    """Бюджеты СУБД vendor из файла: {имя точки API: {метрика: предел}} (пустой, если их нет)"""
+    if not path.exists():
+        return {}
+    with open(path, encoding='utf-8') as budget_file:
+        return json.load(budget_file).get(vendor, {})
+
+
+def check_budget(metrics, budget):
+    """Список превышений бюджета в виде строк 'метрика: значение > предел'"""
+    return [
+        f'{metric}: {metrics[metric]} > {budget[metric]}'
+        for metric in BUDGET_METRICS
+        if metric in budget and metrics[metric] > budget[metric]
+    ]
+
+
+def make_budget(metrics):
+    """Бюджет по результатам замера с запасом BUDGET_HEADROOM"""
+    return {
+        'queries': metrics['queries'],
+        'sql_ms': max(MIN_TIME_BUDGET_MS, math.ceil(metrics['sql_ms'] * BUDGET_HEADROOM['sql_ms'])),
+        'serializer_ms': max(
+            MIN_TIME_BUDGET_MS, math.ceil(metrics['serializer_ms'] * BUDGET_HEADROOM['serializer_ms'])
+        ),
+        'bytes': math.ceil(metrics['bytes'] * BUDGET_HEADROOM['bytes']),
+    }
+
+
+def save_budgets(vendor, budgets, path=BUDGET_FILE):
+    """Заменить в файле бюджеты СУБД vendor, бюджеты остальных СУБД сохраняются"""
+    all_budgets = {}
+    if path.exists():
+        with open(path, encoding='utf-8') as budget_file:
+            all_budgets = json.load(budget_file)
+    all_budgets[vendor] = budgets
+    with open(path, 'w', encoding='utf-8') as budget_file:
+        json.dump(all_budgets, budget_file, ensure_ascii=False, indent=2, sort_keys=True)
+        budget_file.write('\n')
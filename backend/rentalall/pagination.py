@@ -0,0 +1,210 @@
+"""
+Пагинация API: номера страниц по умолчанию и keyset (cursor) режим по запросу
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPaginator:
+    """
+    Keyset-пагинация по составному ключу сортировки.
+    
+    Позиция курсора - значения всех полей сортировки последней (или первой)
+    записи страницы, поэтому следующая страница выбирается условием
+    (a, b, id) > (x, y, z) без OFFSET и без COUNT(*).
+    Для устойчивости к одинаковым значениям в конец сортировки добавляется id.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор'
+    
+    def __init__(self, page_size):
+        self.page_size = page_size
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        self.model = queryset.model
+        queryset = queryset.order_by(*self.ordering)
+        
+        position, reverse = self.decode_cursor(request)
+        self.has_cursor = position is not None
+        
+        if position is not None:
+            queryset = queryset.filter(self.build_position_filter(position, reverse))
+        if reverse:
+            queryset = queryset.order_by(*[self.invert(term) for term in self.ordering])
+        
+        # Берём на одну запись больше, чтобы понять, есть ли ещё страница
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        
+        if reverse:
+            results.reverse()
+            self.has_next = self.has_cursor
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.has_cursor
+        
+        self.page = results
+        return results
+    
+    def get_ordering(self, queryset):
+        """Сортировка из queryset (OrderingFilter) или Meta.ordering + id как tie-breaker"""
+        ordering = [term for term in queryset.query.order_by if isinstance(term, str)]
+        if not ordering:
+            ordering = [term for term in queryset.model._meta.ordering if isinstance(term, str)]
+        
+        if not any(term.lstrip('-') in ('id', 'pk') for term in ordering):
+            ordering.append('id')
+        return ordering
+    
+    @staticmethod
+    def invert(term):
+        return term[1:] if term.startswith('-') else f'-{term}'
+    
+    def get_field(self, name):
+        """Поле модели по пути сортировки (с учётом связей через __)"""
+        model = self.model
+        field = None
+        for part in name.split(LOOKUP_SEP):
+            if part == 'pk':
+                part = model._meta.pk.name
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:
+                return None
+            if field.is_relation and field.related_model is not None:
+                model = field.related_model
+        return field
+    
+    def get_value(self, obj, name):
+        for part in name.split(LOOKUP_SEP):
+            obj = getattr(obj, part)
+            if obj is None:
+                break
+        if isinstance(obj, (datetime, date, time)):
+            return obj.isoformat()
+        if isinstance(obj, Decimal):
+            return str(obj)
+        return obj
+    
+    def build_position_filter(self, position, reverse):
+        """Лексикографическое условие "строго после позиции" для составного ключа"""
+        condition = Q()
+        equal_prefix = Q()
+        for term, value in zip(self.ordering, position):
+            name = term.lstrip('-')
+            descending = term.startswith('-') != reverse
+            condition |= equal_prefix & Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+            equal_prefix &= Q(**{name: value})
+        
+        # Избыточное условие по первому полю позволяет использовать индекс как диапазон
+        first = self.ordering[0]
+        first_descending = first.startswith('-') != reverse
+        bound = Q(**{f'{first.lstrip("-")}__{"lte" if first_descending else "gte"}': position[0]})
+        return bound & condition
+    
+    def encode_cursor(self, obj, reverse):
+        payload = {
+            'p': [self.get_value(obj, term.lstrip('-')) for term in self.ordering],
+            'r': int(reverse),
+        }
+        data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return urlsafe_b64encode(data).decode('ascii')
+    
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values = payload['p']
+            reverse = bool(payload.get('r', 0))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError('cursor length mismatch')
+            
+            position = []
+            for term, value in zip(self.ordering, values):
+                field = self.get_field(term.lstrip('-'))
+                if field is not None and value is not None:
+                    field = getattr(field, 'target_field', field)
+                    value = field.to_python(value)
+                position.append(value)
+        except (TypeError, ValueError, KeyError, ValidationError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        
+        return position, reverse
+    
+    def get_next_cursor(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+    
+    def get_previous_cursor(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+    
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+    
+    def get_paginated_response(self, data):
+        next_cursor = self.get_next_cursor()
+        previous_cursor = self.get_previous_cursor()
+        return Response(OrderedDict([
+            ('next', self.get_link(next_cursor)),
+            ('previous', self.get_link(previous_cursor)),
+            ('next_cursor', next_cursor),
+            ('previous_cursor', previous_cursor),
+            ('results', data),
+        ]))
+
+
+class StandardPagination(PageNumberPagination):
+    """
+    Пагинация по умолчанию для всех списков API.
+    
+    Обычный режим - номера страниц (?page=N) с общим количеством записей.
+    Режим keyset включается параметром ?pagination=cursor (или наличием ?cursor=):
+    без OFFSET и COUNT(*), стоимость не зависит от глубины страницы.
+    """
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    
+    def is_cursor_mode(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == self.cursor_mode
+            or KeysetPaginator.cursor_query_param in request.query_params
+        )
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        
+        if self.is_cursor_mode(request):
+            self.keyset = KeysetPaginator(page_size)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+    
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,90 @@
+"""
+Общие возможности сериализаторов API
+"""
+from rest_framework import serializers
+
+FIELDS_QUERY_PARAM = 'fields'
+EXPAND_QUERY_PARAM = 'expand'
+
+
+def get_query_list(request, param):
+    """Список значений параметра вида ?param=a,b,c (пустой, если параметра нет)"""
+    if request is None:
+        return []
+    value = request.query_params.get(param, '')
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def is_expanded(request, path):
+    """Запрошено ли раскрытие поля (?expand=images или ?expand=venue_details.images)"""
+    return path in get_query_list(request, EXPAND_QUERY_PARAM)
+
+
+def is_field_included(request, path):
+    """
+    Попадёт ли поле в ответ с учётом ?fields=.
+    Для вложенных полей путь задаётся через точку: venue_details.categories
+    """
+    requested = get_query_list(request, FIELDS_QUERY_PARAM)
+    parts = path.split('.')
+    for depth in range(len(parts)):
+        prefix = '.'.join(parts[:depth])
+        prefix = f'{prefix}.' if prefix else ''
+        selected = {
+            name[len(prefix):].split('.')[0]
+            for name in requested if name.startswith(prefix)
+        }
+        if selected and parts[depth] not in selected:
+            return False
+    return True
+
+
+class SparseFieldsetMixin:
+    """
+    Выборочный набор полей сериализатора по параметрам запроса (sparse fieldsets).
+    
+    ?fields=id,title - вернуть только перечисленные поля;
+    ?expand=images - добавить поля из Meta.expandable_fields, которые по умолчанию скрыты.
+    Для вложенных сериализаторов используется путь через точку:
+    ?fields=id,venue_details.title&expand=venue_details.images
+    """
+    
+    def get_sparse_prefix(self):
+        """Путь сериализатора от корня ('' для корневого, 'venue_details.' для вложенного)"""
+        path = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return ''.join(f'{name}.' for name in reversed(path))
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        prefix = self.get_sparse_prefix()
+        
+        expanded = {
+            name[len(prefix):] for name in get_query_list(request, EXPAND_QUERY_PARAM)
+            if name.startswith(prefix)
+        }
+        for name in getattr(self.Meta, 'expandable_fields', ()):
+            if name not in expanded:
+                fields.pop(name, None)
+        
+        selected = {
+            name[len(prefix):].split('.')[0]
+            for name in get_query_list(request, FIELDS_QUERY_PARAM)
+            if name.startswith(prefix)
+        }
+        if selected:
+            for name in list(fields):
+                if name not in selected:
+                    fields.pop(name)
+        
+        return fields
+
+
+class SparseModelSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """ModelSerializer с поддержкой ?fields= и ?expand="""
+    pass
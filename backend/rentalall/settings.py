@@ -142,7 +142,8 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Номера страниц по умолчанию, keyset-режим по ?pagination=cursor
+    'DEFAULT_PAGINATION_CLASS': 'rentalall.pagination.StandardPagination',
     'PAGE_SIZE': 12,
     'DEFAULT_THROTTLE_CLASSES': [
         'rest_framework.throttling.AnonRateThrottle',
@@ -177,6 +178,17 @@ CORS_ALLOW_CREDENTIALS = True
 BOOKING_MIN_DURATION_HOURS = 1  # Минимальная длительность бронирования (часы)
 BOOKING_MAX_DURATION_HOURS = 24  # Максимальная длительность бронирования (часы)
 BOOKING_MAX_ADVANCE_DAYS = 90  # Максимальное количество дней для бронирования заранее
+BOOKING_BULK_MAX_SLOTS = 52  # Максимальное количество слотов в серии бронирований
+BOOKING_HOLD_MINUTES = 30  # Сколько минут неоплаченная бронь удерживает слот (снимает expire_booking_holds)
+BOOKING_ARCHIVE_AFTER_MONTHS = 12  # Через сколько месяцев после окончания бронь переносится в архив
+BOOKING_OCCUPANCY_INDEX_ENABLED = True  # Индекс занятости площадок в памяти процесса
+BOOKING_OCCUPANCY_LOCAL_TTL = 60  # Через сколько секунд перечитывать индекс площадки (сдвиг горизонта)
+BOOKING_OCCUPANCY_MAX_VENUES = 1000  # Сколько площадок держать в памяти одного процесса
+# Общая копия индекса в Redis (sorted set на площадку) для всех воркеров gunicorn
+BOOKING_OCCUPANCY_REDIS_MIRROR = config('BOOKING_OCCUPANCY_REDIS_MIRROR', default=False, cast=bool)
+
+# Настройки отзывов
+REVIEW_MODERATION_MAX_ITEMS = 100  # Максимальное количество отзывов в одном запросе модерации
 
 # Security settings for production
 if not DEBUG:
@@ -336,5 +348,8 @@ CACHES = {
 CACHE_TTL = {
     'venue_rating': 60 * 60,  # 1 час для рейтинга площадки
     'venue_list': 60 * 5,     # 5 минут для списка площадок
+    'venue_detail': 60 * 15,  # 15 минут для детальной страницы площадки
+    'categories': 60 * 60,    # 1 час для списка категорий
+    'venue_availability': 60 * 5,  # 5 минут для календаря занятости площадки
 }
 
@@ -0,0 +1,144 @@
+"""
+Бюджеты стоимости точек API (см. rentalall.budgets и perf_budgets.json)
+"""
+import os
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .budgets import (
+    DEFAULT_SCALE,
+    PASSWORD,
+    SKIPPED_URL_NAMES,
+    check_budget,
+    get_url_names,
+    load_budgets,
+    make_budget,
+    measure_endpoint,
+    save_budgets,
+    seed_budget_fixtures
+)
+
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def get_endpoints(data):
+    """
+    Точки API для замеров: (имя URL, метод, пользователь, путь, параметры или тело).
+    data - объекты из seed_budget_fixtures.
+    """
+    user, admin, venue = data['user'], data['admin'], data['venue']
+    day = (data['now'] + timedelta(days=3)).replace(hour=12, minute=0, second=0, microsecond=0)
+    return [
+        ('token_obtain_pair', 'post', None, '/api/users/login/', {'username': user.username, 'password': PASSWORD}),
+        ('token_refresh', 'post', None, '/api/users/token/refresh/', {'refresh': str(RefreshToken.for_user(user))}),
+        ('user_register', 'post', None, '/api/users/register/', {
+            'username': 'budget_new', 'email': 'budget_new@test.com',
+            'password': 'Budget-pass-2024', 'password2': 'Budget-pass-2024'
+        }),
+        ('user_profile', 'get', user, '/api/users/profile/', None),
+        ('change_password', 'post', user, '/api/users/change-password/', {
+            'old_password': PASSWORD, 'new_password': 'Budget-pass-2024', 'new_password2': 'Budget-pass-2024'
+        }),
+        ('user_list', 'get', admin, '/api/users/', None),
+        
+        ('category_list', 'get', None, '/api/venues/categories/', None),
+        ('venue_list', 'get', None, '/api/venues/', None),
+        ('venue_detail', 'get', None, f'/api/venues/{venue.id}/', None),
+        ('venue_geo', 'get', None, '/api/venues/geo/', {'bbox': '37.5,55.7,37.8,55.9', 'zoom': 12}),
+        
+        ('booking_list', 'get', user, '/api/bookings/', None),
+        ('booking_list', 'post', user, '/api/bookings/', {
+            'venue': venue.id, 'date_start': day.isoformat(), 'date_end': (day + timedelta(hours=2)).isoformat()
+        }),
+        ('booking_bulk_create', 'post', user, '/api/bookings/bulk/', {
+            'venue': venue.id,
+            'date_start': (day + timedelta(days=1)).isoformat(),
+            'date_end': (day + timedelta(days=1, hours=2)).isoformat(),
+            'recurrence': {'freq': 'daily', 'count': 5}
+        }),
+        ('occupied_slots', 'get', None, '/api/bookings/occupied-slots/', {
+            'venue': venue.id, 'date': day.strftime(DATE_FORMAT)
+        }),
+        ('venue_availability', 'get', None, '/api/bookings/availability/', {
+            'venue': venue.id, 'from': day.strftime(DATE_FORMAT), 'to': (day + timedelta(days=30)).strftime(DATE_FORMAT)
+        }),
+        ('booking_detail', 'get', user, f'/api/bookings/{data["booking"].id}/', None),
+        ('booking_cancel', 'post', user, f'/api/bookings/{data["booking"].id}/cancel/', None),
+        ('booking_confirm', 'post', admin, f'/api/bookings/{data["booking"].id}/confirm/', None),
+        
+        ('payment_list', 'get', user, '/api/bookings/payments/', None),
+        ('payment_list', 'post', user, '/api/bookings/payments/', {'booking': data['booking'].id}),
+        ('payment_detail', 'get', user, f'/api/bookings/payments/{data["payment"].id}/', None),
+        ('payment_process', 'post', user, f'/api/bookings/payments/{data["payment"].id}/process/', None),
+        
+        ('review_list', 'get', None, '/api/reviews/', {'venue': venue.id}),
+        ('user_review_list', 'get', user, '/api/reviews/my/', None),
+        ('review_create', 'post', user, '/api/reviews/create/', {
+            'booking': data['past_booking'].id, 'rating': 5, 'comment': 'Отличная площадка'
+        }),
+        ('review_detail', 'get', user, f'/api/reviews/{data["review"].id}/', None),
+        ('pending_reviews', 'get', admin, '/api/reviews/pending/', None),
+        ('review_approve', 'post', admin, f'/api/reviews/{data["pending_review"].id}/approve/', None),
+        ('review_disapprove', 'post', admin, f'/api/reviews/{data["review"].id}/disapprove/', None),
+        ('review_moderate', 'post', admin, '/api/reviews/moderate/', {'reviews': [
+            {'id': data['pending_review'].id, 'action': 'approve'},
+            {'id': data['review'].id, 'action': 'disapprove'},
+        ]}),
+    ]
+
+
+# measure_endpoint очищает кэш перед каждым замером - только локальный кэш, не Redis
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'budget-cache',
+        }
+    },
+    APPEND_SLASH=False,
+    SECURE_SSL_REDIRECT=False,
+    SECURE_PROXY_SSL_HEADER=None
+)
+class EndpointBudgetTestCase(TestCase):
+    """Число запросов, время SQL и сериализации, размер ответа каждой точки API в пределах бюджета"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_budget_fixtures(float(os.environ.get('PERF_BUDGET_SCALE', DEFAULT_SCALE)))
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        self.endpoints = get_endpoints(self.data)
+    
+    def test_all_urls_covered(self):
+        """Для каждой точки API из rentalall/urls.py есть замер или явное исключение"""
+        measured = {name for name, *_ in self.endpoints}
+        self.assertEqual(get_url_names() - SKIPPED_URL_NAMES - measured, set())
+    
+    def test_budgets(self):
+        update = bool(os.environ.get('PERF_BUDGET_UPDATE'))
+        budgets = {} if update else load_budgets(connection.vendor)
+        if not update and not budgets:
+            # Бюджеты записываются только по реальным замерам на этой СУБД
+            self.skipTest(f'Нет бюджетов для {connection.vendor}: запишите их с PERF_BUDGET_UPDATE=1')
+        measured = {}
+        
+        for name, method, user, path, params in self.endpoints:
+            key = f'{method.upper()} {name}'
+            self.client.force_authenticate(user=user)
+            response, metrics = measure_endpoint(self.client, connection, method, path, params)
+            measured[key] = metrics
+            
+            with self.subTest(endpoint=key):
+                self.assertLess(response.status_code, 400, response.content[:500])
+                if not update:
+                    self.assertIn(key, budgets, 'Нет бюджета для точки API')
+                    self.assertEqual(check_budget(metrics, budgets.get(key, {})), [])
+        
+        if update:
+            save_budgets(connection.vendor, {key: make_budget(metrics) for key, metrics in measured.items()})
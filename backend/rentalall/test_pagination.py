@@ -0,0 +1,134 @@
+"""
+Тесты keyset (cursor) пагинации
+"""
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework import status
+from datetime import timedelta
+from django.utils import timezone
+from decimal import Decimal
+
+from venues.models import Venue
+from bookings.models import Booking
+
+User = get_user_model()
+
+
+@override_settings(
+    APPEND_SLASH=False,
+    SECURE_SSL_REDIRECT=False,
+    SECURE_PROXY_SSL_HEADER=None
+)
+class KeysetPaginationTestCase(TestCase):
+    """Тесты режима ?pagination=cursor"""
+    
+    def setUp(self):
+        cache.clear()  # Сбрасываем счётчики throttling от других тестов
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        
+        # Много одинаковых цен, чтобы проверить tie-breaker по id
+        self.venues = [
+            Venue.objects.create(
+                owner=self.user,
+                title=f'Площадка {i}',
+                description='Описание',
+                capacity=10 + i,
+                price_per_hour=Decimal('1000.00') + Decimal((i % 3) * 100),
+                address=f'ул. Тестовая, д. {i}',
+                is_active=True
+            )
+            for i in range(30)
+        ]
+    
+    def collect_pages(self, params):
+        """Пройти все страницы по next_cursor, вернуть список id"""
+        ids = []
+        response = self.client.get('/api/venues/', params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(venue['id'] for venue in response.data['results'])
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                return ids
+            response = self.client.get('/api/venues/', {**params, 'cursor': cursor})
+    
+    def test_cursor_mode_walks_all_venues_without_duplicates(self):
+        """Курсор проходит весь каталог без пропусков и повторов"""
+        ids = self.collect_pages({'pagination': 'cursor'})
+        
+        expected = list(Venue.objects.order_by('-created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+    
+    def test_cursor_mode_with_ties_in_ordering(self):
+        """Сортировка по неуникальному полю использует id как tie-breaker"""
+        ids = self.collect_pages({'pagination': 'cursor', 'ordering': 'price_per_hour'})
+        
+        expected = list(Venue.objects.order_by('price_per_hour', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+    
+    def test_cursor_mode_skips_count_query(self):
+        """В режиме курсора нет COUNT(*) и нет поля count"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/venues/', {'pagination': 'cursor'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertFalse(any('COUNT(' in query['sql'].upper() for query in queries.captured_queries))
+    
+    def test_previous_cursor_returns_previous_page(self):
+        """previous_cursor возвращает предыдущую страницу"""
+        first = self.client.get('/api/venues/', {'pagination': 'cursor'})
+        self.assertIsNone(first.data['previous_cursor'])
+        
+        second = self.client.get('/api/venues/', {'cursor': first.data['next_cursor']})
+        back = self.client.get('/api/venues/', {'cursor': second.data['previous_cursor']})
+        
+        self.assertEqual(
+            [venue['id'] for venue in back.data['results']],
+            [venue['id'] for venue in first.data['results']]
+        )
+        self.assertIsNone(back.data['previous_cursor'])
+    
+    def test_invalid_cursor(self):
+        """Некорректный курсор возвращает 404"""
+        response = self.client.get('/api/venues/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_page_number_mode_is_default(self):
+        """Без параметров используется обычная пагинация с count"""
+        response = self.client.get('/api/venues/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 30)
+        self.assertEqual(len(response.data['results']), 12)
+    
+    def test_cursor_mode_for_bookings(self):
+        """Курсорный режим работает и для списка бронирований"""
+        start = timezone.now() + timedelta(days=1)
+        for i in range(15):
+            Booking.objects.create(
+                user=self.user,
+                venue=self.venues[i],
+                date_start=start,
+                date_end=start + timedelta(hours=2),
+                total_price=Decimal('2000.00')
+            )
+        self.client.force_authenticate(user=self.user)
+        
+        first = self.client.get('/api/bookings/', {'pagination': 'cursor'})
+        second = self.client.get('/api/bookings/', {'cursor': first.data['next_cursor']})
+        
+        self.assertEqual(len(first.data['results']), 12)
+        self.assertEqual(len(second.data['results']), 3)
+        self.assertIsNone(second.data['next_cursor'])
@@ -0,0 +1,130 @@
+"""
+Тесты планов запросов: основные запросы представлений используют индексы
+"""
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from datetime import timedelta
+from decimal import Decimal
+
+from venues.models import Venue
+from venues.views import VenueListView
+from bookings.models import Booking, Payment
+from bookings.views import BookingListCreateView
+from reviews.models import Review
+from reviews.views import PendingReviewsView, ReviewListView, UserReviewListView
+
+User = get_user_model()
+
+VENUES = 50
+BOOKINGS_PER_VENUE = 40
+PAGE_SIZE = 20
+
+
+class QueryPlanTestCase(TestCase):
+    """Проверка EXPLAIN для основных запросов при реалистичном объёме данных"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@test.com', password='testpass123')
+            for i in range(10)
+        ]
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@test.com', password='testpass123', role='admin'
+        )
+        cls.venues = Venue.objects.bulk_create([
+            Venue(
+                owner=cls.admin,
+                title=f'Площадка {i}',
+                description='Описание',
+                capacity=10,
+                price_per_hour=Decimal('1000.00'),
+                address='Адрес',
+                is_active=i % 10 != 0
+            )
+            for i in range(VENUES)
+        ])
+        
+        start = timezone.now() - timedelta(days=365)
+        statuses = ('pending', 'confirmed', 'cancelled')
+        cls.bookings = Booking.objects.bulk_create([
+            Booking(
+                user=cls.users[(i + j) % len(cls.users)],
+                venue=venue,
+                date_start=start + timedelta(days=j * 7, hours=i % 8),
+                date_end=start + timedelta(days=j * 7, hours=i % 8 + 2),
+                status=statuses[j % len(statuses)],
+                total_price=Decimal('2000.00')
+            )
+            for i, venue in enumerate(cls.venues)
+            for j in range(BOOKINGS_PER_VENUE)
+        ])
+        Payment.objects.bulk_create([
+            Payment(booking=booking, amount=booking.total_price, status='paid' if k % 2 else 'failed')
+            for k, booking in enumerate(cls.bookings)
+        ])
+        Review.objects.bulk_create([
+            Review(
+                user=booking.user,
+                venue=booking.venue,
+                booking=booking,
+                rating=k % 5 + 1,
+                comment='Отзыв',
+                is_approved=k % 4 != 0
+            )
+            for k, booking in enumerate(cls.bookings[::2])
+        ])
+        
+        # PostgreSQL выбирает план по статистике
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+    
+    def get_view_queryset(self, view_class, user, **params):
+        """Queryset представления с учётом фильтров и сортировки (первая страница)"""
+        request = Request(APIRequestFactory().get('/', params))
+        request.user = user
+        view = view_class(request=request, kwargs={}, format_kwarg=None)
+        return view.filter_queryset(view.get_queryset())[:PAGE_SIZE]
+    
+    def assertUsesIndex(self, queryset, *index_names):
+        plan = queryset.explain()
+        self.assertTrue(any(name in plan for name in index_names), f'Индекс {index_names} не используется:\n{plan}')
+    
+    def test_booking_availability_check(self):
+        venue = self.venues[1]
+        moment = timezone.now() - timedelta(days=100)
+        queryset = Booking.get_overlapping(venue, moment, moment + timedelta(hours=3))
+        self.assertUsesIndex(queryset, 'bookings_venue_status_start', 'bookings_no_overlap')
+    
+    def test_user_booking_list(self):
+        queryset = self.get_view_queryset(BookingListCreateView, self.users[0])
+        self.assertUsesIndex(queryset, 'bookings_user_created')
+    
+    def test_venue_reviews(self):
+        queryset = self.get_view_queryset(ReviewListView, self.users[0], venue=self.venues[1].id)
+        self.assertUsesIndex(queryset, 'reviews_venue_approved')
+    
+    def test_pending_reviews(self):
+        queryset = self.get_view_queryset(PendingReviewsView, self.admin)
+        self.assertUsesIndex(queryset, 'reviews_pending_created')
+    
+    def test_user_reviews(self):
+        queryset = self.get_view_queryset(UserReviewListView, self.users[0])
+        self.assertUsesIndex(queryset, 'reviews_user_created')
+    
+    def test_approved_reviews(self):
+        queryset = self.get_view_queryset(ReviewListView, self.users[0])
+        self.assertUsesIndex(queryset, 'reviews_approved_created')
+    
+    def test_booking_payments_by_status(self):
+        queryset = self.bookings[0].payments.filter(status='paid')
+        self.assertUsesIndex(queryset, 'payments_booking_status')
+    
+    def test_public_venue_list(self):
+        queryset = self.get_view_queryset(VenueListView, self.users[0])
+        self.assertUsesIndex(queryset, 'venues_active_created')
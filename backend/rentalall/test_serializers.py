@@ -0,0 +1,101 @@
+"""
+Тесты выборочного набора полей (?fields= и ?expand=)
+"""
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.request import Request
+from rest_framework import status
+from datetime import timedelta
+from django.utils import timezone
+from decimal import Decimal
+
+from venues.models import Venue
+from bookings.models import Booking
+from rentalall.serializers import is_field_included
+
+User = get_user_model()
+
+
+class FieldSelectionTestCase(TestCase):
+    """Тесты разбора ?fields="""
+    
+    def make_request(self, query):
+        return Request(APIRequestFactory().get('/', query))
+    
+    def test_no_fields_param_includes_everything(self):
+        self.assertTrue(is_field_included(self.make_request({}), 'venue_details.categories'))
+    
+    def test_nested_path(self):
+        request = self.make_request({'fields': 'id,venue_details.title'})
+        self.assertTrue(is_field_included(request, 'venue_details'))
+        self.assertTrue(is_field_included(request, 'venue_details.title'))
+        self.assertFalse(is_field_included(request, 'venue_details.categories'))
+        self.assertFalse(is_field_included(request, 'status'))
+    
+    def test_whole_nested_object(self):
+        request = self.make_request({'fields': 'venue_details'})
+        self.assertTrue(is_field_included(request, 'venue_details.categories'))
+
+
+@override_settings(
+    APPEND_SLASH=False,
+    SECURE_SSL_REDIRECT=False,
+    SECURE_PROXY_SSL_HEADER=None
+)
+class SparseFieldsetAPITestCase(TestCase):
+    """Тесты ?fields= и ?expand= на API бронирований"""
+    
+    def setUp(self):
+        cache.clear()  # Сбрасываем счётчики throttling от других тестов
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.venue = Venue.objects.create(
+            owner=self.user,
+            title='Площадка',
+            description='Описание',
+            capacity=10,
+            price_per_hour=Decimal('1000.00'),
+            address='Адрес',
+            is_active=True
+        )
+        date_start = timezone.now() + timedelta(days=1)
+        Booking.objects.create(
+            user=self.user,
+            venue=self.venue,
+            date_start=date_start,
+            date_end=date_start + timedelta(hours=2),
+            total_price=Decimal('2000.00')
+        )
+        self.client.force_authenticate(user=self.user)
+    
+    def test_default_payload(self):
+        """По умолчанию вложенная площадка без полного списка фото"""
+        response = self.client.get('/api/bookings/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        booking = response.data['results'][0]
+        self.assertIn('status_display', booking)
+        self.assertIn('main_thumbnail', booking['venue_details'])
+        self.assertNotIn('images', booking['venue_details'])
+    
+    def test_nested_fields(self):
+        """?fields= с путём через точку ограничивает и вложенный объект"""
+        response = self.client.get('/api/bookings/', {'fields': 'id,status,venue_details.title'})
+        
+        booking = response.data['results'][0]
+        self.assertEqual(set(booking), {'id', 'status', 'venue_details'})
+        self.assertEqual(booking['venue_details'], {'title': 'Площадка'})
+    
+    def test_nested_expand(self):
+        """?expand=venue_details.images добавляет фото во вложенную площадку"""
+        response = self.client.get('/api/bookings/', {'expand': 'venue_details.images'})
+        
+        self.assertEqual(response.data['results'][0]['venue_details']['images'], [])
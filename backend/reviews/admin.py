@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Review
+from .services import moderate_reviews
 
 
 @admin.register(Review)
@@ -27,13 +28,12 @@ class ReviewAdmin(admin.ModelAdmin):
     
     def approve_reviews(self, request, queryset):
         """Одобрить выбранные отзывы"""
-        updated = queryset.update(is_approved=True)
-        self.message_user(request, f'{updated} отзывов одобрено')
+        review_ids, _ = moderate_reviews({pk: True for pk in queryset.values_list('pk', flat=True)})
+        self.message_user(request, f'{len(review_ids)} отзывов одобрено')
     approve_reviews.short_description = 'Одобрить выбранные отзывы'
     
     def disapprove_reviews(self, request, queryset):
         """Отклонить выбранные отзывы"""
-        updated = queryset.update(is_approved=False)
-        self.message_user(request, f'{updated} отзывов отклонено')
+        review_ids, _ = moderate_reviews({pk: False for pk in queryset.values_list('pk', flat=True)})
+        self.message_user(request, f'{len(review_ids)} отзывов отклонено')
     disapprove_reviews.short_description = 'Отклонить выбранные отзывы'
-
@@ -5,4 +5,7 @@ class ReviewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reviews'
     verbose_name = 'Отзывы'
-
+    
+    def ready(self):
+        # Подключаем сигналы пересчёта рейтинга площадок
+        from . import signals  # noqa: F401
@@ -40,6 +40,30 @@ class Review(models.Model):
         verbose_name_plural = 'Отзывы'
         ordering = ['-created_at']
         # Удалили unique_together для user+venue, теперь один отзыв на бронирование
+        indexes = [
+            # Частичные индексы: условие is_approved совпадает с WHERE запросов,
+            # поэтому индекс подходит и для PostgreSQL, и для SQLite
+            # Одобренные отзывы площадки (ReviewListView ?venue=), новые сверху
+            models.Index(
+                fields=['venue', '-created_at'],
+                name='reviews_venue_approved',
+                condition=models.Q(is_approved=True)
+            ),
+            # Все одобренные отзывы (ReviewListView)
+            models.Index(
+                fields=['-created_at'],
+                name='reviews_approved_created',
+                condition=models.Q(is_approved=True)
+            ),
+            # Очередь модерации (PendingReviewsView)
+            models.Index(
+                fields=['-created_at'],
+                name='reviews_pending_created',
+                condition=models.Q(is_approved=False)
+            ),
+            # Отзывы пользователя (UserReviewListView), новые сверху
+            models.Index(fields=['user', '-created_at'], name='reviews_user_created'),
+        ]
     
     def __str__(self):
         booking_info = f" (Бронь #{self.booking.id})" if self.booking else ""
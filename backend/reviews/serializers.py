@@ -1,14 +1,17 @@
 from rest_framework import serializers
+from django.conf import settings
 from .models import Review
+from .services import MODERATION_ACTIONS
 from bookings.models import Booking
+from rentalall.serializers import SparseModelSerializer
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseModelSerializer):
     """Сериализатор для отображения отзыва"""
     user_name = serializers.CharField(source='user.full_name', read_only=True)
     user_username = serializers.CharField(source='user.username', read_only=True)
     venue_title = serializers.CharField(source='venue.title', read_only=True)
-    booking_id = serializers.IntegerField(source='booking.id', read_only=True, allow_null=True)
+    booking_id = serializers.IntegerField(read_only=True, allow_null=True)
     
     class Meta:
         model = Review
@@ -77,3 +80,34 @@ class ReviewApproveSerializer(serializers.ModelSerializer):
         model = Review
         fields = ('is_approved',)
 
+
+class ReviewModerationItemSerializer(serializers.Serializer):
+    """Решение модерации по одному отзыву"""
+    id = serializers.IntegerField(min_value=1)
+    action = serializers.ChoiceField(choices=list(MODERATION_ACTIONS))
+
+
+class ReviewModerationSerializer(serializers.Serializer):
+    """
+    Пакет решений модерации: {"reviews": [{"id": 1, "action": "approve"}, ...]}.
+    validated_data['decisions'] - {id отзыва: is_approved}.
+    """
+    reviews = ReviewModerationItemSerializer(many=True, allow_empty=False)
+    
+    def validate_reviews(self, value):
+        max_items = getattr(settings, 'REVIEW_MODERATION_MAX_ITEMS', 100)
+        if len(value) > max_items:
+            raise serializers.ValidationError(f'Не больше {max_items} отзывов за один запрос')
+        
+        decisions = {}
+        for item in value:
+            is_approved = MODERATION_ACTIONS[item['action']]
+            if decisions.setdefault(item['id'], is_approved) != is_approved:
+                raise serializers.ValidationError(f'Для отзыва {item["id"]} указаны разные действия')
+        return value
+    
+    def validate(self, attrs):
+        attrs['decisions'] = {
+            item['id']: MODERATION_ACTIONS[item['action']] for item in attrs['reviews']
+        }
+        return attrs
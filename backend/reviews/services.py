@@ -0,0 +1,60 @@
+"""
+Загрузка отзывов для API и пакетная модерация
+"""
+from django.db import models, transaction
+from venues.cache_utils import invalidate_venue_rating_caches
+from venues.models import Venue
+from .models import Review
+
+# Действия модерации и соответствующее значение is_approved
+MODERATION_ACTIONS = {
+    'approve': True,
+    'disapprove': False,
+}
+
+# Поля, которые читает ReviewSerializer: отзыв целиком, у пользователя и площадки - только подписи
+REVIEW_LIST_FIELDS = (
+    'user', 'venue', 'booking', 'rating', 'comment', 'created_at', 'is_approved',
+    'user__full_name', 'user__username', 'venue__title',
+)
+
+
+def select_review_related(queryset=None):
+    """
+    Отзывы для ReviewSerializer одним запросом: пользователь и площадка - JOIN
+    с проекцией .only() на нужные столбцы, бронь - по booking_id без JOIN.
+    """
+    if queryset is None:
+        queryset = Review.objects.all()
+    return queryset.select_related('user', 'venue').only(*REVIEW_LIST_FIELDS)
+
+
+def moderate_reviews(decisions):
+    """
+    Применить решения модерации {id отзыва: is_approved} одним UPDATE ... WHERE id IN.
+    queryset.update() не вызывает сигналы, поэтому агрегаты рейтинга затронутых площадок
+    пересчитываются одним сгруппированным запросом (Venue.recalculate_ratings),
+    а их кэш рейтинга сбрасывается одним delete_many.
+    Возвращает (ID обработанных отзывов, ID площадок); несуществующие ID пропускаются.
+    """
+    if not decisions:
+        return [], []
+    
+    approved = [pk for pk, is_approved in decisions.items() if is_approved]
+    with transaction.atomic():
+        rows = list(
+            Review.objects.select_for_update().filter(pk__in=decisions).values_list('pk', 'venue_id')
+        )
+        review_ids = [pk for pk, _ in rows]
+        Review.objects.filter(pk__in=review_ids).update(
+            is_approved=models.Case(
+                models.When(pk__in=approved, then=models.Value(True)),
+                default=models.Value(False),
+                output_field=models.BooleanField()
+            )
+        )
+        venue_ids = sorted({venue_id for _, venue_id in rows})
+        Venue.recalculate_ratings(venue_ids)
+    
+    invalidate_venue_rating_caches(venue_ids)
+    return review_ids, venue_ids
@@ -0,0 +1,51 @@
+"""
+Сигналы для поддержки денормализованных агрегатов рейтинга площадок
+"""
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from venues.models import Venue
+from .models import Review
+
+
+def get_rating_contribution(is_approved, rating):
+    """Вклад отзыва в агрегаты площадки: (сумма оценок, количество)"""
+    if is_approved:
+        return rating, 1
+    return 0, 0
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating_state(sender, instance, **kwargs):
+    """Запоминаем состояние отзыва в БД до сохранения"""
+    instance._previous_rating_state = None
+    if instance.pk is not None and not instance._state.adding:
+        instance._previous_rating_state = Review.objects.filter(pk=instance.pk).values_list(
+            'venue_id', 'is_approved', 'rating'
+        ).first()
+
+
+@receiver(post_save, sender=Review)
+def update_venue_rating_on_save(sender, instance, created, **kwargs):
+    """Применяем разницу вкладов старого и нового состояния отзыва"""
+    new_sum, new_count = get_rating_contribution(instance.is_approved, instance.rating)
+    previous = getattr(instance, '_previous_rating_state', None)
+    
+    if created or previous is None:
+        Venue.apply_rating_delta(instance.venue_id, new_sum, new_count)
+        return
+    
+    old_venue_id, old_is_approved, old_rating = previous
+    old_sum, old_count = get_rating_contribution(old_is_approved, old_rating)
+    
+    if old_venue_id == instance.venue_id:
+        Venue.apply_rating_delta(instance.venue_id, new_sum - old_sum, new_count - old_count)
+    else:
+        Venue.apply_rating_delta(old_venue_id, -old_sum, -old_count)
+        Venue.apply_rating_delta(instance.venue_id, new_sum, new_count)
+
+
+@receiver(post_delete, sender=Review)
+def update_venue_rating_on_delete(sender, instance, **kwargs):
+    """Убираем вклад удалённого отзыва (в том числе при каскадном удалении)"""
+    old_sum, old_count = get_rating_contribution(instance.is_approved, instance.rating)
+    Venue.apply_rating_delta(instance.venue_id, -old_sum, -old_count)
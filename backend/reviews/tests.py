@@ -0,0 +1,263 @@
+from django.test import RequestFactory, TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.contrib.admin.sites import AdminSite
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+from bookings.models import Booking
+from venues.cache_utils import get_cache_key
+from venues.models import Venue
+from .admin import ReviewAdmin
+from .models import Review
+
+User = get_user_model()
+
+
+@override_settings(APPEND_SLASH=False, SECURE_SSL_REDIRECT=False, SECURE_PROXY_SSL_HEADER=None)
+class ReviewListQueryTestCase(TestCase):
+    """Списки отзывов загружаются одним запросом на страницу (нет N+1)"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        self.user = User.objects.create_user(
+            username='reviewer',
+            email='reviewer@test.com',
+            password='testpass123',
+            full_name='Иван Петров'
+        )
+        self.admin = User.objects.create_user(
+            username='moderator',
+            email='moderator@test.com',
+            password='testpass123',
+            role='admin'
+        )
+        self.venue = Venue.objects.create(
+            owner=self.admin,
+            title='Лофт на Пятницкой',
+            description='Описание',
+            capacity=50,
+            price_per_hour=Decimal('1000.00'),
+            address='ул. Пятницкая, д. 1',
+            is_active=True
+        )
+        self.count = 0
+    
+    def add_reviews(self, count, is_approved):
+        """Отзывы на завершённые брони разных пользователей"""
+        start = timezone.now() - timedelta(days=30)
+        for _ in range(count):
+            self.count += 1
+            author = User.objects.create_user(
+                username=f'author{self.count}',
+                email=f'author{self.count}@test.com',
+                password='testpass123',
+                full_name=f'Автор {self.count}'
+            ) if self.count % 2 else self.user
+            booking = Booking.objects.create(
+                user=author, venue=self.venue,
+                date_start=start + timedelta(days=self.count), date_end=start + timedelta(days=self.count, hours=2),
+                status='confirmed', total_price=Decimal('2000.00')
+            )
+            Review.objects.create(
+                user=author, venue=self.venue, booking=booking, rating=5, comment='Отлично', is_approved=is_approved
+            )
+    
+    def assert_constant_queries(self, url, is_approved, expected_results, params=None):
+        """COUNT и страница отзывов при 2 и 10 отзывах"""
+        self.add_reviews(2, is_approved)
+        with self.assertNumQueries(2):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), expected_results[0])
+        
+        self.add_reviews(8, is_approved)
+        with self.assertNumQueries(2):
+            response = self.client.get(url, params)
+        self.assertEqual(len(response.data['results']), expected_results[1])
+        return response.data['results']
+    
+    def test_review_list(self):
+        results = self.assert_constant_queries('/api/reviews/', True, (2, 10), {'venue': self.venue.id})
+        
+        review = Review.objects.get(pk=results[0]['id'])
+        self.assertEqual(results[0]['user_name'], review.user.full_name)
+        self.assertEqual(results[0]['user_username'], review.user.username)
+        self.assertEqual(results[0]['venue_title'], 'Лофт на Пятницкой')
+        self.assertEqual(results[0]['booking_id'], review.booking_id)
+    
+    def test_user_review_list(self):
+        self.client.force_authenticate(user=self.user)
+        
+        results = self.assert_constant_queries('/api/reviews/my/', False, (1, 5))
+        
+        self.assertTrue(all(item['user'] == self.user.id for item in results))
+        self.assertEqual(results[0]['user_name'], 'Иван Петров')
+    
+    def test_pending_reviews(self):
+        self.client.force_authenticate(user=self.admin)
+        
+        results = self.assert_constant_queries('/api/reviews/pending/', False, (2, 10))
+        
+        self.assertFalse(any(item['is_approved'] for item in results))
+        created = [item['created_at'] for item in results]
+        self.assertEqual(created, sorted(created, reverse=True))
+    
+    def test_only_projection(self):
+        """Из связанных таблиц читаются только подписи, бронь не присоединяется"""
+        self.add_reviews(1, True)
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/reviews/')
+        
+        sql = queries.captured_queries[-1]['sql']
+        self.assertIn('"users_user"."full_name"', sql)
+        self.assertNotIn('"users_user"."password"', sql)
+        self.assertNotIn('"venues"."description"', sql)
+        self.assertNotIn('"bookings"', sql)
+
+
+@override_settings(APPEND_SLASH=False, SECURE_SSL_REDIRECT=False, SECURE_PROXY_SSL_HEADER=None)
+class ReviewModerationTestCase(TestCase):
+    """Пакетная модерация отзывов /api/reviews/moderate/"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        self.user = User.objects.create_user(username='author', email='author@test.com', password='testpass123')
+        self.admin = User.objects.create_user(
+            username='moderator', email='moderator@test.com', password='testpass123', role='admin', is_staff=True
+        )
+        self.client.force_authenticate(user=self.admin)
+        self.venues = [
+            Venue.objects.create(
+                owner=self.admin,
+                title=f'Площадка {i}',
+                description='Описание',
+                capacity=50,
+                price_per_hour=Decimal('1000.00'),
+                address='ул. Тестовая, д. 1',
+                is_active=True
+            )
+            for i in range(2)
+        ]
+        self.count = 0
+    
+    def add_review(self, venue, rating, is_approved=False):
+        self.count += 1
+        start = timezone.now() - timedelta(days=self.count)
+        booking = Booking.objects.create(
+            user=self.user, venue=venue, date_start=start, date_end=start + timedelta(hours=2),
+            status='confirmed', total_price=Decimal('2000.00')
+        )
+        return Review.objects.create(
+            user=self.user, venue=venue, booking=booking, rating=rating, comment='Отзыв', is_approved=is_approved
+        )
+    
+    def moderate(self, items):
+        return self.client.post('/api/reviews/moderate/', {
+            'reviews': [{'id': pk, 'action': action} for pk, action in items]
+        })
+    
+    def test_mixed_batch(self):
+        """Одобрение и отклонение в одном запросе, агрегаты площадок пересчитаны"""
+        first = self.add_review(self.venues[0], 5)
+        second = self.add_review(self.venues[0], 3)
+        approved = self.add_review(self.venues[1], 4, is_approved=True)
+        
+        response = self.moderate([
+            (first.id, 'approve'), (second.id, 'approve'), (approved.id, 'disapprove'), (999999, 'approve')
+        ])
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(response.data['approved']), sorted([first.id, second.id]))
+        self.assertEqual(response.data['disapproved'], [approved.id])
+        self.assertEqual(response.data['not_found'], [999999])
+        self.assertEqual(
+            dict(Review.objects.values_list('id', 'is_approved')),
+            {first.id: True, second.id: True, approved.id: False}
+        )
+        for venue in self.venues:
+            venue.refresh_from_db()
+        self.assertEqual((self.venues[0].rating_count, self.venues[0].average_rating), (2, Decimal('4.00')))
+        self.assertEqual((self.venues[1].rating_count, self.venues[1].average_rating), (0, Decimal('0.00')))
+    
+    def test_rating_cache_invalidated_once(self):
+        """Кэш рейтинга всех затронутых площадок сбрасывается одним delete_many"""
+        reviews = [self.add_review(venue, 5) for venue in self.venues for _ in range(2)]
+        keys = [get_cache_key(venue.id, 'rating_data') for venue in self.venues]
+        cache.set_many({key: {'average_rating': 0, 'reviews_count': 0} for key in keys})
+        
+        with patch.object(cache, 'delete_many', wraps=cache.delete_many) as delete_many:
+            response = self.moderate([(review.id, 'approve') for review in reviews])
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        delete_many.assert_called_once()
+        self.assertEqual(sorted(delete_many.call_args.args[0]), sorted(keys))
+        self.assertEqual(cache.get_many(keys), {})
+    
+    def test_query_count_does_not_grow(self):
+        """Число запросов не зависит от количества отзывов в пакете"""
+        small = [self.add_review(venue, 5) for venue in self.venues]
+        large = [self.add_review(self.venues[k % 2], 4) for k in range(10)]
+        
+        with CaptureQueriesContext(connection) as small_queries:
+            self.moderate([(review.id, 'approve') for review in small])
+        with CaptureQueriesContext(connection) as large_queries:
+            self.moderate([(review.id, 'approve' if k % 2 else 'disapprove') for k, review in enumerate(large)])
+        
+        self.assertEqual(len(large_queries.captured_queries), len(small_queries.captured_queries))
+        updates = [query for query in large_queries.captured_queries if query['sql'].startswith('UPDATE "reviews"')]
+        self.assertEqual(len(updates), 1)
+    
+    def test_validation(self):
+        review = self.add_review(self.venues[0], 5)
+        
+        response = self.moderate([(review.id, 'approve'), (review.id, 'disapprove')])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.moderate([(review.id, 'delete')])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.moderate([])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        with self.settings(REVIEW_MODERATION_MAX_ITEMS=1):
+            response = self.moderate([(review.id, 'approve'), (review.id + 1, 'approve')])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        self.assertFalse(Review.objects.get(pk=review.id).is_approved)
+    
+    def test_admin_only(self):
+        review = self.add_review(self.venues[0], 5)
+        self.client.force_authenticate(user=self.user)
+        
+        response = self.moderate([(review.id, 'approve')])
+        
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Review.objects.get(pk=review.id).is_approved)
+    
+    def test_admin_action_invalidates_rating_cache(self):
+        """Действие админки идёт через moderate_reviews и сбрасывает кэш рейтинга"""
+        review = self.add_review(self.venues[0], 5)
+        key = get_cache_key(self.venues[0].id, 'rating_data')
+        cache.set(key, {'average_rating': 0, 'reviews_count': 0})
+        model_admin = ReviewAdmin(Review, AdminSite())
+        request = RequestFactory().post('/admin/reviews/review/')
+        
+        with patch.object(model_admin, 'message_user') as message_user:
+            model_admin.approve_reviews(request, Review.objects.filter(pk=review.pk))
+        
+        message_user.assert_called_once_with(request, '1 отзывов одобрено')
+        self.assertTrue(Review.objects.get(pk=review.pk).is_approved)
+        self.assertIsNone(cache.get(key))
+        self.venues[0].refresh_from_db()
+        self.assertEqual(self.venues[0].rating_count, 1)
@@ -6,6 +6,7 @@ from .views import (
     ReviewDetailView,
     ReviewApproveView,
     ReviewDisapproveView,
+    ReviewModerateView,
     PendingReviewsView
 )
 
@@ -18,6 +19,7 @@ urlpatterns = [
     
     # Модерация (только для администраторов)
     path('pending/', PendingReviewsView.as_view(), name='pending_reviews'),
+    path('moderate/', ReviewModerateView.as_view(), name='review_moderate'),
     path('<int:pk>/approve/', ReviewApproveView.as_view(), name='review_approve'),
     path('<int:pk>/disapprove/', ReviewDisapproveView.as_view(), name='review_disapprove'),
 ]
@@ -5,11 +5,13 @@ from django.shortcuts import get_object_or_404
 import logging
 from rentalall.throttling import ReviewRateThrottle
 from .models import Review
+from .services import moderate_reviews, select_review_related
 from .serializers import (
     ReviewSerializer,
     ReviewCreateSerializer,
     ReviewUpdateSerializer,
-    ReviewApproveSerializer
+    ReviewApproveSerializer,
+    ReviewModerationSerializer
 )
 from venues.cache_utils import invalidate_venue_rating_cache
 
@@ -31,7 +33,7 @@ class ReviewListView(generics.ListAPIView):
     
     def get_queryset(self):
         """Фильтрация отзывов"""
-        queryset = Review.objects.filter(is_approved=True)
+        queryset = select_review_related(Review.objects.filter(is_approved=True))
         
         # Фильтр по площадке
         venue_id = self.request.query_params.get('venue', None)
@@ -52,7 +54,7 @@ class UserReviewListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Review.objects.filter(user=self.request.user)
+        return select_review_related(Review.objects.filter(user=self.request.user))
 
 
 class ReviewCreateView(generics.CreateAPIView):
@@ -85,7 +87,7 @@ class ReviewCreateView(generics.CreateAPIView):
 
 class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Детальная информация об отзыве"""
-    queryset = Review.objects.all()
+    queryset = Review.objects.select_related('user', 'venue')
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrAdmin]
     
     def get_serializer_class(self):
@@ -180,6 +182,44 @@ class ReviewDisapproveView(APIView):
         )
 
 
+class ReviewModerateView(APIView):
+    """
+    Пакетная модерация отзывов (только для администраторов):
+    {"reviews": [{"id": 1, "action": "approve"}, {"id": 2, "action": "disapprove"}]}.
+    Все решения применяются одним UPDATE, рейтинги площадок пересчитываются одним запросом.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        if not request.user.is_admin():
+            logger.warning(f"Review moderate unauthorized: User={request.user.email}")
+            return Response(
+                {'error': 'Только администратор может модерировать отзывы'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = ReviewModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        decisions = serializer.validated_data['decisions']
+        
+        review_ids, venue_ids = moderate_reviews(decisions)
+        processed = set(review_ids)
+        approved = [pk for pk in review_ids if decisions[pk]]
+        disapproved = [pk for pk in review_ids if not decisions[pk]]
+        not_found = [pk for pk in decisions if pk not in processed]
+        
+        logger.info(
+            f"Reviews moderated: Admin={request.user.email}, Approved={approved}, "
+            f"Disapproved={disapproved}, Not found={not_found}, Venues={venue_ids}"
+        )
+        
+        return Response({
+            'approved': approved,
+            'disapproved': disapproved,
+            'not_found': not_found,
+        }, status=status.HTTP_200_OK)
+
+
 class PendingReviewsView(generics.ListAPIView):
     """Список отзывов на модерации (только для администраторов)"""
     serializer_class = ReviewSerializer
@@ -188,5 +228,6 @@ class PendingReviewsView(generics.ListAPIView):
     def get_queryset(self):
         if not self.request.user.is_admin():
             return Review.objects.none()
-        return Review.objects.filter(is_approved=False)
+        # Порядок -created_at совпадает с частичным индексом reviews_pending_created
+        return select_review_related(Review.objects.filter(is_approved=False))
 
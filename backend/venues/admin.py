@@ -27,10 +27,10 @@ class VenueCategoryInline(admin.TabularInline):
 @admin.register(Venue)
 class VenueAdmin(admin.ModelAdmin):
     """Административная панель для площадок"""
-    list_display = ('id', 'title', 'capacity', 'price_per_hour', 'address', 'is_active', 'created_at')
+    list_display = ('id', 'title', 'capacity', 'price_per_hour', 'address', 'average_rating', 'is_active', 'created_at')
     list_filter = ('is_active', 'created_at', 'categories')
     search_fields = ('title', 'address', 'description')
-    readonly_fields = ('created_at',)
+    readonly_fields = ('created_at', 'rating_sum', 'rating_count', 'average_rating', 'main_image_path')
     ordering = ('-created_at',)
     inlines = [VenueImageInline, VenueCategoryInline]
     
@@ -41,8 +41,11 @@ class VenueAdmin(admin.ModelAdmin):
         ('Местоположение', {
             'fields': ('address', 'latitude', 'longitude')
         }),
+        ('Рейтинг', {
+            'fields': ('average_rating', 'rating_count', 'rating_sum')
+        }),
         ('Системная информация', {
-            'fields': ('created_at',)
+            'fields': ('created_at', 'main_image_path')
         }),
     )
 
@@ -5,4 +5,7 @@ class VenuesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'venues'
     verbose_name = 'Площадки'
-
+    
+    def ready(self):
+        # Подключаем сигналы инвалидации кэша ответов
+        from . import signals  # noqa: F401
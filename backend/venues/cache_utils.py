@@ -1,67 +1,374 @@
 """
-Утилиты для работы с кэшированием рейтингов площадок
+Утилиты для работы с кэшированием площадок: рейтинги и ответы API каталога
 """
 from django.core.cache import cache
 from django.conf import settings
-from django.db.models import Avg, Count, Q
+from rest_framework.response import Response
+from collections import Counter
+import hashlib
+import json
 import logging
+import math
+import random
+import time
 
 logger = logging.getLogger('venues')
 
+# Поколения (generation counters). Номер поколения входит в ключ кэша,
+# поэтому увеличение счётчика делает старые записи недостижимыми за O(1) -
+# они удаляются по TTL, без cache.clear() и без перебора ключей.
+CATALOG_GENERATION = 'catalog'        # Списки площадок
+CATEGORIES_GENERATION = 'categories'  # Категории (входят и в списки, и в детальные страницы)
+BOOKINGS_GENERATION = 'bookings'      # Бронирования (списки с фильтром по свободному времени)
+
+# Пространства имён кэша площадок
+RATINGS_NAMESPACE = 'ratings'      # Рейтинги площадок
+RESPONSES_NAMESPACE = 'responses'  # Ответы API каталога
+SLOTS_NAMESPACE = 'slots'          # Занятость площадок
+VENUE_CACHE_NAMESPACES = (RATINGS_NAMESPACE, RESPONSES_NAMESPACE, SLOTS_NAMESPACE)
+
+# Защита кэша рейтингов от stampede
+RATING_LOCK_TIMEOUT = 10           # Время жизни блокировки пересчёта (сек)
+RATING_LOCK_WAIT = 0.5             # Сколько ждать результата другого процесса (сек)
+RATING_LOCK_POLL_INTERVAL = 0.05
+RATING_STALE_TTL = 60 * 60         # Сколько хранить устаревшее значение после истечения TTL
+RATING_EARLY_EXPIRY_BETA = 1.0     # >1 - обновлять раньше, <1 - позже
+
+rating_cache_stats = Counter()
+
+
+def get_venue_generation_name(venue_id):
+    """Поколение ответов детальной страницы площадки"""
+    return f'venue:{venue_id}'
+
+
+def get_generation_key(name):
+    return f'generation:{name}'
+
+
+def get_initial_generation():
+    # Начальное значение от времени: если счётчик вытеснен из кэша,
+    # новое значение не совпадёт с уже использованными
+    return int(time.time() * 1000)
+
+
+def get_generations(names):
+    """Текущие номера поколений (одним запросом к кэшу)"""
+    keys = [get_generation_key(name) for name in names]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, get_initial_generation(), None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def bump_generation(name):
+    """Увеличить поколение - все ответы с ним перестают использоваться"""
+    key = get_generation_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, get_initial_generation(), None)
+
+
+def get_namespace_generation_name(namespace):
+    return f'namespace:{namespace}'
+
+
+def get_namespace_version(namespace):
+    """Текущая версия пространства имён"""
+    return get_generations([get_namespace_generation_name(namespace)])[0]
+
+
+def make_namespaced_key(namespace, key, version=None):
+    """Ключ с версией пространства имён: ratings:v42:venue:1:rating_data"""
+    if version is None:
+        version = get_namespace_version(namespace)
+    return f'{namespace}:v{version}:{key}'
+
+
+def invalidate_namespace(namespace):
+    """Инвалидирует всё пространство имён за O(1)"""
+    bump_generation(get_namespace_generation_name(namespace))
+    logger.info(f'Invalidated cache namespace: {namespace}')
+
+
+def invalidate_venue_response_cache(venue_ids=()):
+    """Инвалидирует кэш ответов для списков и детальных страниц площадок"""
+    bump_generation(CATALOG_GENERATION)
+    for venue_id in venue_ids:
+        bump_generation(get_venue_generation_name(venue_id))
+    logger.debug(f'Invalidated response cache for venues: {list(venue_ids)}')
+
+
+def invalidate_category_response_cache():
+    """Инвалидирует кэш ответов, содержащих категории"""
+    bump_generation(CATEGORIES_GENERATION)
+
 
 def get_cache_key(venue_id, metric='rating'):
-    """Генерирует ключ кэша для площадки"""
-    return f'venue:{venue_id}:{metric}'
+    """Генерирует ключ кэша для площадки (в пространстве имён рейтингов)"""
+    return make_namespaced_key(RATINGS_NAMESPACE, f'venue:{venue_id}:{metric}')
+
+
+def get_rating_cache_stats():
+    """Счётчики кэша рейтингов текущего процесса: hit, miss, stale, early_refresh, lock_wait"""
+    return dict(rating_cache_stats)
+
+
+def reset_rating_cache_stats():
+    rating_cache_stats.clear()
+
+
+def get_empty_rating():
+    return {'average_rating': 0.0, 'reviews_count': 0}
+
+
+def to_rating_data(average_rating, rating_count):
+    return {
+        'average_rating': float(average_rating) if rating_count else 0.0,
+        'reviews_count': rating_count
+    }
+
+
+def calculate_venue_rating(venue_id):
+    """Рейтинг площадки из БД (None, если площадки нет)"""
+    from venues.models import Venue
+    
+    # Агрегаты хранятся денормализованно в Venue - достаточно чтения по PK
+    venue = Venue.objects.filter(id=venue_id).values('average_rating', 'rating_count').first()
+    if venue is None:
+        return None
+    return to_rating_data(venue['average_rating'], venue['rating_count'])
+
+
+def make_rating_envelope(rating_data, ttl, delta):
+    """Запасная копия рейтинга для stale-while-revalidate"""
+    return {'value': rating_data, 'expires_at': time.time() + ttl, 'delta': delta}
+
+
+def should_refresh_early(envelope):
+    """
+    Вероятностное раннее обновление (XFetch): чем ближе истечение и чем дольше
+    пересчёт, тем выше шанс, что запрос обновит значение заранее.
+    """
+    gap = -envelope['delta'] * RATING_EARLY_EXPIRY_BETA * math.log(1.0 - random.random())
+    return time.time() + gap >= envelope['expires_at']
+
+
+def refresh_venue_rating(venue_id, cache_key, stale_key):
+    """Пересчитать рейтинг и записать свежее значение и запасную копию"""
+    started = time.monotonic()
+    rating_data = calculate_venue_rating(venue_id)
+    if rating_data is None:
+        return None
+    
+    ttl = settings.CACHE_TTL.get('venue_rating', 3600)
+    envelope = make_rating_envelope(rating_data, ttl, time.monotonic() - started)
+    cache.set(cache_key, rating_data, ttl)
+    cache.set(stale_key, envelope, ttl + RATING_STALE_TTL)
+    logger.info(f'Cached rating for venue_id={venue_id}: {rating_data}')
+    return rating_data
 
 
 def get_venue_rating_from_cache(venue_id):
     """
     Получает рейтинг и количество отзывов из кэша.
     Если не найдено - вычисляет и кэширует.
+    
+    Защита от stampede: пересчёт выполняет только держатель короткой блокировки,
+    остальные получают устаревшее значение (stale-while-revalidate) или ждут.
+    Незадолго до истечения значение обновляется заранее с вероятностью,
+    растущей по мере приближения TTL.
     """
     cache_key = get_cache_key(venue_id, 'rating_data')
-    cached_data = cache.get(cache_key)
+    stale_key = f'{cache_key}:stale'
+    lock_key = f'{cache_key}:lock'
     
-    if cached_data is not None:
-        logger.debug(f'Cache HIT: venue_id={venue_id}')
-        return cached_data
-    
-    # Если кэш пустой - вычисляем
-    logger.debug(f'Cache MISS: venue_id={venue_id}, calculating...')
-    from venues.models import Venue
+    cached = cache.get_many([cache_key, stale_key])
+    cached_data = cached.get(cache_key)
+    envelope = cached.get(stale_key)
     
     try:
-        venue = Venue.objects.filter(id=venue_id).annotate(
-            average_rating=Avg('reviews__rating', filter=Q(reviews__is_approved=True)),
-            reviews_count=Count('reviews', filter=Q(reviews__is_approved=True))
-        ).first()
-        
-        if venue:
-            rating_data = {
-                'average_rating': float(venue.average_rating) if venue.average_rating else 0.0,
-                'reviews_count': venue.reviews_count
-            }
+        if cached_data is not None:
+            refresh = (
+                envelope is not None
+                and should_refresh_early(envelope)
+                and cache.add(lock_key, 1, RATING_LOCK_TIMEOUT)
+            )
+            if not refresh:
+                rating_cache_stats['hit'] += 1
+                logger.debug(f'Cache HIT: venue_id={venue_id}')
+                return cached_data
             
-            # Кэшируем на 1 час
-            ttl = settings.CACHE_TTL.get('venue_rating', 3600)
-            cache.set(cache_key, rating_data, ttl)
-            logger.info(f'Cached rating for venue_id={venue_id}: {rating_data}')
+            rating_cache_stats['early_refresh'] += 1
+            logger.debug(f'Cache early refresh: venue_id={venue_id}')
+            try:
+                return refresh_venue_rating(venue_id, cache_key, stale_key) or cached_data
+            finally:
+                cache.delete(lock_key)
+        
+        if cache.add(lock_key, 1, RATING_LOCK_TIMEOUT):
+            rating_cache_stats['miss'] += 1
+            logger.debug(f'Cache MISS: venue_id={venue_id}, calculating...')
+            try:
+                rating_data = refresh_venue_rating(venue_id, cache_key, stale_key)
+            finally:
+                cache.delete(lock_key)
+            if rating_data is not None:
+                return rating_data
+        elif envelope is not None:
+            # Пересчёт уже идёт в другом процессе - отдаём устаревшее значение
+            rating_cache_stats['stale'] += 1
+            logger.debug(f'Cache STALE: venue_id={venue_id}')
+            return envelope['value']
+        else:
+            # Устаревшего значения нет - ждём результат держателя блокировки
+            rating_cache_stats['lock_wait'] += 1
+            deadline = time.monotonic() + RATING_LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(RATING_LOCK_POLL_INTERVAL)
+                cached_data = cache.get(cache_key)
+                if cached_data is not None:
+                    return cached_data
             
-            return rating_data
+            rating_data = calculate_venue_rating(venue_id)
+            if rating_data is not None:
+                return rating_data
     except Exception as e:
         logger.error(f'Error calculating rating for venue_id={venue_id}: {e}')
     
-    return {'average_rating': 0.0, 'reviews_count': 0}
+    return get_empty_rating()
+
+
+def get_venue_ratings_bulk(venue_ids):
+    """
+    Рейтинги нескольких площадок: {venue_id: rating_data}.
+    Один get_many к кэшу, все промахи - одним запросом к БД и одним set_many.
+    Несуществующие площадки получают пустой рейтинг (и не кэшируются).
+    """
+    from venues.models import Venue
+    
+    venue_ids = list(dict.fromkeys(venue_ids))
+    if not venue_ids:
+        return {}
+    
+    version = get_namespace_version(RATINGS_NAMESPACE)
+    keys = {
+        venue_id: make_namespaced_key(RATINGS_NAMESPACE, f'venue:{venue_id}:rating_data', version)
+        for venue_id in venue_ids
+    }
+    cached = cache.get_many(keys.values())
+    ratings = {venue_id: cached[key] for venue_id, key in keys.items() if key in cached}
+    rating_cache_stats['hit'] += len(ratings)
+    
+    missing = [venue_id for venue_id in venue_ids if venue_id not in ratings]
+    if missing:
+        rating_cache_stats['miss'] += len(missing)
+        started = time.monotonic()
+        # Агрегаты денормализованы в Venue, поэтому GROUP BY по отзывам не нужен
+        rows = Venue.objects.filter(id__in=missing).values_list('id', 'average_rating', 'rating_count')
+        computed = {venue_id: to_rating_data(average, count) for venue_id, average, count in rows}
+        delta = time.monotonic() - started
+        
+        if computed:
+            ttl = settings.CACHE_TTL.get('venue_rating', 3600)
+            cache.set_many({keys[venue_id]: data for venue_id, data in computed.items()}, ttl)
+            cache.set_many({
+                f'{keys[venue_id]}:stale': make_rating_envelope(data, ttl, delta)
+                for venue_id, data in computed.items()
+            }, ttl + RATING_STALE_TTL)
+        ratings.update(computed)
+    
+    return {venue_id: ratings.get(venue_id, get_empty_rating()) for venue_id in venue_ids}
 
 
 def invalidate_venue_rating_cache(venue_id):
-    """Инвалидирует кэш рейтинга для площадки"""
+    """
+    Инвалидирует кэш рейтинга для площадки.
+    Запасная копия сохраняется: пока один процесс пересчитывает рейтинг, остальные получают её.
+    """
     cache_key = get_cache_key(venue_id, 'rating_data')
     cache.delete(cache_key)
     logger.info(f'Invalidated cache for venue_id={venue_id}')
 
 
-def invalidate_all_venue_caches():
-    """Инвалидирует весь кэш (для критических обновлений)"""
-    cache.clear()
-    logger.warning('Cleared all cache')
+def invalidate_venue_rating_caches(venue_ids):
+    """Инвалидирует кэш рейтинга нескольких площадок одним delete_many"""
+    venue_ids = list(venue_ids)
+    if not venue_ids:
+        return
+    version = get_namespace_version(RATINGS_NAMESPACE)
+    cache.delete_many([
+        make_namespaced_key(RATINGS_NAMESPACE, f'venue:{venue_id}:rating_data', version)
+        for venue_id in venue_ids
+    ])
+    logger.info(f'Invalidated cache for venue_ids={venue_ids}')
+
+
+def invalidate_all_venue_caches(namespaces=VENUE_CACHE_NAMESPACES):
+    """
+    Инвалидирует кэш площадок (для критических обновлений).
+    Увеличивает версии пространств имён вместо cache.clear(), поэтому
+    счётчики throttling и прочие ключи в Redis не затрагиваются.
+    """
+    for namespace in namespaces:
+        invalidate_namespace(namespace)
+    logger.warning(f'Invalidated venue cache namespaces: {", ".join(namespaces)}')
+
+
+def get_response_cache_key(request, scope, generations):
+    """
+    Ключ кэша ответа: область, роль, поколения и хэш пути и нормализованных параметров.
+    Хост и схема входят в хэш, так как ответы содержат абсолютные URL.
+    """
+    user = request.user
+    role = 'admin' if user.is_authenticated and user.is_admin() else 'public'
+    params = sorted((key, values) for key, values in request.query_params.lists())
+    raw = json.dumps([request.scheme, request.get_host(), request.path, params], ensure_ascii=False)
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    version = '.'.join(str(generation) for generation in generations)
+    return f'{RESPONSES_NAMESPACE}:{scope}:{role}:{version}:{digest}'
+
+
+class ResponseCacheMixin:
+    """
+    Кэширование GET-ответов list/retrieve с инвалидацией по поколениям.
+    Подкласс задаёт response_cache_scope, response_cache_ttl (ключ CACHE_TTL)
+    и при необходимости get_response_cache_generations().
+    """
+    response_cache_scope = None
+    response_cache_ttl = None
+    
+    def get_response_cache_generations(self):
+        """По умолчанию - поколение каталога: оно увеличивается при любом изменении площадок"""
+        return [CATALOG_GENERATION]
+    
+    def get_response_cache_ttl(self):
+        return settings.CACHE_TTL.get(self.response_cache_ttl, 60 * 5)
+    
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        # Версия пространства имён ответов читается тем же запросом, что и поколения
+        generations = get_generations(
+            [get_namespace_generation_name(RESPONSES_NAMESPACE)] + self.get_response_cache_generations()
+        )
+        cache_key = get_response_cache_key(request, self.response_cache_scope, generations)
+        
+        data = cache.get(cache_key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(cache_key, response.data, self.get_response_cache_ttl())
+        response['X-Cache'] = 'MISS'
+        return response
+    
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
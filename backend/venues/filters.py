@@ -1,5 +1,11 @@
 import django_filters
+from django import forms
+from django.db.models import Exists, Min, OuterRef
+from django.utils import timezone
+from rest_framework.filters import BaseFilterBackend
+from bookings.models import ACTIVE_BOOKING_STATUSES, Booking, occupies_venue_q
 from .models import Venue
+from .search import search_venues
 
 
 class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
@@ -7,6 +13,51 @@ class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
     pass
 
 
+class VenueFilterForm(forms.Form):
+    """Форма фильтров площадок с проверкой окна свободного времени"""
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        available_from = cleaned_data.get('available_from')
+        available_to = cleaned_data.get('available_to')
+        
+        if bool(available_from) != bool(available_to):
+            raise forms.ValidationError('Параметры available_from и available_to задаются вместе')
+        if available_from and available_to <= available_from:
+            raise forms.ValidationError('available_to должно быть позже available_from')
+        return cleaned_data
+
+
+def exclude_busy_venues(queryset, date_start, date_end):
+    """
+    Оставить площадки, свободные в период [date_start, date_end).
+    Один анти-join NOT EXISTS по индексу bookings_venue_status_start
+    вместо проверки доступности каждой площадки отдельно.
+    """
+    conflicts = Booking.objects.filter(
+        occupies_venue_q(),
+        venue_id=OuterRef('pk'),
+        status__in=ACTIVE_BOOKING_STATUSES,
+        date_start__lt=date_end,
+        date_end__gt=date_start
+    )
+    return queryset.filter(~Exists(conflicts))
+
+
+def get_next_hold_expiry(date_start, date_end, now=None):
+    """
+    Ближайшее истечение удержания неоплаченной брони в периоде [date_start, date_end):
+    после него результат exclude_busy_venues может измениться без новой брони.
+    """
+    now = now or timezone.now()
+    return Booking.objects.filter(
+        status='pending',
+        expires_at__gt=now,
+        date_start__lt=date_end,
+        date_end__gt=date_start
+    ).aggregate(next_expiry=Min('expires_at'))['next_expiry']
+
+
 class VenueFilter(django_filters.FilterSet):
     """Фильтры для поиска площадок"""
     
@@ -16,10 +67,48 @@ class VenueFilter(django_filters.FilterSet):
     price_min = django_filters.NumberFilter(field_name='price_per_hour', lookup_expr='gte', label='Мин. цена')
     price_max = django_filters.NumberFilter(field_name='price_per_hour', lookup_expr='lte', label='Макс. цена')
     address = django_filters.CharFilter(lookup_expr='icontains', label='Адрес')
+    rating_min = django_filters.NumberFilter(field_name='average_rating', lookup_expr='gte', label='Мин. рейтинг')
     category = NumberInFilter(field_name='categories', lookup_expr='in', label='Категории')
     is_active = django_filters.BooleanFilter(label='Активна')
+    # Свободна в окне [available_from, available_to); применяется один раз для пары параметров
+    available_from = django_filters.IsoDateTimeFilter(method='filter_available', label='Свободна с')
+    available_to = django_filters.IsoDateTimeFilter(method='filter_noop', label='Свободна до')
     
     class Meta:
         model = Venue
-        fields = ['title', 'capacity_min', 'capacity_max', 'price_min', 'price_max', 'address', 'category', 'is_active']
+        form = VenueFilterForm
+        fields = [
+            'title', 'capacity_min', 'capacity_max', 'price_min', 'price_max', 'address',
+            'rating_min', 'category', 'is_active', 'available_from', 'available_to'
+        ]
+    
+    def filter_available(self, queryset, name, value):
+        return exclude_busy_venues(queryset, value, self.form.cleaned_data['available_to'])
+    
+    def filter_noop(self, queryset, name, value):
+        return queryset
 
+
+class VenueSearchFilter(BaseFilterBackend):
+    """
+    Полнотекстовый поиск по каталогу (?q=, для совместимости также ?search=).
+    Без явного ?ordering= результаты сортируются по релевантности.
+    """
+    search_params = ('q', 'search')
+    
+    def get_search_query(self, request):
+        for param in self.search_params:
+            query = request.query_params.get(param, '').strip()
+            if query:
+                return query
+        return ''
+    
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query:
+            return queryset
+        
+        queryset = search_venues(queryset, query)
+        if not request.query_params.get('ordering'):
+            queryset = queryset.order_by('-search_rank', 'id')
+        return queryset
@@ -0,0 +1,164 @@
+"""
+Пространственный индекс площадок для карты.
+
+Координаты раскладываются по сетке GEO_CELL_SIZE x GEO_CELL_SIZE градусов,
+номер ячейки хранится в Venue.geo_cell (B-tree индекс). Ячейки одной строки
+сетки идут подряд, поэтому прямоугольник карты - это несколько диапазонов
+geo_cell, а не сканирование всей таблицы. PostGIS не требуется.
+"""
+import math
+from django.db.models import Avg, Count, FloatField, Max, Min, Q, Value
+from django.db.models.functions import Cast, Floor
+
+GEO_CELL_SIZE = 0.01  # ~1.1 км по широте
+GEO_COLUMNS = int(round(360 / GEO_CELL_SIZE))
+GEO_ROWS = int(round(180 / GEO_CELL_SIZE))
+
+# Больше строк сетки - диапазонов слишком много, используем фильтр по координатам
+GEO_MAX_CELL_ROWS = 300
+
+# Начиная с этого масштаба карты площадки возвращаются без кластеризации
+GEO_CLUSTER_MAX_ZOOM = 13
+# Размер кластера - доля ширины тайла (256 px / 4 = ~64 px на экране)
+GEO_CLUSTER_TILE_FRACTION = 4
+
+GEO_MAX_POINTS = 5000
+GEO_MAX_RADIUS_KM = 200
+KM_PER_DEGREE = 111.32
+
+
+def get_geo_row(latitude):
+    return min(max(int(math.floor((float(latitude) + 90) / GEO_CELL_SIZE)), 0), GEO_ROWS)
+
+
+def get_geo_column(longitude):
+    return min(max(int(math.floor((float(longitude) + 180) / GEO_CELL_SIZE)), 0), GEO_COLUMNS - 1)
+
+
+def get_geo_cell(latitude, longitude):
+    """Номер ячейки сетки для координат (None, если координаты не заданы)"""
+    if latitude is None or longitude is None:
+        return None
+    return get_geo_row(latitude) * GEO_COLUMNS + get_geo_column(longitude)
+
+
+def parse_bbox(value):
+    """bbox=min_lon,min_lat,max_lon,max_lat -> (min_lat, min_lon, max_lat, max_lon)"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError('Параметр bbox должен иметь формат min_lon,min_lat,max_lon,max_lat')
+    
+    if not (-90 <= min_lat <= max_lat <= 90) or not (-180 <= min_lon <= max_lon <= 180):
+        raise ValueError('Некорректные границы bbox')
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def parse_geo_area(params):
+    """
+    Область запроса из query params.
+    Возвращает словарь с bbox и, для запроса по радиусу, центром и радиусом.
+    """
+    if params.get('bbox'):
+        min_lat, min_lon, max_lat, max_lon = parse_bbox(params['bbox'])
+        return {'bbox': (min_lat, min_lon, max_lat, max_lon)}
+    
+    if params.get('lat') and params.get('lon') and params.get('radius'):
+        try:
+            lat = float(params['lat'])
+            lon = float(params['lon'])
+            radius = float(params['radius'])
+        except ValueError:
+            raise ValueError('Параметры lat, lon и radius должны быть числами')
+        
+        if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
+            raise ValueError('Некорректные координаты центра')
+        if not (0 < radius <= GEO_MAX_RADIUS_KM):
+            raise ValueError(f'Радиус должен быть от 0 до {GEO_MAX_RADIUS_KM} км')
+        
+        lat_delta = radius / KM_PER_DEGREE
+        lon_delta = radius / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        bbox = (
+            max(lat - lat_delta, -90), max(lon - lon_delta, -180),
+            min(lat + lat_delta, 90), min(lon + lon_delta, 180),
+        )
+        return {'bbox': bbox, 'center': (lat, lon), 'radius': radius}
+    
+    raise ValueError('Укажите bbox или lat, lon и radius (км)')
+
+
+def filter_by_area(queryset, area):
+    """Отфильтровать площадки по области: диапазоны geo_cell + точные границы"""
+    min_lat, min_lon, max_lat, max_lon = area['bbox']
+    
+    first_row, last_row = get_geo_row(min_lat), get_geo_row(max_lat)
+    if last_row - first_row < GEO_MAX_CELL_ROWS:
+        first_column, last_column = get_geo_column(min_lon), get_geo_column(max_lon)
+        cells = Q()
+        for row in range(first_row, last_row + 1):
+            cells |= Q(geo_cell__range=(row * GEO_COLUMNS + first_column, row * GEO_COLUMNS + last_column))
+        queryset = queryset.filter(cells)
+    
+    queryset = queryset.filter(
+        latitude__gte=min_lat, latitude__lte=max_lat,
+        longitude__gte=min_lon, longitude__lte=max_lon
+    )
+    
+    if 'center' in area:
+        lat, lon = area['center']
+        lat_km = (Cast('latitude', FloatField()) - Value(lat)) * Value(KM_PER_DEGREE)
+        lon_km = (Cast('longitude', FloatField()) - Value(lon)) * Value(KM_PER_DEGREE * math.cos(math.radians(lat)))
+        queryset = queryset.annotate(
+            distance_sq=lat_km * lat_km + lon_km * lon_km
+        ).filter(distance_sq__lte=area['radius'] ** 2)
+    
+    return queryset
+
+
+def get_cluster_size(zoom):
+    """Размер ячейки кластеризации в градусах для масштаба карты"""
+    return 360 / (2 ** zoom) / GEO_CLUSTER_TILE_FRACTION
+
+
+def to_point(venue_id, latitude, longitude, price, rating):
+    """Компактное представление площадки: [id, lat, lon, price, rating]"""
+    return [venue_id, float(latitude), float(longitude), float(price), float(rating or 0)]
+
+
+def get_points(queryset, limit=GEO_MAX_POINTS):
+    rows = queryset.order_by().distinct().values_list(
+        'id', 'latitude', 'longitude', 'price_per_hour', 'average_rating'
+    )[:limit + 1]
+    points = [to_point(*row) for row in rows]
+    return points[:limit], len(points) > limit
+
+
+def get_clusters(queryset, zoom):
+    """
+    Кластеризация на стороне БД: группировка по ячейкам размера get_cluster_size(zoom).
+    Кластер из одной площадки возвращается как обычная точка.
+    """
+    size = get_cluster_size(zoom)
+    rows = queryset.order_by().annotate(
+        cluster_row=Floor(Cast('latitude', FloatField()) / Value(size)),
+        cluster_column=Floor(Cast('longitude', FloatField()) / Value(size)),
+    ).values('cluster_row', 'cluster_column').annotate(
+        count=Count('id', distinct=True),
+        venue_id=Min('id'),
+        center_lat=Avg(Cast('latitude', FloatField())),
+        center_lon=Avg(Cast('longitude', FloatField())),
+        min_price=Min('price_per_hour'),
+        max_rating=Max('average_rating'),
+    )
+    
+    points, clusters = [], []
+    for row in rows:
+        if row['count'] == 1:
+            points.append(to_point(
+                row['venue_id'], row['center_lat'], row['center_lon'], row['min_price'], row['max_rating']
+            ))
+        else:
+            clusters.append([
+                round(row['center_lat'], 6), round(row['center_lon'], 6), row['count'], float(row['min_price'])
+            ])
+    return points, clusters
@@ -0,0 +1,23 @@
+"""
+Инвалидация кэша площадок по пространствам имён
+"""
+from django.core.management.base import BaseCommand
+from venues.cache_utils import VENUE_CACHE_NAMESPACES, invalidate_all_venue_caches
+
+
+class Command(BaseCommand):
+    help = 'Инвалидирует кэш площадок (рейтинги, ответы API, занятость) без очистки всего Redis'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--namespace',
+            action='append',
+            dest='namespaces',
+            choices=VENUE_CACHE_NAMESPACES,
+            help='Пространство имён (можно указать несколько раз). По умолчанию - все'
+        )
+    
+    def handle(self, *args, **options):
+        namespaces = tuple(options.get('namespaces') or VENUE_CACHE_NAMESPACES)
+        invalidate_all_venue_caches(namespaces)
+        self.stdout.write(self.style.SUCCESS(f'Кэш инвалидирован: {", ".join(namespaces)}'))
@@ -0,0 +1,36 @@
+"""
+Перестроение поискового индекса площадок
+"""
+from django.core.management.base import BaseCommand
+import logging
+from venues.models import Venue
+from venues.search import rebuild_search_index, uses_full_text_search
+from venues.cache_utils import invalidate_venue_response_cache
+
+logger = logging.getLogger('venues')
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс площадок (tsvector в PostgreSQL или fallback-индекс)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--venue',
+            type=int,
+            action='append',
+            dest='venue_ids',
+            help='ID площадки (можно указать несколько раз). По умолчанию - все площадки'
+        )
+    
+    def handle(self, *args, **options):
+        queryset = Venue.objects.all()
+        if options.get('venue_ids'):
+            queryset = queryset.filter(id__in=options['venue_ids'])
+        
+        count = rebuild_search_index(queryset)
+        # Результаты поиска в кэшированных списках могли измениться
+        invalidate_venue_response_cache()
+        backend = 'tsvector' if uses_full_text_search() else 'fallback'
+        
+        logger.info(f'Venue search index rebuilt: backend={backend}, venues={count}')
+        self.stdout.write(self.style.SUCCESS(f'Поисковый индекс перестроен ({backend}): {count} площадок'))
@@ -0,0 +1,30 @@
+"""
+Пересчёт денормализованных агрегатов рейтинга площадок
+"""
+from django.core.management.base import BaseCommand
+import logging
+from venues.models import Venue
+from venues.cache_utils import invalidate_venue_rating_caches
+
+logger = logging.getLogger('venues')
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает rating_sum/rating_count/average_rating площадок по одобренным отзывам'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--venue',
+            type=int,
+            action='append',
+            dest='venue_ids',
+            help='ID площадки (можно указать несколько раз). По умолчанию - все площадки'
+        )
+    
+    def handle(self, *args, **options):
+        venue_ids = options.get('venue_ids')
+        changed_ids = Venue.recalculate_ratings(venue_ids)
+        invalidate_venue_rating_caches(changed_ids)
+        
+        logger.info(f'Venue ratings recalculated: changed={len(changed_ids)}')
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано площадок: {len(changed_ids)}'))
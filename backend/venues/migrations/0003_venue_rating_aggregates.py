@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:47
+# Дополнено заполнением агрегатов рейтинга по существующим отзывам
+
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import migrations, models
+
+
+def populate_rating_aggregates(apps, schema_editor):
+    """Заполняем агрегаты рейтинга по уже существующим одобренным отзывам"""
+    Venue = apps.get_model('venues', 'Venue')
+    Review = apps.get_model('reviews', 'Review')
+    
+    totals = Review.objects.filter(is_approved=True).order_by().values('venue_id').annotate(
+        rating_sum=models.Sum('rating'),
+        rating_count=models.Count('id')
+    )
+    
+    venues = []
+    for row in totals:
+        average = (Decimal(row['rating_sum']) / row['rating_count']).quantize(
+            Decimal('0.01'), rounding=ROUND_HALF_UP
+        )
+        venues.append(Venue(
+            id=row['venue_id'],
+            rating_sum=row['rating_sum'],
+            rating_count=row['rating_count'],
+            average_rating=average
+        ))
+    
+    Venue.objects.bulk_update(venues, ['rating_sum', 'rating_count', 'average_rating'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0002_add_thumbnails'),
+        ('reviews', '0002_alter_review_unique_together_review_booking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venue',
+            name='average_rating',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=Decimal('0.00'), max_digits=3, verbose_name='Средний рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество отзывов'),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(populate_rating_aggregates, migrations.RunPython.noop),
+    ]
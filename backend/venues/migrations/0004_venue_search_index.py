@@ -0,0 +1,121 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:50
+
+import re
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Снимок настроек и токенизатора venues/search.py на момент миграции:
+# последующие изменения поиска не должны менять результат этой миграции
+SEARCH_CONFIG = 'russian'
+
+SEARCH_FIELDS = (
+    ('title', 1.0),
+    ('address', 0.4),
+    ('description', 0.2),
+)
+
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+MIN_STEM_LENGTH = 3
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+STOP_WORDS = frozenset((
+    'и', 'в', 'во', 'на', 'с', 'со', 'по', 'к', 'ко', 'у', 'о', 'об', 'от', 'до', 'за',
+    'из', 'для', 'не', 'а', 'но', 'или', 'же', 'ли', 'то', 'это', 'как', 'при', 'над', 'под',
+))
+
+RUSSIAN_ENDINGS = tuple(sorted((
+    'иями', 'ями', 'ами', 'ией', 'иям', 'иях', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ая', 'яя', 'ое', 'ее', 'ие', 'ые', 'ой', 'ей', 'ий', 'ый', 'ую', 'юю', 'ом', 'ем',
+    'ам', 'ям', 'ах', 'ях', 'ов', 'ев', 'ия', 'ья', 'ье', 'ью', 'ию',
+    'а', 'я', 'о', 'е', 'и', 'ы', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True))
+
+
+def stem(word):
+    word = word.replace('ё', 'е')
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    terms = []
+    for word in WORD_RE.findall((text or '').lower()):
+        if len(word) < MIN_TERM_LENGTH or word in STOP_WORDS:
+            continue
+        terms.append(stem(word)[:MAX_TERM_LENGTH])
+    return terms
+
+
+def build_index_terms(venue):
+    terms = {}
+    for name, weight in SEARCH_FIELDS:
+        for term in tokenize(getattr(venue, name)):
+            terms[term] = terms.get(term, 0) + weight
+    return terms
+
+
+def create_search_index(apps, schema_editor):
+    """GIN-индекс и заполнение search_vector (PostgreSQL) или fallback-индекса (другие БД)"""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS venues_search_vector_gin ON venues USING gin (search_vector)'
+        )
+        schema_editor.execute(
+            "UPDATE venues SET search_vector = "
+            "setweight(to_tsvector(%s, coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector(%s, coalesce(address, '')), 'B') || "
+            "setweight(to_tsvector(%s, coalesce(description, '')), 'C')",
+            params=[SEARCH_CONFIG] * 3
+        )
+        return
+    
+    Venue = apps.get_model('venues', 'Venue')
+    VenueSearchTerm = apps.get_model('venues', 'VenueSearchTerm')
+    terms = []
+    for venue in Venue.objects.only('title', 'address', 'description').iterator():
+        terms.extend(
+            VenueSearchTerm(venue_id=venue.pk, term=term, weight=weight)
+            for term, weight in build_index_terms(venue).items()
+        )
+    VenueSearchTerm.objects.bulk_create(terms, batch_size=1000)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS venues_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0003_venue_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venue',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.CreateModel(
+            name='VenueSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Терм')),
+                ('weight', models.FloatField(verbose_name='Вес')),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='venues.venue', verbose_name='Площадка')),
+            ],
+            options={
+                'verbose_name': 'Поисковый терм',
+                'verbose_name_plural': 'Поисковые термы',
+                'db_table': 'venue_search_terms',
+                'unique_together': {('term', 'venue')},
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
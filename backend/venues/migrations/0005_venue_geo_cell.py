@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:52
+
+import math
+from django.db import migrations, models
+
+# Снимок сетки venues/geo.py на момент миграции:
+# последующие изменения сетки не должны менять результат этой миграции
+GEO_CELL_SIZE = 0.01
+GEO_COLUMNS = int(round(360 / GEO_CELL_SIZE))
+GEO_ROWS = int(round(180 / GEO_CELL_SIZE))
+
+
+def get_geo_cell(latitude, longitude):
+    row = min(max(int(math.floor((float(latitude) + 90) / GEO_CELL_SIZE)), 0), GEO_ROWS)
+    column = min(max(int(math.floor((float(longitude) + 180) / GEO_CELL_SIZE)), 0), GEO_COLUMNS - 1)
+    return row * GEO_COLUMNS + column
+
+
+def populate_geo_cells(apps, schema_editor):
+    """Вычисляем ячейки карты для площадок с координатами"""
+    Venue = apps.get_model('venues', 'Venue')
+    venues = []
+    for venue in Venue.objects.filter(latitude__isnull=False, longitude__isnull=False).only('latitude', 'longitude'):
+        venue.geo_cell = get_geo_cell(venue.latitude, venue.longitude)
+        venues.append(venue)
+    Venue.objects.bulk_update(venues, ['geo_cell'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0004_venue_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venue',
+            name='geo_cell',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True, verbose_name='Ячейка карты'),
+        ),
+        migrations.RunPython(populate_geo_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:00
+
+from django.db import migrations, models
+
+
+def populate_main_images(apps, schema_editor):
+    """Заполняем главное фото площадок (первое загруженное)"""
+    Venue = apps.get_model('venues', 'Venue')
+    VenueImage = apps.get_model('venues', 'VenueImage')
+    
+    venues = {}
+    images = VenueImage.objects.order_by('venue_id', 'uploaded_at', 'id').values_list(
+        'venue_id', 'image', 'thumbnail_medium', 'thumbnail_medium_webp'
+    )
+    for venue_id, image, thumbnail, thumbnail_webp in images.iterator():
+        if venue_id not in venues:
+            venues[venue_id] = Venue(
+                pk=venue_id,
+                main_image_path=image or '',
+                main_thumbnail_path=thumbnail or '',
+                main_thumbnail_webp_path=thumbnail_webp or ''
+            )
+    Venue.objects.bulk_update(
+        venues.values(),
+        ['main_image_path', 'main_thumbnail_path', 'main_thumbnail_webp_path'],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0005_venue_geo_cell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venue',
+            name='main_image_path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Главное фото'),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='main_thumbnail_path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Миниатюра главного фото'),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='main_thumbnail_webp_path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Миниатюра главного фото WebP'),
+        ),
+        migrations.RunPython(populate_main_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0006_venue_main_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='venue',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='venues_active_created'),
+        ),
+    ]
@@ -1,6 +1,8 @@
-from django.db import models
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import models, transaction
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.contrib.postgres.search import SearchVectorField
 
 
 class Category(models.Model):
@@ -34,8 +36,28 @@ class Venue(models.Model):
     address = models.CharField('Адрес', max_length=500)
     latitude = models.DecimalField('Широта', max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField('Долгота', max_digits=9, decimal_places=6, null=True, blank=True)
+    # Ячейка пространственной сетки (см. venues.geo), вычисляется из координат при сохранении
+    geo_cell = models.IntegerField('Ячейка карты', null=True, blank=True, editable=False, db_index=True)
     created_at = models.DateTimeField('Дата добавления', auto_now_add=True)
     is_active = models.BooleanField('Доступна', default=True)
+    # Денормализованные агрегаты рейтинга (поддерживаются при изменении отзывов)
+    rating_sum = models.PositiveIntegerField('Сумма оценок', default=0)
+    rating_count = models.PositiveIntegerField('Количество отзывов', default=0)
+    average_rating = models.DecimalField(
+        'Средний рейтинг',
+        max_digits=3,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        db_index=True
+    )
+    # Денормализованные пути главного фото (первого загруженного) для списков без запроса к VenueImage
+    main_image_path = models.CharField('Главное фото', max_length=255, blank=True, default='', editable=False)
+    main_thumbnail_path = models.CharField('Миниатюра главного фото', max_length=255, blank=True, default='', editable=False)
+    main_thumbnail_webp_path = models.CharField(
+        'Миниатюра главного фото WebP', max_length=255, blank=True, default='', editable=False
+    )
+    # Поисковый вектор (PostgreSQL tsvector, GIN-индекс создаётся миграцией)
+    search_vector = SearchVectorField('Поисковый вектор', null=True, editable=False)
     categories = models.ManyToManyField(
         Category,
         through='VenueCategory',
@@ -48,22 +70,137 @@ class Venue(models.Model):
         verbose_name = 'Площадка'
         verbose_name_plural = 'Площадки'
         ordering = ['-created_at']
+        indexes = [
+            # Публичный каталог: только активные площадки, новые сверху
+            models.Index(
+                fields=['-created_at'],
+                name='venues_active_created',
+                condition=models.Q(is_active=True)
+            ),
+        ]
     
     def __str__(self):
         return self.title
     
+    def save(self, *args, **kwargs):
+        """Переопределяем save для обновления ячейки карты и поискового индекса"""
+        from .geo import get_geo_cell
+        from .search import SEARCH_FIELD_NAMES, update_search_index
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'latitude', 'longitude'}.intersection(update_fields):
+            self.geo_cell = get_geo_cell(self.latitude, self.longitude)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'geo_cell'}
+        
+        super().save(*args, **kwargs)
+        
+        if update_fields is None or SEARCH_FIELD_NAMES.intersection(update_fields):
+            update_search_index(self)
+    
+    @staticmethod
+    def get_main_image_values(image):
+        """Значения полей главного фото для VenueImage (или пустые, если фото нет)"""
+        return {
+            'main_image_path': image.image.name if image else '',
+            'main_thumbnail_path': (image.thumbnail_medium.name or '') if image else '',
+            'main_thumbnail_webp_path': (image.thumbnail_medium_webp.name or '') if image else '',
+        }
+    
+    @classmethod
+    def update_main_image(cls, venue_id):
+        """
+        Пересчитать главное фото площадки (первое по дате загрузки).
+        Вызывается при добавлении и удалении фотографий.
+        """
+        from .cache_utils import invalidate_venue_response_cache
+        
+        image = VenueImage.objects.filter(venue_id=venue_id).order_by('uploaded_at', 'id').first()
+        cls.objects.filter(pk=venue_id).update(**cls.get_main_image_values(image))
+        invalidate_venue_response_cache([venue_id])
+    
     def get_average_rating(self):
         """Получить средний рейтинг площадки"""
-        from reviews.models import Review
-        reviews = Review.objects.filter(venue=self, is_approved=True)
-        if reviews.exists():
-            return round(reviews.aggregate(models.Avg('rating'))['rating__avg'], 2)
-        return 0
+        return self.average_rating if self.rating_count else 0
     
     def get_reviews_count(self):
         """Получить количество одобренных отзывов"""
+        return self.rating_count
+    
+    @staticmethod
+    def calculate_average_rating(rating_sum, rating_count):
+        """Средний рейтинг с округлением до двух знаков"""
+        if not rating_count:
+            return Decimal('0.00')
+        return (Decimal(rating_sum) / rating_count).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    
+    @classmethod
+    def apply_rating_delta(cls, venue_id, sum_delta, count_delta):
+        """
+        Инкрементально обновить агрегаты рейтинга площадки.
+        Строка площадки блокируется, чтобы параллельные изменения отзывов не терялись.
+        """
+        if not sum_delta and not count_delta:
+            return
+        
+        with transaction.atomic():
+            venue = cls.objects.select_for_update().only(
+                'rating_sum', 'rating_count', 'average_rating'
+            ).filter(pk=venue_id).first()
+            if venue is None:
+                return
+            
+            venue.rating_sum = max(venue.rating_sum + sum_delta, 0)
+            venue.rating_count = max(venue.rating_count + count_delta, 0)
+            venue.average_rating = cls.calculate_average_rating(venue.rating_sum, venue.rating_count)
+            venue.save(update_fields=['rating_sum', 'rating_count', 'average_rating'])
+    
+    @classmethod
+    def recalculate_ratings(cls, venue_ids=None):
+        """
+        Пересчитать агрегаты рейтинга по одобренным отзывам одним сгруппированным запросом.
+        Если venue_ids не передан - пересчитываются все площадки.
+        Возвращает ID площадок, агрегаты которых изменились.
+        """
         from reviews.models import Review
-        return Review.objects.filter(venue=self, is_approved=True).count()
+        
+        venues = cls.objects.only('rating_sum', 'rating_count', 'average_rating')
+        reviews = Review.objects.filter(is_approved=True)
+        if venue_ids is not None:
+            venue_ids = list(venue_ids)
+            venues = venues.filter(pk__in=venue_ids)
+            reviews = reviews.filter(venue_id__in=venue_ids)
+        
+        with transaction.atomic():
+            # Сначала блокируем строки площадок, затем считаем агрегаты
+            locked_venues = list(venues.select_for_update())
+            totals = {
+                row['venue_id']: (row['rating_sum'], row['rating_count'])
+                for row in reviews.order_by().values('venue_id').annotate(
+                    rating_sum=models.Sum('rating'),
+                    rating_count=models.Count('id')
+                )
+            }
+            
+            changed = []
+            for venue in locked_venues:
+                rating_sum, rating_count = totals.get(venue.pk, (0, 0))
+                average_rating = cls.calculate_average_rating(rating_sum, rating_count)
+                if (venue.rating_sum, venue.rating_count, venue.average_rating) != (rating_sum, rating_count, average_rating):
+                    venue.rating_sum = rating_sum
+                    venue.rating_count = rating_count
+                    venue.average_rating = average_rating
+                    changed.append(venue)
+            
+            if changed:
+                cls.objects.bulk_update(changed, ['rating_sum', 'rating_count', 'average_rating'], batch_size=500)
+        
+        if changed:
+            # bulk_update не отправляет сигналы - сбрасываем кэш ответов явно
+            from .cache_utils import invalidate_venue_response_cache
+            invalidate_venue_response_cache([venue.pk for venue in changed])
+        
+        return [venue.pk for venue in changed]
 
 
 class VenueImage(models.Model):
@@ -173,6 +310,14 @@ class VenueImage(models.Model):
                 logger.error(f"Error generating thumbnails for {self.image.name}: {e}")
         
         super().save(*args, **kwargs)
+        Venue.update_main_image(self.venue_id)
+    
+    def delete(self, *args, **kwargs):
+        """После удаления фото пересчитываем главное фото площадки"""
+        venue_id = self.venue_id
+        result = super().delete(*args, **kwargs)
+        Venue.update_main_image(venue_id)
+        return result
 
 
 class VenueCategory(models.Model):
@@ -189,3 +334,23 @@ class VenueCategory(models.Model):
     def __str__(self):
         return f"{self.venue.title} - {self.category.name}"
 
+
+class VenueSearchTerm(models.Model):
+    """Запись инвертированного поискового индекса (fallback для БД без tsvector)"""
+    venue = models.ForeignKey(
+        Venue,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Площадка'
+    )
+    term = models.CharField('Терм', max_length=64)
+    weight = models.FloatField('Вес')
+    
+    class Meta:
+        db_table = 'venue_search_terms'
+        verbose_name = 'Поисковый терм'
+        verbose_name_plural = 'Поисковые термы'
+        unique_together = ['term', 'venue']
+    
+    def __str__(self):
+        return f"{self.term} -> {self.venue_id}"
@@ -0,0 +1,147 @@
+"""
+Полнотекстовый поиск по каталогу площадок.
+
+PostgreSQL: хранимый tsvector (Venue.search_vector) с GIN-индексом и русским стеммингом.
+Другие БД (SQLite в тестах): инвертированный индекс в таблице VenueSearchTerm,
+который строится на Python с упрощённым русским стеммером.
+"""
+import re
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+
+SEARCH_CONFIG = 'russian'
+
+# Поле, вес tsvector, вес для fallback-индекса (как веса A/B/C в ts_rank по умолчанию)
+SEARCH_FIELDS = (
+    ('title', 'A', 1.0),
+    ('address', 'B', 0.4),
+    ('description', 'C', 0.2),
+)
+SEARCH_FIELD_NAMES = frozenset(name for name, _, _ in SEARCH_FIELDS)
+
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+MIN_STEM_LENGTH = 3
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+STOP_WORDS = frozenset((
+    'и', 'в', 'во', 'на', 'с', 'со', 'по', 'к', 'ко', 'у', 'о', 'об', 'от', 'до', 'за',
+    'из', 'для', 'не', 'а', 'но', 'или', 'же', 'ли', 'то', 'это', 'как', 'при', 'над', 'под',
+))
+
+# Окончания, отсекаемые стеммером (от длинных к коротким)
+RUSSIAN_ENDINGS = tuple(sorted((
+    'иями', 'ями', 'ами', 'ией', 'иям', 'иях', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ая', 'яя', 'ое', 'ее', 'ие', 'ые', 'ой', 'ей', 'ий', 'ый', 'ую', 'юю', 'ом', 'ем',
+    'ам', 'ям', 'ах', 'ях', 'ов', 'ев', 'ия', 'ья', 'ье', 'ью', 'ию',
+    'а', 'я', 'о', 'е', 'и', 'ы', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True))
+
+
+def uses_full_text_search():
+    """Доступен ли полнотекстовый поиск PostgreSQL"""
+    return connection.vendor == 'postgresql'
+
+
+def stem(word):
+    """Упрощённый стемминг: отсекаем типичное русское окончание"""
+    word = word.replace('ё', 'е')
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    """Разбить текст на нормализованные термы"""
+    terms = []
+    for word in WORD_RE.findall((text or '').lower()):
+        if len(word) < MIN_TERM_LENGTH or word in STOP_WORDS:
+            continue
+        terms.append(stem(word)[:MAX_TERM_LENGTH])
+    return terms
+
+
+def build_search_vector():
+    """Выражение tsvector по полям площадки с весами"""
+    from django.contrib.postgres.search import SearchVector
+    
+    vector = None
+    for name, weight, _ in SEARCH_FIELDS:
+        part = SearchVector(name, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def build_index_terms(venue):
+    """Термы площадки для fallback-индекса: {терм: суммарный вес}"""
+    terms = {}
+    for name, _, weight in SEARCH_FIELDS:
+        for term in tokenize(getattr(venue, name)):
+            terms[term] = terms.get(term, 0) + weight
+    return terms
+
+
+def update_search_index(venue):
+    """Обновить поисковый индекс одной площадки"""
+    from .models import Venue, VenueSearchTerm
+    
+    if uses_full_text_search():
+        Venue.objects.filter(pk=venue.pk).update(search_vector=build_search_vector())
+        return
+    
+    with transaction.atomic():
+        VenueSearchTerm.objects.filter(venue_id=venue.pk).delete()
+        VenueSearchTerm.objects.bulk_create([
+            VenueSearchTerm(venue_id=venue.pk, term=term, weight=weight)
+            for term, weight in build_index_terms(venue).items()
+        ])
+
+
+def rebuild_search_index(queryset=None, chunk_size=500):
+    """Перестроить поисковый индекс для площадок (по умолчанию - для всех)"""
+    from .models import Venue
+    
+    if queryset is None:
+        queryset = Venue.objects.all()
+    
+    if uses_full_text_search():
+        return queryset.update(search_vector=build_search_vector())
+    
+    count = 0
+    for venue in queryset.only(*SEARCH_FIELD_NAMES).iterator(chunk_size=chunk_size):
+        update_search_index(venue)
+        count += 1
+    return count
+
+
+def search_venues(queryset, query):
+    """
+    Отфильтровать queryset по поисковому запросу.
+    Добавляет аннотацию search_rank (чем больше, тем релевантнее).
+    """
+    if uses_full_text_search():
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query)
+        )
+    
+    from .models import VenueSearchTerm
+    
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return queryset.none()
+    
+    # Площадка подходит, если содержит все термы запроса; ранг - сумма весов
+    matches = VenueSearchTerm.objects.filter(
+        venue_id=OuterRef('pk'),
+        term__in=terms
+    ).order_by().values('venue_id').annotate(
+        matched=Count('term', distinct=True),
+        rank=Sum('weight')
+    ).filter(matched=len(terms)).values('rank')
+    
+    return queryset.annotate(search_rank=Subquery(matches)).filter(search_rank__isnull=False)
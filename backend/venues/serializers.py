@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from django.core.files.storage import default_storage
+from rentalall.serializers import SparseModelSerializer
 from .models import Category, Venue, VenueImage
 
 
@@ -27,45 +29,65 @@ class VenueImageSerializer(serializers.ModelSerializer):
         )
 
 
-class VenueListSerializer(serializers.ModelSerializer):
-    """Сериализатор для списка площадок (краткая информация)"""
+class VenueListSerializer(SparseModelSerializer):
+    """
+    Сериализатор для списка площадок (краткая информация).
+    По умолчанию вместо всех фотографий отдаются только миниатюры главной;
+    полный список фотографий - по ?expand=images.
+    """
     categories = CategorySerializer(many=True, read_only=True)
     images = VenueImageSerializer(many=True, read_only=True)
     main_image = serializers.SerializerMethodField()
-    # Используем аннотированные поля из queryset вместо методов модели
+    main_thumbnail = serializers.SerializerMethodField()
+    main_thumbnail_webp = serializers.SerializerMethodField()
+    # Денормализованные агрегаты рейтинга из модели Venue
     average_rating = serializers.DecimalField(
         max_digits=3, decimal_places=2, read_only=True, coerce_to_string=False
     )
-    reviews_count = serializers.IntegerField(read_only=True)
+    reviews_count = serializers.IntegerField(source='rating_count', read_only=True)
     
     class Meta:
         model = Venue
         fields = (
             'id', 'title', 'capacity', 'price_per_hour', 'address',
             'latitude', 'longitude',  # Добавлены координаты для карты
-            'main_image', 'images', 'categories', 'average_rating', 'reviews_count', 'is_active'
+            'main_image', 'main_thumbnail', 'main_thumbnail_webp', 'images',
+            'categories', 'average_rating', 'reviews_count', 'is_active'
         )
+        expandable_fields = ('images',)
+    
+    def build_url(self, name):
+        """URL файла по пути в хранилище (абсолютный, если есть request)"""
+        if not name:
+            return None
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(url)
+        return url
     
     def get_main_image(self, obj):
-        """Получить первое изображение площадки"""
-        # Благодаря prefetch_related, это не создаст дополнительный запрос
-        first_image = obj.images.first() if obj.images.all() else None
-        if first_image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(first_image.image.url)
-        return None
+        """Главное фото площадки (денормализовано в Venue, без запроса к VenueImage)"""
+        return self.build_url(obj.main_image_path)
+    
+    def get_main_thumbnail(self, obj):
+        """Средняя JPEG-миниатюра главного изображения (для карточки)"""
+        return self.build_url(obj.main_thumbnail_path)
+    
+    def get_main_thumbnail_webp(self, obj):
+        """Средняя WebP-миниатюра главного изображения"""
+        return self.build_url(obj.main_thumbnail_webp_path)
 
 
-class VenueDetailSerializer(serializers.ModelSerializer):
+class VenueDetailSerializer(SparseModelSerializer):
     """Сериализатор для детальной информации о площадке"""
     categories = CategorySerializer(many=True, read_only=True)
     images = VenueImageSerializer(many=True, read_only=True)
-    # Используем аннотированные поля из queryset
+    # Денормализованные агрегаты рейтинга из модели Venue
     average_rating = serializers.DecimalField(
         max_digits=3, decimal_places=2, read_only=True, coerce_to_string=False
     )
-    reviews_count = serializers.IntegerField(read_only=True)
+    reviews_count = serializers.IntegerField(source='rating_count', read_only=True)
     owner_name = serializers.CharField(source='owner.full_name', read_only=True)
     
     class Meta:
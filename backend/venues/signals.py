@@ -0,0 +1,41 @@
+"""
+Сигналы для инвалидации кэша ответов API каталога площадок
+"""
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import Category, Venue, VenueCategory
+from .cache_utils import invalidate_category_response_cache, invalidate_venue_response_cache
+
+
+@receiver(post_save, sender=Venue)
+@receiver(post_delete, sender=Venue)
+def invalidate_venue_on_change(sender, instance, **kwargs):
+    """Изменение площадки (в том числе агрегатов рейтинга при модерации отзывов)"""
+    invalidate_venue_response_cache([instance.pk])
+
+
+@receiver(post_save, sender=VenueCategory)
+@receiver(post_delete, sender=VenueCategory)
+def invalidate_venue_on_category_link(sender, instance, **kwargs):
+    """Привязка площадки к категории через админку"""
+    invalidate_venue_response_cache([instance.venue_id])
+
+
+@receiver(m2m_changed, sender=Venue.categories.through)
+def invalidate_venue_on_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """venue.categories.set()/add()/remove() и обратные операции с категорией"""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_venue_response_cache([instance.pk])
+    elif pk_set:
+        invalidate_venue_response_cache(pk_set)
+    else:
+        # category.venues.clear() не передаёт pk_set - сбрасываем всё, что содержит категории
+        invalidate_category_response_cache()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_on_change(sender, instance, **kwargs):
+    invalidate_category_response_cache()
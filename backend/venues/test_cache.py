@@ -4,19 +4,33 @@
 from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.management import call_command
 from rest_framework.test import APIClient
 from rest_framework import status
 from datetime import timedelta
 from django.utils import timezone
 from decimal import Decimal
+from io import StringIO
+from unittest import mock
+import time
 
 from venues.models import Category, Venue
 from bookings.models import Booking
 from reviews.models import Review
 from venues.cache_utils import (
+    CATALOG_GENERATION,
+    RATINGS_NAMESPACE,
+    ResponseCacheMixin,
+    get_rating_cache_stats,
     get_venue_rating_from_cache,
+    get_venue_ratings_bulk,
+    invalidate_all_venue_caches,
+    invalidate_namespace,
     invalidate_venue_rating_cache,
-    get_cache_key
+    invalidate_venue_rating_caches,
+    reset_rating_cache_stats,
+    get_cache_key,
+    get_namespace_version
 )
 
 User = get_user_model()
@@ -264,3 +278,331 @@ class VenueRatingCacheTestCase(TestCase):
         cached_data = cache.get(cache_key)
         self.assertIsNotNone(cached_data)
         self.assertEqual(cached_data, rating_data)
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'test-cache',
+        }
+    }
+)
+class VenueRatingStampedeTestCase(TestCase):
+    """Тесты защиты кэша рейтингов от stampede"""
+    
+    def setUp(self):
+        cache.clear()
+        reset_rating_cache_stats()
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='user@test.com',
+            password='testpass123'
+        )
+        self.venue = Venue.objects.create(
+            title='Test Venue',
+            description='Test',
+            address='Test Address',
+            capacity=10,
+            price_per_hour=Decimal('1000.00'),
+            owner=self.user,
+            is_active=True
+        )
+        self.cache_key = get_cache_key(self.venue.id, 'rating_data')
+    
+    def add_review(self, rating):
+        Review.objects.create(venue=self.venue, user=self.user, rating=rating, comment='Отзыв', is_approved=True)
+    
+    def test_hit_and_miss_counters(self):
+        get_venue_rating_from_cache(self.venue.id)
+        get_venue_rating_from_cache(self.venue.id)
+        
+        stats = get_rating_cache_stats()
+        self.assertEqual(stats['miss'], 1)
+        self.assertEqual(stats['hit'], 1)
+    
+    def test_stale_value_served_while_locked(self):
+        """Пока другой процесс пересчитывает рейтинг, отдаётся устаревшее значение без запроса к БД"""
+        get_venue_rating_from_cache(self.venue.id)
+        self.add_review(5)
+        invalidate_venue_rating_cache(self.venue.id)
+        cache.add(f'{self.cache_key}:lock', 1, 10)
+        
+        with self.assertNumQueries(0):
+            rating_data = get_venue_rating_from_cache(self.venue.id)
+        
+        self.assertEqual(rating_data['reviews_count'], 0)
+        self.assertEqual(get_rating_cache_stats()['stale'], 1)
+    
+    def test_lock_wait_without_stale_value(self):
+        """Без устаревшего значения запрос ждёт блокировку, затем считает сам"""
+        self.add_review(4)
+        cache.add(f'{self.cache_key}:lock', 1, 10)
+        
+        with mock.patch('venues.cache_utils.RATING_LOCK_WAIT', 0.1):
+            rating_data = get_venue_rating_from_cache(self.venue.id)
+        
+        self.assertEqual(rating_data['reviews_count'], 1)
+        self.assertEqual(get_rating_cache_stats()['lock_wait'], 1)
+    
+    def test_early_refresh_near_expiry(self):
+        """Значение, близкое к истечению, обновляется заранее"""
+        get_venue_rating_from_cache(self.venue.id)
+        self.add_review(3)
+        
+        envelope = cache.get(f'{self.cache_key}:stale')
+        envelope['expires_at'] = time.time()
+        cache.set(f'{self.cache_key}:stale', envelope)
+        
+        rating_data = get_venue_rating_from_cache(self.venue.id)
+        
+        self.assertEqual(rating_data['reviews_count'], 1)
+        self.assertEqual(get_rating_cache_stats()['early_refresh'], 1)
+        self.assertEqual(cache.get(self.cache_key), rating_data)
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'test-cache',
+        }
+    }
+)
+class VenueRatingsBulkTestCase(TestCase):
+    """Тесты пакетного получения рейтингов"""
+    
+    def setUp(self):
+        cache.clear()
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='user@test.com',
+            password='testpass123'
+        )
+        self.venues = [
+            Venue.objects.create(
+                title=f'Площадка {i}',
+                description='Test',
+                address='Test Address',
+                capacity=10,
+                price_per_hour=Decimal('1000.00'),
+                owner=self.user,
+                is_active=True
+            )
+            for i in range(3)
+        ]
+        Review.objects.create(venue=self.venues[0], user=self.user, rating=4, comment='Отзыв', is_approved=True)
+    
+    def test_bulk_lookup_single_query(self):
+        """Промахи считаются одним запросом, повторный вызов не обращается к БД"""
+        get_venue_rating_from_cache(self.venues[1].id)
+        ids = [venue.id for venue in self.venues]
+        
+        with self.assertNumQueries(1):
+            ratings = get_venue_ratings_bulk(ids)
+        
+        self.assertEqual(ratings[self.venues[0].id], {'average_rating': 4.0, 'reviews_count': 1})
+        self.assertEqual(ratings[self.venues[2].id], {'average_rating': 0.0, 'reviews_count': 0})
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(get_venue_ratings_bulk(ids), ratings)
+        
+        # Записанные значения доступны и для одиночного чтения
+        with self.assertNumQueries(0):
+            self.assertEqual(get_venue_rating_from_cache(self.venues[0].id), ratings[self.venues[0].id])
+    
+    def test_missing_venue(self):
+        self.assertEqual(get_venue_ratings_bulk([999999]), {999999: {'average_rating': 0.0, 'reviews_count': 0}})
+    
+    def test_invalidate_many_reads_version_once(self):
+        """Пакетная инвалидация читает версию пространства имён один раз и удаляет все ключи"""
+        ids = [venue.id for venue in self.venues]
+        get_venue_ratings_bulk(ids)
+        
+        with mock.patch(
+            'venues.cache_utils.get_namespace_version', wraps=get_namespace_version
+        ) as get_version:
+            invalidate_venue_rating_caches(ids)
+        
+        self.assertEqual(get_version.call_count, 1)
+        self.assertTrue(all(cache.get(get_cache_key(venue_id, 'rating_data')) is None for venue_id in ids))
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'test-cache',
+        }
+    },
+    APPEND_SLASH=False,
+    SECURE_SSL_REDIRECT=False,
+    SECURE_PROXY_SSL_HEADER=None
+)
+class VenueResponseCacheTestCase(TestCase):
+    """Тесты кэша ответов API каталога с инвалидацией по поколениям"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        cache.clear()
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='user@test.com',
+            password='testpass123',
+            full_name='Test User'
+        )
+        self.admin = User.objects.create_user(
+            username='adminuser',
+            email='admin@test.com',
+            password='adminpass123',
+            full_name='Admin User',
+            role='admin'
+        )
+        self.category = Category.objects.create(name='Коворкинг')
+        self.venue = self.create_venue('Площадка 1')
+        self.other_venue = self.create_venue('Площадка 2')
+        self.venue.categories.add(self.category)
+    
+    def create_venue(self, title, is_active=True):
+        return Venue.objects.create(
+            title=title,
+            description='Test',
+            address='Test Address',
+            capacity=10,
+            price_per_hour=Decimal('1000.00'),
+            owner=self.admin,
+            is_active=is_active
+        )
+    
+    def test_list_served_from_cache(self):
+        """Повторный запрос списка не обращается к БД"""
+        first = self.client.get('/api/venues/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/venues/')
+        
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+    
+    def test_query_params_are_normalized(self):
+        """Порядок параметров не влияет на ключ кэша"""
+        self.client.get('/api/venues/?capacity_min=5&ordering=title')
+        response = self.client.get('/api/venues/?ordering=title&capacity_min=5')
+        self.assertEqual(response['X-Cache'], 'HIT')
+    
+    def test_venue_save_invalidates_only_its_detail(self):
+        """Сохранение площадки сбрасывает списки и её страницу, но не страницы других площадок"""
+        self.client.get('/api/venues/')
+        self.client.get(f'/api/venues/{self.venue.id}/')
+        self.client.get(f'/api/venues/{self.other_venue.id}/')
+        
+        self.venue.title = 'Новое название'
+        self.venue.save()
+        
+        response = self.client.get('/api/venues/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('Новое название', [venue['title'] for venue in response.data['results']])
+        
+        response = self.client.get(f'/api/venues/{self.venue.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['title'], 'Новое название')
+        
+        response = self.client.get(f'/api/venues/{self.other_venue.id}/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+    
+    def test_default_generations(self):
+        """Без переопределения ответы зависят от поколения каталога"""
+        self.assertEqual(ResponseCacheMixin().get_response_cache_generations(), [CATALOG_GENERATION])
+    
+    def test_admin_and_public_cached_separately(self):
+        """Администратор видит неактивные площадки, публичный кэш их не содержит"""
+        inactive = self.create_venue('Неактивная', is_active=False)
+        
+        public_ids = [venue['id'] for venue in self.client.get('/api/venues/').data['results']]
+        self.client.force_authenticate(user=self.admin)
+        admin_response = self.client.get('/api/venues/')
+        
+        self.assertEqual(admin_response['X-Cache'], 'MISS')
+        self.assertNotIn(inactive.id, public_ids)
+        self.assertIn(inactive.id, [venue['id'] for venue in admin_response.data['results']])
+    
+    def test_review_approval_invalidates_rating(self):
+        """Одобрение отзыва обновляет рейтинг в кэшированной странице площадки"""
+        review = Review.objects.create(
+            venue=self.venue,
+            user=self.user,
+            rating=4,
+            comment='Хорошо',
+            is_approved=False
+        )
+        self.assertEqual(self.client.get(f'/api/venues/{self.venue.id}/').data['reviews_count'], 0)
+        
+        self.client.force_authenticate(user=self.admin)
+        self.client.post(f'/api/reviews/{review.id}/approve/')
+        self.client.force_authenticate(user=None)
+        
+        response = self.client.get(f'/api/venues/{self.venue.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['reviews_count'], 1)
+    
+    def test_category_change_invalidates_categories(self):
+        """Переименование категории сбрасывает список категорий и страницы площадок"""
+        self.client.get('/api/venues/categories/')
+        self.client.get(f'/api/venues/{self.venue.id}/')
+        
+        self.category.name = 'Лофт'
+        self.category.save()
+        
+        response = self.client.get('/api/venues/categories/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        response = self.client.get(f'/api/venues/{self.venue.id}/')
+        self.assertEqual(response.data['categories'][0]['name'], 'Лофт')
+    
+    def test_category_assignment_invalidates_venue(self):
+        """Изменение категорий площадки сбрасывает её страницу"""
+        self.client.get(f'/api/venues/{self.other_venue.id}/')
+        
+        self.other_venue.categories.set([self.category])
+        
+        response = self.client.get(f'/api/venues/{self.other_venue.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['categories']), 1)
+    
+    def test_namespace_invalidation_keeps_responses(self):
+        """Инвалидация рейтингов не сбрасывает кэш ответов"""
+        self.client.get('/api/venues/')
+        get_venue_rating_from_cache(self.venue.id)
+        old_key = get_cache_key(self.venue.id, 'rating_data')
+        
+        invalidate_namespace(RATINGS_NAMESPACE)
+        
+        self.assertNotEqual(get_cache_key(self.venue.id, 'rating_data'), old_key)
+        self.assertIsNone(cache.get(get_cache_key(self.venue.id, 'rating_data')))
+        self.assertEqual(self.client.get('/api/venues/')['X-Cache'], 'HIT')
+    
+    def test_invalidate_all_keeps_foreign_keys(self):
+        """invalidate_all_venue_caches не очищает чужие ключи (например, throttling)"""
+        cache.set('throttle_user_1', [1, 2, 3])
+        self.client.get('/api/venues/')
+        get_venue_rating_from_cache(self.venue.id)
+        
+        invalidate_all_venue_caches()
+        
+        self.assertEqual(cache.get('throttle_user_1'), [1, 2, 3])
+        self.assertIsNone(cache.get(get_cache_key(self.venue.id, 'rating_data')))
+        self.assertEqual(self.client.get('/api/venues/')['X-Cache'], 'MISS')
+    
+    def test_invalidate_command(self):
+        """Команда invalidate_venue_cache сбрасывает только указанное пространство имён"""
+        self.client.get('/api/venues/')
+        
+        call_command('invalidate_venue_cache', '--namespace', 'ratings', stdout=StringIO())
+        self.assertEqual(self.client.get('/api/venues/')['X-Cache'], 'HIT')
+        
+        call_command('invalidate_venue_cache', stdout=StringIO())
+        self.assertEqual(self.client.get('/api/venues/')['X-Cache'], 'MISS')
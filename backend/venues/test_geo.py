@@ -0,0 +1,132 @@
+"""
+Тесты пространственного индекса и API карты
+"""
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from decimal import Decimal
+
+from venues.models import Category, Venue
+from venues.geo import GEO_COLUMNS, get_geo_cell
+
+User = get_user_model()
+
+
+class GeoCellTestCase(TestCase):
+    """Тесты вычисления ячейки сетки"""
+    
+    def test_neighbouring_columns_are_adjacent(self):
+        cell = get_geo_cell(Decimal('58.600000'), Decimal('49.600000'))
+        self.assertEqual(get_geo_cell(Decimal('58.600000'), Decimal('49.610000')), cell + 1)
+        self.assertEqual(get_geo_cell(Decimal('58.610000'), Decimal('49.600000')), cell + GEO_COLUMNS)
+    
+    def test_missing_coordinates(self):
+        self.assertIsNone(get_geo_cell(None, Decimal('49.6')))
+    
+    def test_geo_cell_updated_on_save(self):
+        user = User.objects.create_user(username='owner', email='owner@test.com', password='testpass123')
+        venue = Venue.objects.create(
+            owner=user, title='Площадка', description='Описание', capacity=10,
+            price_per_hour=Decimal('1000.00'), address='Адрес',
+            latitude=Decimal('58.6'), longitude=Decimal('49.6')
+        )
+        self.assertEqual(venue.geo_cell, get_geo_cell(venue.latitude, venue.longitude))
+        
+        venue.latitude = Decimal('55.75')
+        venue.save(update_fields=['latitude'])
+        venue.refresh_from_db()
+        self.assertEqual(venue.geo_cell, get_geo_cell(Decimal('55.75'), venue.longitude))
+
+
+@override_settings(
+    APPEND_SLASH=False,
+    SECURE_SSL_REDIRECT=False,
+    SECURE_PROXY_SSL_HEADER=None
+)
+class VenueGeoAPITestCase(TestCase):
+    """Тесты /api/venues/geo/"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(name='Коворкинг')
+        
+        # Кластер из 5 площадок в центре Кирова и одна площадка в Москве
+        self.kirov = []
+        for i in range(5):
+            venue = self.create_venue(f'Киров {i}', Decimal('58.600') + Decimal(i) / 1000, Decimal('49.600'))
+            self.kirov.append(venue)
+        self.kirov[0].categories.add(self.category)
+        self.moscow = self.create_venue('Москва', Decimal('55.751244'), Decimal('37.618423'))
+        self.create_venue('Без координат', None, None)
+        inactive = self.create_venue('Неактивная', Decimal('58.601'), Decimal('49.601'))
+        inactive.is_active = False
+        inactive.save()
+    
+    def create_venue(self, title, latitude, longitude):
+        return Venue.objects.create(
+            owner=self.user,
+            title=title,
+            description='Описание',
+            capacity=20,
+            price_per_hour=Decimal('1000.00'),
+            address='Адрес',
+            latitude=latitude,
+            longitude=longitude,
+            is_active=True
+        )
+    
+    def test_bbox_returns_compact_points(self):
+        """bbox возвращает площадки в виде [id, lat, lon, price, rating]"""
+        response = self.client.get('/api/venues/geo/', {'bbox': '49.5,58.5,49.7,58.7'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = sorted(point[0] for point in response.data['points'])
+        self.assertEqual(ids, sorted(venue.id for venue in self.kirov))
+        
+        point = next(p for p in response.data['points'] if p[0] == self.kirov[0].id)
+        self.assertEqual(point, [self.kirov[0].id, 58.6, 49.6, 1000.0, 0.0])
+        self.assertEqual(response.data['clusters'], [])
+    
+    def test_radius_query(self):
+        """Поиск по центру и радиусу"""
+        response = self.client.get('/api/venues/geo/', {'lat': '55.75', 'lon': '37.62', 'radius': '5'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([point[0] for point in response.data['points']], [self.moscow.id])
+    
+    def test_low_zoom_clusters(self):
+        """На малом масштабе близкие площадки объединяются в кластер"""
+        response = self.client.get('/api/venues/geo/', {'bbox': '30,50,60,60', 'zoom': '8'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['clusters']), 1)
+        self.assertEqual(response.data['clusters'][0][2], 5)
+        self.assertEqual([point[0] for point in response.data['points']], [self.moscow.id])
+    
+    def test_catalog_filters_apply(self):
+        """Фильтры каталога работают и для карты"""
+        response = self.client.get('/api/venues/geo/', {
+            'bbox': '30,50,60,60',
+            'category': self.category.id
+        })
+        
+        self.assertEqual([point[0] for point in response.data['points']], [self.kirov[0].id])
+    
+    def test_invalid_params(self):
+        """Некорректные параметры возвращают 400"""
+        for params in ({}, {'bbox': '1,2,3'}, {'bbox': '50,60,40,70'}, {'bbox': '30,50,60,60', 'zoom': 'x'}):
+            response = self.client.get('/api/venues/geo/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+    
+    def test_single_query(self):
+        """Карта загружается одним запросом к БД"""
+        with self.assertNumQueries(1):
+            self.client.get('/api/venues/geo/', {'bbox': '30,50,60,60', 'zoom': '8'})
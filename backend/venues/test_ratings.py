@@ -0,0 +1,175 @@
+"""
+Тесты денормализованных агрегатов рейтинга площадок
+"""
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.contrib.admin.sites import AdminSite
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from rest_framework import status
+from datetime import timedelta
+from django.utils import timezone
+from decimal import Decimal
+from io import StringIO
+
+from venues.models import Venue
+from bookings.models import Booking
+from reviews.models import Review
+from reviews.admin import ReviewAdmin
+
+User = get_user_model()
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'test-ratings-cache',
+        }
+    },
+    APPEND_SLASH=False,
+    SECURE_SSL_REDIRECT=False,
+    SECURE_PROXY_SSL_HEADER=None
+)
+class VenueRatingAggregatesTestCase(TestCase):
+    """Тесты инкрементального обновления rating_sum/rating_count/average_rating"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='user@test.com',
+            password='testpass123',
+            full_name='Test User'
+        )
+        self.admin = User.objects.create_user(
+            username='adminuser',
+            email='admin@test.com',
+            password='adminpass123',
+            full_name='Admin User',
+            role='admin'
+        )
+        
+        self.venue = Venue.objects.create(
+            title='Test Venue',
+            description='Test',
+            address='Test Address',
+            capacity=10,
+            price_per_hour=Decimal('1000.00'),
+            owner=self.admin,
+            is_active=True
+        )
+        self.booking = Booking.objects.create(
+            venue=self.venue,
+            user=self.user,
+            date_start=timezone.now() - timedelta(days=2),
+            date_end=timezone.now() - timedelta(days=2, hours=-2),
+            total_price=Decimal('2000.00'),
+            status='confirmed'
+        )
+    
+    def assertVenueRating(self, rating_sum, rating_count, average_rating):
+        self.venue.refresh_from_db()
+        self.assertEqual(self.venue.rating_sum, rating_sum)
+        self.assertEqual(self.venue.rating_count, rating_count)
+        self.assertEqual(self.venue.average_rating, Decimal(average_rating))
+    
+    def test_unapproved_review_does_not_affect_rating(self):
+        """Неодобренный отзыв не учитывается в агрегатах"""
+        Review.objects.create(venue=self.venue, user=self.user, rating=5, comment='Ок', is_approved=False)
+        self.assertVenueRating(0, 0, '0.00')
+    
+    def test_approved_reviews_update_rating(self):
+        """Одобренные отзывы инкрементально меняют агрегаты"""
+        Review.objects.create(venue=self.venue, user=self.user, rating=5, comment='Ок', is_approved=True)
+        Review.objects.create(venue=self.venue, user=self.admin, rating=4, comment='Ок', is_approved=True)
+        self.assertVenueRating(9, 2, '4.50')
+    
+    def test_approve_and_disapprove_via_api(self):
+        """Одобрение и отклонение отзыва через API"""
+        review = Review.objects.create(
+            venue=self.venue, user=self.user, booking=self.booking,
+            rating=4, comment='Ок', is_approved=False
+        )
+        self.client.force_authenticate(user=self.admin)
+        
+        response = self.client.post(f'/api/reviews/{review.id}/approve/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertVenueRating(4, 1, '4.00')
+        
+        response = self.client.post(f'/api/reviews/{review.id}/disapprove/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertVenueRating(0, 0, '0.00')
+    
+    def test_edit_resets_approval_and_rating(self):
+        """Редактирование отзыва снимает одобрение и вклад в рейтинг"""
+        review = Review.objects.create(
+            venue=self.venue, user=self.user, booking=self.booking,
+            rating=5, comment='Ок', is_approved=True
+        )
+        self.client.force_authenticate(user=self.user)
+        
+        response = self.client.patch(f'/api/reviews/{review.id}/', {'rating': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertVenueRating(0, 0, '0.00')
+    
+    def test_delete_review_updates_rating(self):
+        """Удаление отзыва (в том числе каскадное) убирает его вклад"""
+        Review.objects.create(
+            venue=self.venue, user=self.user, booking=self.booking,
+            rating=5, comment='Ок', is_approved=True
+        )
+        Review.objects.create(venue=self.venue, user=self.admin, rating=3, comment='Ок', is_approved=True)
+        
+        self.booking.delete()
+        self.assertVenueRating(3, 1, '3.00')
+    
+    def test_admin_bulk_actions_update_rating(self):
+        """Массовые действия в админке пересчитывают агрегаты"""
+        Review.objects.create(venue=self.venue, user=self.user, rating=5, comment='Ок', is_approved=False)
+        Review.objects.create(venue=self.venue, user=self.admin, rating=2, comment='Ок', is_approved=False)
+        
+        model_admin = ReviewAdmin(Review, AdminSite())
+        model_admin.message_user = lambda *args, **kwargs: None
+        
+        model_admin.approve_reviews(None, Review.objects.all())
+        self.assertVenueRating(7, 2, '3.50')
+        
+        model_admin.disapprove_reviews(None, Review.objects.filter(rating=5))
+        self.assertVenueRating(2, 1, '2.00')
+    
+    def test_recalculate_command_fixes_drift(self):
+        """Команда recalculate_venue_ratings восстанавливает агрегаты"""
+        Review.objects.create(venue=self.venue, user=self.user, rating=5, comment='Ок', is_approved=True)
+        Venue.objects.filter(pk=self.venue.pk).update(rating_sum=100, rating_count=7, average_rating=Decimal('1.23'))
+        
+        out = StringIO()
+        call_command('recalculate_venue_ratings', stdout=out)
+        
+        self.assertVenueRating(5, 1, '5.00')
+        self.assertIn('1', out.getvalue())
+    
+    def test_ordering_and_filter_by_rating(self):
+        """Сортировка и фильтрация каталога по рейтингу"""
+        other = Venue.objects.create(
+            title='Other Venue',
+            description='Test',
+            address='Other Address',
+            capacity=10,
+            price_per_hour=Decimal('500.00'),
+            owner=self.admin,
+            is_active=True
+        )
+        Review.objects.create(venue=self.venue, user=self.user, rating=3, comment='Ок', is_approved=True)
+        Review.objects.create(venue=other, user=self.user, rating=5, comment='Ок', is_approved=True)
+        
+        response = self.client.get('/api/venues/', {'ordering': '-average_rating'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [venue['id'] for venue in response.data['results']]
+        self.assertEqual(ids, [other.id, self.venue.id])
+        
+        response = self.client.get('/api/venues/', {'rating_min': 4})
+        ids = [venue['id'] for venue in response.data['results']]
+        self.assertEqual(ids, [other.id])
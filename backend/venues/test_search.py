@@ -0,0 +1,118 @@
+"""
+Тесты полнотекстового поиска по каталогу площадок
+"""
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from rest_framework import status
+from decimal import Decimal
+from io import StringIO
+
+from venues.models import Venue, VenueSearchTerm
+from venues.search import stem, tokenize
+
+User = get_user_model()
+
+
+class SearchTokenizerTestCase(TestCase):
+    """Тесты токенизатора и стеммера fallback-индекса"""
+    
+    def test_tokenize_drops_stop_words_and_short_words(self):
+        self.assertEqual(tokenize('Зал для конференций и встреч'), ['зал', 'конференц', 'встреч'])
+    
+    def test_stem_normalizes_word_forms(self):
+        self.assertEqual(stem('залы'), stem('зал'))
+        self.assertEqual(stem('переговорная'), stem('переговорной'))
+        self.assertEqual(stem('ёлка'), stem('елки'))
+
+
+@override_settings(
+    APPEND_SLASH=False,
+    SECURE_SSL_REDIRECT=False,
+    SECURE_PROXY_SSL_HEADER=None
+)
+class VenueSearchAPITestCase(TestCase):
+    """Тесты поиска через ?q="""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        
+        self.hall = self.create_venue(
+            title='Конференц-зал на Ленина',
+            description='Просторный зал с проектором',
+            address='ул. Ленина, д. 1'
+        )
+        self.studio = self.create_venue(
+            title='Фотостудия',
+            description='Студия с циклорамой, рядом конференц-залы',
+            address='ул. Мира, д. 5'
+        )
+        self.coworking = self.create_venue(
+            title='Коворкинг',
+            description='Открытое пространство',
+            address='ул. Ленина, д. 10'
+        )
+    
+    def create_venue(self, **kwargs):
+        return Venue.objects.create(
+            owner=self.user,
+            capacity=20,
+            price_per_hour=Decimal('1000.00'),
+            is_active=True,
+            **kwargs
+        )
+    
+    def search(self, **params):
+        response = self.client.get('/api/venues/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [venue['id'] for venue in response.data['results']]
+    
+    def test_search_matches_word_forms(self):
+        """Поиск находит другие словоформы"""
+        self.assertEqual(self.search(q='залы'), [self.hall.id, self.studio.id])
+    
+    def test_title_match_ranks_higher(self):
+        """Совпадение в названии релевантнее совпадения в описании"""
+        ids = self.search(q='конференц')
+        self.assertEqual(ids[0], self.hall.id)
+    
+    def test_all_terms_required(self):
+        """Запрос из нескольких слов требует все слова"""
+        self.assertEqual(self.search(q='зал Ленина'), [self.hall.id])
+    
+    def test_legacy_search_param(self):
+        """Параметр ?search= поддерживается для совместимости"""
+        self.assertEqual(self.search(search='коворкинг'), [self.coworking.id])
+    
+    def test_no_matches(self):
+        self.assertEqual(self.search(q='бассейн'), [])
+    
+    def test_explicit_ordering_overrides_rank(self):
+        """Явный ?ordering= имеет приоритет над релевантностью"""
+        ids = self.search(q='Ленина', ordering='-created_at')
+        self.assertEqual(ids, [self.coworking.id, self.hall.id])
+    
+    def test_index_updated_on_save(self):
+        """Индекс обновляется при сохранении площадки"""
+        self.coworking.title = 'Лофт'
+        self.coworking.save()
+        
+        self.assertEqual(self.search(q='лофт'), [self.coworking.id])
+        self.assertEqual(self.search(q='коворкинг'), [])
+    
+    def test_rebuild_command(self):
+        """Команда rebuild_venue_search_index восстанавливает индекс"""
+        VenueSearchTerm.objects.all().delete()
+        self.assertEqual(self.search(q='фотостудия'), [])
+        
+        call_command('rebuild_venue_search_index', stdout=StringIO())
+        
+        self.assertEqual(self.search(q='фотостудия'), [self.studio.id])
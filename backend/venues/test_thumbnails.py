@@ -6,6 +6,8 @@ import os
 from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+from rest_framework import status
 from PIL import Image
 from io import BytesIO
 
@@ -207,3 +209,81 @@ class VenueImageModelTestCase(TestCase):
         self.assertTrue(os.path.exists(venue_image.thumbnail_small.path))
         self.assertTrue(os.path.exists(venue_image.thumbnail_medium.path))
         self.assertTrue(os.path.exists(venue_image.thumbnail_large.path))
+
+
+
+@override_settings(
+    APPEND_SLASH=False,
+    SECURE_SSL_REDIRECT=False,
+    SECURE_PROXY_SSL_HEADER=None,
+    MEDIA_ROOT='/tmp/test_media/'
+)
+class VenueMainImageTestCase(TestCase):
+    """Тесты денормализованного главного фото площадки"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='user@test.com',
+            password='testpass123',
+            full_name='Test User',
+            role='admin'
+        )
+        self.client.force_authenticate(user=self.user)
+        
+        self.venue = Venue.objects.create(
+            title='Test Venue',
+            description='Test Description',
+            address='Test Address',
+            price_per_hour=1000,
+            capacity=10,
+            owner=self.user,
+            is_active=True
+        )
+    
+    def upload(self, name):
+        image_file = SimpleUploadedFile(
+            name=name,
+            content=create_test_image(800, 600).read(),
+            content_type='image/jpeg'
+        )
+        response = self.client.post(
+            f'/api/venues/{self.venue.id}/images/', {'image': image_file}, format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return VenueImage.objects.get(id=response.data['id'])
+    
+    def test_upload_and_delete_update_main_image(self):
+        """Главное фото - первое загруженное, после удаления переходит к следующему"""
+        first = self.upload('first.jpg')
+        second = self.upload('second.jpg')
+        
+        self.venue.refresh_from_db()
+        self.assertEqual(self.venue.main_image_path, first.image.name)
+        self.assertEqual(self.venue.main_thumbnail_path, first.thumbnail_medium.name)
+        self.assertEqual(self.venue.main_thumbnail_webp_path, first.thumbnail_medium_webp.name)
+        
+        response = self.client.delete(f'/api/venues/{self.venue.id}/images/{first.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.venue.refresh_from_db()
+        self.assertEqual(self.venue.main_image_path, second.image.name)
+        
+        self.client.delete(f'/api/venues/{self.venue.id}/images/{second.id}/')
+        self.venue.refresh_from_db()
+        self.assertEqual(self.venue.main_image_path, '')
+        self.assertEqual(self.venue.main_thumbnail_path, '')
+    
+    def test_list_returns_main_image_without_images_query(self):
+        """Список отдаёт главное фото без запросов к таблице фотографий"""
+        image = self.upload('main.jpg')
+        self.client.force_authenticate(user=None)
+        
+        with self.assertNumQueries(3):  # COUNT + SELECT + prefetch categories
+            response = self.client.get('/api/venues/', format='json')
+        
+        venue = response.data['results'][0]
+        self.assertTrue(venue['main_image'].endswith(image.image.url))
+        self.assertTrue(venue['main_thumbnail'].endswith(image.thumbnail_medium.url))
+        self.assertTrue(venue['main_thumbnail_webp'].endswith(image.thumbnail_medium_webp.url))
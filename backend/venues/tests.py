@@ -1,7 +1,9 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db import connection
-from django.test.utils import override_settings
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
 from .models import Category, Venue, VenueImage
@@ -9,6 +11,7 @@ from reviews.models import Review
 from bookings.models import Booking
 from datetime import datetime, timedelta
 from decimal import Decimal
+from unittest.mock import patch
 
 User = get_user_model()
 
@@ -82,7 +85,7 @@ class VenueQueryOptimizationTestCase(TestCase):
         # Сбрасываем счётчик запросов
         connection.queries_was_reset = True
         
-        with self.assertNumQueries(4):  # Оптимизация работает отлично: COUNT + SELECT + prefetch images + prefetch categories
+        with self.assertNumQueries(3):  # COUNT + SELECT + prefetch categories (главное фото хранится в Venue)
             response = self.client.get('/api/venues/', format='json')
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -94,10 +97,23 @@ class VenueQueryOptimizationTestCase(TestCase):
         # Проверяем, что все данные загружены
         first_venue = results[0]
         self.assertIn('categories', first_venue)
-        self.assertIn('images', first_venue)
+        self.assertIn('main_thumbnail', first_venue)
+        self.assertNotIn('images', first_venue)  # Полный список фото только по ?expand=images
         self.assertIn('average_rating', first_venue)
         self.assertIn('reviews_count', first_venue)
     
+    def test_venue_list_sparse_fieldsets(self):
+        """?fields= убирает лишние поля и prefetch-запросы, ?expand=images добавляет фото"""
+        with self.assertNumQueries(2):  # COUNT + SELECT, без prefetch фото и категорий
+            response = self.client.get('/api/venues/', {'fields': 'id,title'}, format='json')
+        
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+        
+        with self.assertNumQueries(4):  # COUNT + SELECT + prefetch всех фото + prefetch categories
+            response = self.client.get('/api/venues/', {'expand': 'images'}, format='json')
+        
+        self.assertIn('images', response.data['results'][0])
+    
     def test_venue_detail_query_count(self):
         """Проверка количества запросов для детальной страницы"""
         venue = self.venues[0]
@@ -138,7 +154,7 @@ class VenueQueryOptimizationTestCase(TestCase):
     
     def test_venue_list_with_filters(self):
         """Проверка работы фильтров без увеличения запросов"""
-        with self.assertNumQueries(4):  # 4 запроса с фильтрами
+        with self.assertNumQueries(3):  # 3 запроса с фильтрами
             response = self.client.get('/api/venues/', {
                 'category': self.category1.id,
                 'capacity_min': 10,
@@ -193,8 +209,9 @@ class VenueSerializerTestCase(TestCase):
         venue_data = results[0]
         required_fields = [
             'id', 'title', 'capacity', 'price_per_hour', 'address',
-            'latitude', 'longitude', 'main_image', 'images',
-            'categories', 'average_rating', 'reviews_count', 'is_active'
+            'latitude', 'longitude', 'main_image', 'main_thumbnail',
+            'main_thumbnail_webp', 'categories', 'average_rating',
+            'reviews_count', 'is_active'
         ]
         
         for field in required_fields:
@@ -341,3 +358,112 @@ class VenueCategoryTestCase(TestCase):
         category = results[0]
         self.assertIn('id', category)
         self.assertIn('name', category)
+
+
+@override_settings(
+    APPEND_SLASH=False,
+    SECURE_SSL_REDIRECT=False,
+    SECURE_PROXY_SSL_HEADER=None
+)
+class VenueAvailabilityFilterTestCase(TestCase):
+    """Тесты фильтра площадок по свободному времени"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.default_format = 'json'
+        self.user = User.objects.create_user(
+            username='availability_filter',
+            email='availability_filter@test.com',
+            password='testpass123',
+            phone='+79001234590'
+        )
+        self.free_venue = self.create_venue('Свободная площадка', capacity=60)
+        self.busy_venue = self.create_venue('Занятая площадка', capacity=60)
+        self.small_venue = self.create_venue('Маленькая площадка', capacity=10)
+        
+        self.window_start = timezone.now().replace(microsecond=0) + timedelta(days=5)
+        self.window_end = self.window_start + timedelta(hours=4)
+        # Пересекается с окном
+        self.create_booking(self.busy_venue, self.window_start + timedelta(hours=1), self.window_end + timedelta(hours=1))
+        # Отменённая бронь и бронь, заканчивающаяся ровно в начале окна, не мешают
+        self.create_booking(self.free_venue, self.window_start, self.window_end, status='cancelled')
+        self.create_booking(self.free_venue, self.window_start - timedelta(hours=2), self.window_start)
+    
+    def create_venue(self, title, capacity):
+        return Venue.objects.create(
+            owner=self.user,
+            title=title,
+            description='Описание',
+            capacity=capacity,
+            price_per_hour=Decimal('1000.00'),
+            address='ул. Тестовая, д. 1',
+            is_active=True
+        )
+    
+    def create_booking(self, venue, date_start, date_end, status='confirmed'):
+        return Booking.objects.create(
+            user=self.user, venue=venue, date_start=date_start, date_end=date_end,
+            status=status, total_price=Decimal('1000.00')
+        )
+    
+    def get_params(self, **extra):
+        params = {
+            'available_from': self.window_start.isoformat(),
+            'available_to': self.window_end.isoformat(),
+        }
+        params.update(extra)
+        return params
+    
+    def get_titles(self, response):
+        return {venue['title'] for venue in response.data['results']}
+    
+    def test_excludes_busy_venues(self):
+        """Площадки с активной бронью в окне исключаются"""
+        response = self.client.get('/api/venues/', self.get_params())
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_titles(response), {'Свободная площадка', 'Маленькая площадка'})
+    
+    def test_combined_with_capacity_single_anti_join(self):
+        """Вместе с фильтром вместимости - один анти-join без запросов по площадкам"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/venues/', self.get_params(capacity_min=50))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_titles(response), {'Свободная площадка'})
+        sqls = [query['sql'] for query in queries.captured_queries]
+        venue_queries = [sql for sql in sqls if 'FROM "venues"' in sql]
+        self.assertTrue(venue_queries)
+        self.assertTrue(all('NOT EXISTS' in sql for sql in venue_queries))
+        # Брони не запрашиваются отдельно для каждой площадки
+        self.assertFalse([sql for sql in sqls if sql.startswith('SELECT "bookings"')])
+    
+    def test_new_booking_invalidates_cached_list(self):
+        """Новая бронь сбрасывает закэшированный результат фильтра"""
+        self.client.get('/api/venues/', self.get_params())
+        self.create_booking(self.free_venue, self.window_start, self.window_end)
+        
+        response = self.client.get('/api/venues/', self.get_params())
+        self.assertEqual(self.get_titles(response), {'Маленькая площадка'})
+    
+    def test_cached_list_expires_with_hold(self):
+        """Закэшированный результат живёт не дольше ближайшего удержания в окне"""
+        hold = self.create_booking(self.free_venue, self.window_start, self.window_end, status='pending')
+        Booking.objects.filter(pk=hold.pk).update(expires_at=timezone.now() + timedelta(seconds=90))
+        
+        with patch('venues.cache_utils.cache.set') as cache_set:
+            response = self.client.get('/api/venues/', self.get_params())
+        
+        self.assertEqual(self.get_titles(response), {'Маленькая площадка'})
+        ttls = [call.args[2] for call in cache_set.call_args_list if call.args[1] is response.data]
+        self.assertEqual(len(ttls), 1)
+        self.assertLessEqual(ttls[0], 90)
+    
+    def test_validation(self):
+        """Окно задаётся обоими параметрами, конец позже начала"""
+        response = self.client.get('/api/venues/', {'available_from': self.window_start.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.client.get('/api/venues/', self.get_params(available_to=self.window_start.isoformat()))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -3,6 +3,7 @@ from .views import (
     CategoryListView,
     VenueListView,
     VenueDetailView,
+    VenueGeoView,
     VenueImageUploadView
 )
 
@@ -13,6 +14,7 @@ urlpatterns = [
     # Площадки
     path('', VenueListView.as_view(), name='venue_list'),
     path('<int:pk>/', VenueDetailView.as_view(), name='venue_detail'),
+    path('geo/', VenueGeoView.as_view(), name='venue_geo'),
     
     # Фотографии
     path('<int:venue_id>/images/', VenueImageUploadView.as_view(), name='venue_image_upload'),
@@ -2,9 +2,11 @@ from rest_framework import generics, permissions, status, parsers
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Avg, Count, Q
+from rest_framework.filters import OrderingFilter
+from django.utils import timezone
 import logging
+import math
+from rentalall.serializers import is_expanded, is_field_included
 from .models import Category, Venue, VenueImage
 from .serializers import (
     CategorySerializer,
@@ -13,7 +15,15 @@ from .serializers import (
     VenueCreateUpdateSerializer,
     VenueImageSerializer
 )
-from .filters import VenueFilter
+from .filters import VenueFilter, VenueSearchFilter, get_next_hold_expiry
+from .cache_utils import (
+    BOOKINGS_GENERATION,
+    CATALOG_GENERATION,
+    CATEGORIES_GENERATION,
+    ResponseCacheMixin,
+    get_venue_generation_name
+)
+from .geo import GEO_CLUSTER_MAX_ZOOM, filter_by_area, get_clusters, get_points, parse_geo_area
 
 # Инициализация логгера для venues
 logger = logging.getLogger('venues')
@@ -28,22 +38,53 @@ class IsAdminOrReadOnly(permissions.BasePermission):
         return request.user and request.user.is_authenticated and request.user.is_admin()
 
 
-class CategoryListView(generics.ListCreateAPIView):
+class CategoryListView(ResponseCacheMixin, generics.ListCreateAPIView):
     """Список всех категорий"""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnly]
+    response_cache_scope = 'categories'
+    response_cache_ttl = 'categories'
+    
+    def get_response_cache_generations(self):
+        return [CATEGORIES_GENERATION]
 
 
-class VenueListView(generics.ListCreateAPIView):
+class VenueListView(ResponseCacheMixin, generics.ListCreateAPIView):
     """Список всех площадок с фильтрацией и поиском"""
     queryset = Venue.objects.filter(is_active=True)
     permission_classes = [IsAdminOrReadOnly]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    # VenueSearchFilter идёт после OrderingFilter, чтобы по умолчанию сортировать по релевантности
+    filter_backends = [DjangoFilterBackend, OrderingFilter, VenueSearchFilter]
     filterset_class = VenueFilter
-    search_fields = ['title', 'description', 'address']
-    ordering_fields = ['created_at', 'price_per_hour', 'capacity', 'title']
+    ordering_fields = ['created_at', 'price_per_hour', 'capacity', 'title', 'average_rating']
     ordering = ['-created_at']
+    # Ответы кэшируются; сохранение площадок, фото и отзывов увеличивает поколение каталога
+    response_cache_scope = 'venue_list'
+    response_cache_ttl = 'venue_list'
+    
+    def get_response_cache_generations(self):
+        generations = [CATALOG_GENERATION, CATEGORIES_GENERATION]
+        # Результат фильтра по свободному времени меняется с каждой бронью
+        if 'available_from' in self.request.query_params:
+            generations.append(BOOKINGS_GENERATION)
+        return generations
+    
+    def get_response_cache_ttl(self):
+        ttl = super().get_response_cache_ttl()
+        if 'available_from' not in self.request.query_params:
+            return ttl
+        # Истечение удержания не увеличивает BOOKINGS_GENERATION - ответ живёт
+        # не дольше ближайшего удержания в окне (как valid_until календаря занятости)
+        filterset = self.filterset_class(self.request.query_params, queryset=Venue.objects.none())
+        if not filterset.is_valid():
+            return ttl
+        window = filterset.form.cleaned_data
+        now = timezone.now()
+        next_expiry = get_next_hold_expiry(window['available_from'], window['available_to'], now)
+        if next_expiry is not None:
+            ttl = min(ttl, max(1, math.ceil((next_expiry - now).total_seconds())))
+        return ttl
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -52,26 +93,20 @@ class VenueListView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Оптимизированный queryset с prefetch для избежания N+1 queries"""
-        queryset = Venue.objects.all()
-        
-        # Оптимизация: prefetch related данных
-        queryset = queryset.prefetch_related(
-            'images',  # Изображения площадки
-            'categories',  # Категории
-        ).select_related(
+        queryset = Venue.objects.select_related(
             'owner'  # Владелец площадки
-        ).annotate(
-            # Вычисляем средний рейтинг и количество отзывов на уровне БД
-            average_rating=Avg(
-                'reviews__rating',
-                filter=Q(reviews__is_approved=True)
-            ),
-            reviews_count=Count(
-                'reviews',
-                filter=Q(reviews__is_approved=True)
-            )
         )
         
+        # Главное фото хранится в Venue, все изображения загружаем только по ?expand=images
+        if is_expanded(self.request, 'images'):
+            queryset = queryset.prefetch_related('images')
+        
+        if is_field_included(self.request, 'categories'):
+            queryset = queryset.prefetch_related('categories')
+        
+        # Рейтинг и количество отзывов хранятся денормализованно в Venue,
+        # поэтому GROUP BY по отзывам не нужен
+        
         # Если не администратор, показывать только активные площадки
         if not (self.request.user.is_authenticated and self.request.user.is_admin()):
             queryset = queryset.filter(is_active=True)
@@ -86,9 +121,14 @@ class VenueListView(generics.ListCreateAPIView):
         )
 
 
-class VenueDetailView(generics.RetrieveUpdateDestroyAPIView):
+class VenueDetailView(ResponseCacheMixin, generics.RetrieveUpdateDestroyAPIView):
     """Детальная информация о площадке"""
     permission_classes = [IsAdminOrReadOnly]
+    response_cache_scope = 'venue_detail'
+    response_cache_ttl = 'venue_detail'
+    
+    def get_response_cache_generations(self):
+        return [get_venue_generation_name(self.kwargs['pk']), CATEGORIES_GENERATION]
     
     def get_queryset(self):
         """Оптимизированный queryset для детальной страницы"""
@@ -98,15 +138,6 @@ class VenueDetailView(generics.RetrieveUpdateDestroyAPIView):
             'reviews__user',  # Отзывы с информацией о пользователях
         ).select_related(
             'owner'
-        ).annotate(
-            average_rating=Avg(
-                'reviews__rating',
-                filter=Q(reviews__is_approved=True)
-            ),
-            reviews_count=Count(
-                'reviews',
-                filter=Q(reviews__is_approved=True)
-            )
         )
     
     def get_serializer_class(self):
@@ -129,6 +160,58 @@ class VenueDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance.delete()
 
 
+class VenueGeoView(generics.GenericAPIView):
+    """
+    Площадки для карты в компактном виде: [id, lat, lon, price, rating].
+    Область: bbox=min_lon,min_lat,max_lon,max_lat или lat, lon, radius (км).
+    При zoom < GEO_CLUSTER_MAX_ZOOM близкие площадки объединяются в кластеры
+    [lat, lon, count, min_price]. Поддерживаются фильтры каталога (category, price_min, ...).
+    """
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = VenueFilter
+    pagination_class = None
+    
+    def get_queryset(self):
+        return Venue.objects.filter(
+            is_active=True,
+            latitude__isnull=False,
+            longitude__isnull=False
+        )
+    
+    def get(self, request):
+        try:
+            area = parse_geo_area(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        zoom = request.query_params.get('zoom')
+        if zoom:
+            if not zoom.isdigit() or int(zoom) > 23:
+                return Response(
+                    {'error': 'Параметр zoom должен быть целым числом от 0 до 23'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            zoom = int(zoom)
+        else:
+            zoom = None
+        
+        queryset = filter_by_area(self.filter_queryset(self.get_queryset()), area)
+        
+        if zoom is not None and zoom < GEO_CLUSTER_MAX_ZOOM:
+            points, clusters = get_clusters(queryset, zoom)
+            truncated = False
+        else:
+            points, truncated = get_points(queryset)
+            clusters = []
+        
+        return Response({
+            'points': points,
+            'clusters': clusters,
+            'truncated': truncated,
+        })
+
+
 class VenueImageUploadView(APIView):
     """Загрузка фотографий для площадки"""
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
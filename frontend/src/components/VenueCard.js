@@ -8,8 +8,8 @@ const VenueCard = ({ venue }) => {
   // Получаем все изображения или используем заглушку
   const images = venue.images && venue.images.length > 0 
     ? venue.images 
-    : venue.main_image 
-    ? [{ image: venue.main_image }] 
+    : venue.main_thumbnail || venue.main_image 
+    ? [{ image: venue.main_thumbnail || venue.main_image }] 
     : [];
 
   const hasMultipleImages = images.length > 1;
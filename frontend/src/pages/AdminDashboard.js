@@ -247,6 +247,9 @@ const AdminBookings = () => {
 const AdminReviews = () => {
   const [reviews, setReviews] = useState([]);
   const [loading, setLoading] = useState(true);
+  // Решения по отзывам до отправки: { [id]: 'approve' | 'disapprove' }
+  const [decisions, setDecisions] = useState({});
+  const [saving, setSaving] = useState(false);
 
   useEffect(() => {
     loadReviews();
@@ -256,6 +259,7 @@ const AdminReviews = () => {
     try {
       const response = await reviewsAPI.getPending();
       setReviews(response.data.results || response.data);
+      setDecisions({});
     } catch (error) {
       toast.error('Ошибка загрузки отзывов');
     } finally {
@@ -263,60 +267,96 @@ const AdminReviews = () => {
     }
   };
 
-  const approveReview = async (id) => {
-    try {
-      await reviewsAPI.approve(id);
-      toast.success('Отзыв одобрен');
-      loadReviews();
-    } catch (error) {
-      toast.error('Ошибка одобрения отзыва');
-    }
+  const toggleDecision = (id, action) => {
+    setDecisions((prev) => {
+      const next = { ...prev };
+      if (next[id] === action) {
+        delete next[id];
+      } else {
+        next[id] = action;
+      }
+      return next;
+    });
   };
 
-  const disapproveReview = async (id) => {
+  const markAll = (action) => {
+    setDecisions(Object.fromEntries(reviews.map((review) => [review.id, action])));
+  };
+
+  // Все решения отправляются одним запросом
+  const saveDecisions = async () => {
+    const items = Object.entries(decisions).map(([id, action]) => ({ id: Number(id), action }));
+    if (items.length === 0) return;
+
+    setSaving(true);
     try {
-      await reviewsAPI.disapprove(id);
-      toast.success('Отзыв отклонён');
+      const response = await reviewsAPI.moderate(items);
+      const { approved, disapproved } = response.data;
+      toast.success(`Одобрено: ${approved.length}, отклонено: ${disapproved.length}`);
       loadReviews();
     } catch (error) {
-      toast.error('Ошибка отклонения отзыва');
+      toast.error('Ошибка модерации отзывов');
+    } finally {
+      setSaving(false);
     }
   };
 
   if (loading) return <div className="loading">Загрузка...</div>;
 
+  const decisionsCount = Object.keys(decisions).length;
+
   return (
     <div className="admin-section">
       <h1>Модерация отзывов</h1>
       {reviews.length === 0 ? (
         <p className="no-data">Нет отзывов на модерации</p>
       ) : (
-        <div className="reviews-admin-list">
-          {reviews.map(review => (
-            <div key={review.id} className="review-admin-card">
-              <div className="review-admin-header">
-                <strong>{review.user_name || review.user_username}</strong>
-                <span>⭐ {review.rating}/5</span>
-              </div>
-              <p className="review-venue">{review.venue_title}</p>
-              <p className="review-text">{review.comment}</p>
-              <div className="review-actions">
-                <button 
-                  className="btn btn-sm btn-primary"
-                  onClick={() => approveReview(review.id)}
-                >
-                  Одобрить
-                </button>
-                <button 
-                  className="btn btn-sm btn-danger"
-                  onClick={() => disapproveReview(review.id)}
-                >
-                  Отклонить
-                </button>
+        <>
+          <div className="review-batch-actions">
+            <button className="btn btn-sm btn-secondary" onClick={() => markAll('approve')}>
+              Одобрить все
+            </button>
+            <button className="btn btn-sm btn-secondary" onClick={() => markAll('disapprove')}>
+              Отклонить все
+            </button>
+            <button
+              className="btn btn-sm btn-primary"
+              onClick={saveDecisions}
+              disabled={saving || decisionsCount === 0}
+            >
+              {saving ? 'Сохранение...' : `Сохранить решения (${decisionsCount})`}
+            </button>
+          </div>
+          <div className="reviews-admin-list">
+            {reviews.map(review => (
+              <div
+                key={review.id}
+                className={`review-admin-card ${decisions[review.id] ? `decision-${decisions[review.id]}` : ''}`}
+              >
+                <div className="review-admin-header">
+                  <strong>{review.user_name || review.user_username}</strong>
+                  <span>⭐ {review.rating}/5</span>
+                </div>
+                <p className="review-venue">{review.venue_title}</p>
+                <p className="review-text">{review.comment}</p>
+                <div className="review-actions">
+                  <button 
+                    className={`btn btn-sm ${decisions[review.id] === 'approve' ? 'btn-primary' : 'btn-secondary'}`}
+                    onClick={() => toggleDecision(review.id, 'approve')}
+                  >
+                    Одобрить
+                  </button>
+                  <button 
+                    className={`btn btn-sm ${decisions[review.id] === 'disapprove' ? 'btn-danger' : 'btn-secondary'}`}
+                    onClick={() => toggleDecision(review.id, 'disapprove')}
+                  >
+                    Отклонить
+                  </button>
+                </div>
               </div>
-            </div>
-          ))}
-        </div>
+            ))}
+          </div>
+        </>
       )}
     </div>
   );
@@ -91,6 +91,7 @@ const BookingsPage = () => {
       case 'confirmed': return 'status-confirmed';
       case 'pending': return 'status-pending';
       case 'cancelled': return 'status-cancelled';
+      case 'expired': return 'status-expired';
       default: return '';
     }
   };
@@ -21,6 +21,7 @@ const VenueDetailPage = () => {
   const [startTime, setStartTime] = useState(null);
   const [endTime, setEndTime] = useState(null);
   const [occupiedSlots, setOccupiedSlots] = useState([]);
+  const [availability, setAvailability] = useState(null);
   const [loadingSlots, setLoadingSlots] = useState(false);
 
   useEffect(() => {
@@ -60,26 +61,44 @@ const VenueDetailPage = () => {
     return slots;
   };
 
+  // Локальная дата в формате YYYY-MM-DD
+  const formatDate = (date) => {
+    const year = date.getFullYear();
+    const month = String(date.getMonth() + 1).padStart(2, '0');
+    const day = String(date.getDate()).padStart(2, '0');
+    return `${year}-${month}-${day}`;
+  };
+
   // Загрузка занятых слотов для выбранной даты
-  const loadOccupiedSlots = async (date) => {
+  // Календарь занятости запрашивается сразу на весь месяц и переиспользуется при смене дня;
+  // refresh - запросить месяц заново (после создания брони календарь устарел)
+  const loadOccupiedSlots = async (date, refresh = false) => {
     if (!venue) return;
     
-    setLoadingSlots(true);
-    try {
-      // Используем локальные методы даты для правильного форматирования
-      const year = date.getFullYear();
-      const month = String(date.getMonth() + 1).padStart(2, '0');
-      const day = String(date.getDate()).padStart(2, '0');
-      const dateStr = `${year}-${month}-${day}`;
-      
-      const response = await bookingsAPI.getOccupiedSlots(venue.id, dateStr);
-      setOccupiedSlots(response.data.occupied_slots || []);
-    } catch (error) {
-      console.error('Ошибка загрузки занятых слотов:', error);
-      setOccupiedSlots([]);
-    } finally {
-      setLoadingSlots(false);
+    const monthKey = `${venue.id}:${date.getFullYear()}-${date.getMonth()}`;
+    let calendar = availability;
+    
+    if (refresh || !calendar || calendar.key !== monthKey) {
+      setLoadingSlots(true);
+      try {
+        const monthStart = new Date(date.getFullYear(), date.getMonth(), 1);
+        const monthEnd = new Date(date.getFullYear(), date.getMonth() + 1, 0);
+        const response = await bookingsAPI.getAvailability(
+          venue.id, formatDate(monthStart), formatDate(monthEnd)
+        );
+        calendar = { key: monthKey, days: response.data.days || {} };
+        setAvailability(calendar);
+      } catch (error) {
+        console.error('Ошибка загрузки занятых слотов:', error);
+        setOccupiedSlots([]);
+        return;
+      } finally {
+        setLoadingSlots(false);
+      }
     }
+    
+    const intervals = calendar.days[formatDate(date)] || [];
+    setOccupiedSlots(intervals.map(([start, end]) => `${start} - ${end}`));
   };
 
   // Проверка, занят ли слот (или находится в занятом диапазоне)
@@ -195,6 +214,7 @@ const VenueDetailPage = () => {
         date_end: endDateTime.toISOString()
       });
       toast.success('Бронирование создано!');
+      loadOccupiedSlots(selectedDate, true);
       navigate('/bookings');
     } catch (error) {
       console.error('Ошибка бронирования:', error.response?.data);
@@ -71,7 +71,7 @@ const VenueListPage = () => {
     e.preventDefault();
     const params = {};
     
-    if (filters.search) params.search = filters.search;
+    if (filters.search) params.q = filters.search;
     if (filters.category) params.category = filters.category;
     if (filters.capacity_min) params.capacity_min = filters.capacity_min;
     if (filters.capacity_max) params.capacity_max = filters.capacity_max;
@@ -86,6 +86,10 @@ export const venuesAPI = {
   getById: (id) =>
     api.get(`/venues/${id}/`),
   
+  // Компактные точки для карты: bbox или lat/lon/radius, zoom для кластеризации
+  getGeo: (params) =>
+    api.get('/venues/geo/', { params }),
+  
   create: (venueData) =>
     api.post('/venues/', venueData),
   
@@ -129,6 +133,10 @@ export const bookingsAPI = {
   create: (bookingData) =>
     api.post('/bookings/', bookingData),
   
+  // Серия бронирований: { venue, intervals } или { venue, date_start, date_end, recurrence }
+  createBulk: (bulkData) =>
+    api.post('/bookings/bulk/', bulkData),
+  
   update: (id, bookingData) =>
     api.patch(`/bookings/${id}/`, bookingData),
   
@@ -143,6 +151,10 @@ export const bookingsAPI = {
   
   getOccupiedSlots: (venueId, date) =>
     api.get(`/bookings/occupied-slots/`, { params: { venue: venueId, date } }),
+  
+  // Календарь занятости площадки за период (даты YYYY-MM-DD, to включительно)
+  getAvailability: (venueId, from, to) =>
+    api.get('/bookings/availability/', { params: { venue: venueId, from, to } }),
 };
 
 // API методы для платежей
@@ -185,6 +197,10 @@ export const reviewsAPI = {
   
   disapprove: (id) =>
     api.post(`/reviews/${id}/disapprove/`),
+  
+  // Пакетная модерация: [{ id, action: 'approve' | 'disapprove' }]
+  moderate: (decisions) =>
+    api.post('/reviews/moderate/', { reviews: decisions }),
 };
 
 export default api;